@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+
+"""
+Compares the concurrency ceiling and the latency of the Flask-RESTful application, served by the production
+Gunicorn server, and of the ASGI application, served by Uvicorn, each one with a single worker process.
+At every concurrency level, as many keep-alive connections as the level are opened at once, and each one sends
+conversion requests one after the other for a few seconds. The concurrency ceiling of a server is the highest
+level it sustains with no failed request and a p99 latency under P99_TARGET.
+Run from the project folder: python benchmarks/asgi_benchmark.py
+"""
+
+CONCURRENCY_LEVELS = [10, 100, 500, 1000, 2000]
+DURATION = 3.0  # seconds each concurrency level is run for
+REQUEST_TIMEOUT = 5.0   # seconds after which a request is counted as failed
+P99_TARGET = 0.25   # p99 latency, in seconds, a level must stay under to be sustained
+REQUEST = b'GET /api/convert?amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10 HTTP/1.1\r\n' \
+          b'Host: 127.0.0.1\r\n\r\n'
+
+SERVERS = [
+    ('flask (gunicorn gthread, 8 threads)', ['gunicorn'], dict(WORKERS='1', THREADS='8', MAX_REQUESTS='0')),
+    ('asgi (uvicorn)', ['uvicorn', 'server.asgi_server:app', '--log-level', 'warning'], dict())
+]
+
+
+async def read_response(reader):
+    """
+    Reads a complete HTTP response, delimited by its Content-Length header.
+    :return: status_code
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    content_length = 0
+    for line in lines[1:]:
+        if line.lower().startswith('content-length:'):
+            content_length = int(line.split(':', 1)[1])
+    await reader.readexactly(content_length)
+    return int(lines[0].split(' ')[1])
+
+
+async def run_connection(port, deadline, latencies):
+    """
+    Opens a keep-alive connection and sends requests on it until the deadline.
+    :return: 1 if the connection failed, 0 otherwise
+    """
+    try:
+        (reader, writer) = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), REQUEST_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        return 1
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(REQUEST)
+            status_code = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+            if status_code != 200:
+                return 1
+            latencies.append(time.perf_counter() - start)
+        return 0
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return 1
+    finally:
+        writer.close()
+
+
+async def run_level(port, concurrency):
+    """
+    Runs a concurrency level.
+    :return: (requests_per_second, p50, p99, failed_connections)
+    """
+    latencies = list()
+    deadline = time.perf_counter() + DURATION
+    failures = await asyncio.gather(*[run_connection(port, deadline, latencies) for i in range(concurrency)])
+    latencies.sort()
+    if len(latencies) == 0:
+        return 0, None, None, sum(failures)
+    return len(latencies) / DURATION, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], \
+        sum(failures)
+
+
+def get_free_port():
+    """
+    Returns a TCP port no process is listening on.
+    :return: port
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(command, environment, port):
+    """
+    Starts a server and waits for it to accept connections.
+    :return: process
+    """
+    env = dict(os.environ, REFRESH_INTERVAL='0', BIND='127.0.0.1:{}'.format(port), **environment)
+    if command[0] == 'uvicorn':
+        command = command + ['--port', str(port)]
+    process = subprocess.Popen([sys.executable, '-m'] + command, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    for i in range(300):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise Exception('The server did not start: {}'.format(' '.join(command)))
+
+
+def main():
+    for (name, command, environment) in SERVERS:
+        port = get_free_port()
+        process = start_server(command, environment, port)
+        try:
+            print(name)
+            ceiling = 0
+            sustained = True    # whether every level run so far has been sustained
+            for concurrency in CONCURRENCY_LEVELS:
+                (throughput, p50, p99, failures) = asyncio.run(run_level(port, concurrency))
+                print('  {:5} connections  {:8.0f} req/s  p50 {}  p99 {}  failed connections {}'.format(
+                    concurrency, throughput, '{:7.1f} ms'.format(p50 * 1000) if p50 is not None else '      -',
+                    '{:7.1f} ms'.format(p99 * 1000) if p99 is not None else '      -', failures))
+                sustained = sustained and (failures == 0) and (p99 is not None) and (p99 < P99_TARGET)
+                if sustained is True:
+                    ceiling = concurrency
+            print('  concurrency ceiling: {} connections'.format(ceiling))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import tempfile
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loader_benchmark import write_history_document  # noqa: E402
+from server import resources  # noqa: E402
+from server.flask_server import app  # noqa: E402
+from server.exchange_rates_store import exchange_rates_store  # noqa: E402
+
+"""
+Benchmark suite of the currency converter: the exchange rates loader on the 90-day document shipped in 'assets' and
+on a synthetic document as large as the full ECB history, the throughput of the conversion core, and the latency of
+'/api/convert' requests served by the Flask test client.
+The results are written as JSON and compared against a stored baseline, each result worse than its baseline by
+more than the tolerance being flagged as a regression (exit status 1). Timings depend on the machine: refresh the
+baseline with --update-baseline when moving the suite to another one.
+Run from the project folder: python benchmarks/benchmark_suite.py [--output results.json] [--update-baseline]
+"""
+
+BASELINE_DOCUMENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25    # relative change of a result, against its baseline, flagged as a regression
+QUERY_STRING = 'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10'
+
+
+def get_result(value, unit, better):
+    """
+    Builds a result of the suite.
+    :param value: measured value
+    :type value: float
+    :param unit: unit of the value
+    :type unit: str
+    :param better: 'lower' or 'higher', the direction in which the value improves
+    :type better: str
+    :return: result
+    """
+    return dict(value=value, unit=unit, better=better)
+
+
+def get_best_seconds(function, repeat):
+    """
+    Returns the best time of a call over 'repeat' calls.
+    :return: seconds
+    """
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def get_calls_per_second(function, number, repeat=7):
+    """
+    Returns the best number of calls per second over 'repeat' runs of 'number' calls.
+    :return: calls_per_second
+    """
+    return number / min(timeit.repeat(function, number=number, repeat=repeat))
+
+
+def run_loader_benchmarks(results):
+    """
+    Measures the parse time of 'get_exchange_rates_dict' on the 90-day and on the full history documents.
+    """
+    results['loader.get_exchange_rates_dict.90_day'] = get_result(
+        get_best_seconds(lambda: resources.get_exchange_rates_dict('assets/exchange_rates.xml'), 10), 's', 'lower')
+    folder = tempfile.mkdtemp()
+    history_document = os.path.join(folder, 'eurofxref-hist.xml')
+    try:
+        write_history_document(history_document)
+        results['loader.get_exchange_rates_dict.full_history'] = get_result(
+            get_best_seconds(lambda: resources.get_exchange_rates_dict(history_document), 5), 's', 'lower')
+    finally:
+        os.remove(history_document)
+        os.rmdir(folder)
+
+
+def run_core_benchmarks(results):
+    """
+    Measures the throughput of 'get_conversion_factor' and 'get_currency_converted_amount' on the exchange rates
+    table and on the dict of the exchange rates, and the throughput of the fixed-point conversion used by the
+    server.
+    """
+    table = resources.get_exchange_rates_table('assets/exchange_rates.xml')
+    exchange_rates_dict = table.to_dict()
+    date = table.get_date(len(table) - 1)
+    amount = Decimal(14.0)
+    # the dict is walked by every call, it is measured over fewer calls
+    for (name, exchange_rates, number) in (('table', table, 20000), ('dict', exchange_rates_dict, 500)):
+        results['core.get_conversion_factor.' + name] = get_result(get_calls_per_second(
+            lambda: resources.get_conversion_factor(exchange_rates, 'GBP', 'USD', date), number), 'calls/s', 'higher')
+        results['core.get_currency_converted_amount.' + name] = get_result(get_calls_per_second(
+            lambda: resources.get_currency_converted_amount(exchange_rates, amount, 'GBP', 'USD', date), number),
+            'calls/s', 'higher')
+    results['core.get_currency_converted_float_amount_at_date.table'] = get_result(get_calls_per_second(
+        lambda: resources.get_currency_converted_float_amount_at_date(table, 14.0, 'GBP', 'USD', date), 20000),
+        'calls/s', 'higher')
+
+
+def run_http_benchmarks(results, requests=1000, rounds=3):
+    """
+    Measures the latency of '/api/convert' requests served by the Flask test client, one after the other, keeping
+    the best of a few rounds so that a burst of noise on the machine does not show up as a regression.
+    """
+    client = app.test_client()
+    exchange_rates_store.get_exchange_rates()   # loads the exchange rates before the first request is timed
+    for i in range(100):
+        client.get('/api/convert?' + QUERY_STRING)     # warms the application up
+    (p50, p99, throughput) = (None, None, None)
+    for r in range(rounds):
+        latencies = list()
+        for i in range(requests):
+            start = time.perf_counter()
+            response = client.get('/api/convert?' + QUERY_STRING)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise Exception('/api/convert returned {}'.format(response.status_code))
+        latencies.sort()
+        p50 = min(p50 or latencies[-1], latencies[len(latencies) // 2])
+        p99 = min(p99 or latencies[-1], latencies[int(len(latencies) * 0.99)])
+        throughput = max(throughput or 0, len(latencies) / sum(latencies))
+    results['http.api_convert.p50'] = get_result(p50 * 1000, 'ms', 'lower')
+    results['http.api_convert.p99'] = get_result(p99 * 1000, 'ms', 'lower')
+    results['http.api_convert.throughput'] = get_result(throughput, 'requests/s', 'higher')
+
+
+def compare_results(results, baseline, tolerance):
+    """
+    Compares the results of the suite against the baseline, printing one line per result.
+    :param results: results of the suite, by name
+    :type results: dict
+    :param baseline: baseline results, by name
+    :type baseline: dict
+    :param tolerance: relative change of a result flagged as a regression
+    :type tolerance: float
+    :return: names of the regressed results
+    """
+    regressions = list()
+    for (name, result) in results.items():
+        baseline_result = baseline.get(name, None)
+        if baseline_result is None:
+            print('{:55} {:>12.4g} {:10}  (no baseline)'.format(name, result['value'], result['unit']))
+            continue
+        change = result['value'] / baseline_result['value'] - 1
+        worse = -change if result['better'] == 'higher' else change    # relative change, positive when worse
+        status = 'ok'
+        if worse > tolerance:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif worse < -tolerance:
+            status = 'improved'
+        print('{:55} {:>12.4g} {:10} baseline {:>12.4g}  {:+7.1%}  {}'.format(
+            name, result['value'], result['unit'], baseline_result['value'], change, status))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite of the currency converter.')
+    parser.add_argument('--output', help='path of the JSON document the results are written to')
+    parser.add_argument('--baseline', default=BASELINE_DOCUMENT, help='path of the JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='relative change flagged as a regression (default: %(default)s)')
+    parser.add_argument('--update-baseline', action='store_true', help='stores the results as the new baseline')
+    args = parser.parse_args()
+
+    results = dict()
+    run_loader_benchmarks(results)
+    run_core_benchmarks(results)
+    run_http_benchmarks(results)
+    document = dict(python=platform.python_version(), machine=platform.machine(), cpu_count=os.cpu_count(),
+                    timestamp=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), results=results)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    baseline = dict()
+    if os.path.exists(args.baseline) is True:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+    regressions = compare_results(results, baseline, args.tolerance)
+    if args.update_baseline is True:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print('baseline updated: {}'.format(args.baseline))
+    elif len(regressions) > 0:
+        print('{} regression(s): {}'.format(len(regressions), ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
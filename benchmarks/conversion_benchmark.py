@@ -0,0 +1,56 @@
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import resources  # noqa: E402
+from server.exchange_rates_store import exchange_rates_store  # noqa: E402
+
+"""
+Measures the conversions per second of a single core: the Decimal conversion path, from the float amount of the
+request to the float amount of the response, against the fixed-point engine.
+Run from the project folder: python benchmarks/conversion_benchmark.py
+"""
+
+CONVERSIONS = [(14.0, 'EUR', 'USD'), (12.35, 'GBP', 'JPY'), (1999.99, 'USD', 'CHF'), (0.5, 'JPY', 'NOK')]
+
+
+def convert_decimal(table, date):
+    """
+    Previous conversion of the amounts of the requests, through Decimal amounts.
+    """
+    for (amount, src_currency, dst_currency) in CONVERSIONS:
+        (converted_amount, used_date) = resources.get_currency_converted_amount_at_date(
+            table, Decimal(amount), src_currency, dst_currency, date)
+        float(converted_amount)
+
+
+def convert_fixed_point(table, date):
+    """
+    Current conversion of the amounts of the requests, through the fixed-point engine.
+    """
+    for (amount, src_currency, dst_currency) in CONVERSIONS:
+        resources.get_currency_converted_float_amount_at_date(table, amount, src_currency, dst_currency, date)
+
+
+def measure(function, number):
+    """
+    Returns the best number of conversions per second over 7 runs of 'number' calls.
+    :return: conversions_per_second
+    """
+    return number * len(CONVERSIONS) / min(timeit.repeat(function, number=number, repeat=7))
+
+
+def main():
+    table = exchange_rates_store.get_exchange_rates()
+    date = table.get_date(len(table) - 1)
+    decimal = measure(lambda: convert_decimal(table, date), 5000)
+    fixed_point = measure(lambda: convert_fixed_point(table, date), 5000)
+    print('Decimal {:9.0f} conversions/s   fixed-point {:9.0f} conversions/s   x{:.2f}'.format(
+        decimal, fixed_point, fixed_point / decimal))
+
+
+if __name__ == '__main__':
+    main()
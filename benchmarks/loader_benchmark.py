@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.resources import get_exchange_rates_dict, get_exchange_rates_table  # noqa: E402
+from server.exchange_rates_snapshot import read_exchange_rates_snapshot, write_exchange_rates_snapshot  # noqa: E402
+
+"""
+Compares peak memory and parse time of the streaming exchange rates loader against the
+previous minidom-based loader, and the memory retained by the dict of dates against the
+columnar exchange rates table, and the cold load of the table out of its binary snapshot, on the 90-day document shipped in 'assets' and on a synthetic
+document as large as the full ECB history (eurofxref-hist.xml).
+Run from the project folder: python benchmarks/loader_benchmark.py
+"""
+
+CURRENCIES = ['USD', 'JPY', 'BGN', 'CZK', 'DKK', 'GBP', 'HUF', 'PLN', 'RON', 'SEK', 'CHF', 'ISK', 'NOK', 'HRK',
+              'RUB', 'TRY', 'AUD', 'BRL', 'CAD', 'CNY', 'HKD', 'IDR', 'ILS', 'INR', 'KRW', 'MXN', 'MYR', 'NZD',
+              'PHP', 'SGD', 'THB', 'ZAR']
+
+
+def get_exchange_rates_dict_minidom(exchange_rates_document):
+    """
+    Previous implementation of 'get_exchange_rates_dict', building the whole DOM before reading any rate.
+    Kept here as the reference the streaming loader is measured against.
+    :param exchange_rates_document: full name of the exchange rates document
+    :type exchange_rates_document: str
+    :return: exchange_rates_dict
+    """
+    exchange_rate_doc = minidom.parse(exchange_rates_document)
+    exchange_rates_dict = dict()
+    for c in exchange_rate_doc.getElementsByTagName('Cube'):
+        if 'time' in c.attributes:
+            exchange_rates_dict[c.attributes['time'].value] = dict()
+            for er in c.childNodes:
+                if ('currency' in er.attributes) and ('rate' in er.attributes):
+                    exchange_rates_dict[c.attributes['time'].value][er.attributes['currency'].value] = \
+                        Decimal(er.attributes['rate'].value)
+                else:
+                    raise TypeError('The XML document is wrongly formatted.')
+            exchange_rates_dict[c.attributes['time'].value]['EUR'] = Decimal(1.0)
+    if len(list(exchange_rates_dict.keys())) == 0:
+        raise TypeError('The XML document is wrongly formatted.')
+    return exchange_rates_dict
+
+
+def write_history_document(path, first_date=date(1999, 1, 4), last_date=date(2019, 10, 15)):
+    """
+    Writes an ECB-like document containing one exchange rate per currency for every business day
+    between the two dates given in input (about the size of the full ECB history).
+    :param path: path of the document to write
+    :type path: str
+    :param first_date: oldest date of the document
+    :type first_date: date
+    :param last_date: newest date of the document
+    :type last_date: date
+    """
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?><gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/'
+                '2002-08-01" xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref"><Cube>')
+        day = last_date
+        while day >= first_date:
+            if day.weekday() < 5:
+                f.write('<Cube time="{}">'.format(day.isoformat()))
+                for (i, currency) in enumerate(CURRENCIES):
+                    f.write('<Cube currency="{}" rate="{:.4f}"/>'.format(currency, 1 + i + (day.toordinal() % 97) / 97))
+                f.write('</Cube>')
+            day -= timedelta(days=1)
+        f.write('</Cube></gesmes:Envelope>')
+
+
+def measure(loader, document, repeat=3):
+    """
+    Measures the best parse time over 'repeat' runs, the peak memory allocated by one run and
+    the memory still allocated by its result.
+    :return: (seconds, peak_bytes, retained_bytes, result)
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = loader(document)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+    tracemalloc.start()
+    result = loader(document)
+    (retained, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, retained, result
+
+
+def main():
+    documents = [('90-day (assets)', 'assets/exchange_rates.xml')]
+    folder = tempfile.mkdtemp()
+    history_document = os.path.join(folder, 'eurofxref-hist.xml')
+    write_history_document(history_document)
+    documents.append(('full history (synthetic)', history_document))
+    try:
+        for (label, document) in documents:
+            print('{} - {:.1f} MB'.format(label, os.path.getsize(document) / 1e6))
+            results = []
+            # the snapshot is mapped, not read: its buffers do not show up in the traced memory
+            snapshot_document = os.path.join(folder, 'exchange_rates.snapshot')
+            write_exchange_rates_snapshot(snapshot_document, get_exchange_rates_table(document), (0, 0))
+            for (name, loader) in (('minidom', get_exchange_rates_dict_minidom),
+                                   ('streaming', get_exchange_rates_dict),
+                                   ('table', get_exchange_rates_table),
+                                   ('snapshot', lambda d: read_exchange_rates_snapshot(snapshot_document, (0, 0)))):
+                (seconds, peak, retained, result) = measure(loader, document)
+                print('  {:10} {:8.3f} s  peak {:8.1f} MB  retained {:8.2f} MB'.format(
+                    name, seconds, peak / 1e6, retained / 1e6))
+                results.append(result if isinstance(result, dict) else result.to_dict())
+            assert all(r == results[0] for r in results), 'the loaders returned different exchange rates'
+            del results
+            os.remove(snapshot_document)
+    finally:
+        os.remove(history_document)
+        os.rmdir(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import urlsplit, urlencode
+
+"""
+Replays a log of '/api/convert' requests against a running server and reports its throughput, latency percentiles
+and errors, to size the capacity of a deployment and to check performance changes under a real traffic mix.
+The log is a JSONL document, one request per line, holding the querystring parameters of the request, either as
+an object or as a string, and optionally the time the request was received, in seconds:
+    {"query": {"amount": "14.0", "src-currency": "EUR", "dest-currency": "USD", "reference-date": "latest"}, "time": 0.5}
+    {"query_string": "amount=12.35&src-currency=GBP&dest-currency=JPY&reference-date=2019-10-10"}
+The access log of the server (ACCESS_LOG) is such a log: its requests are replayed with their path and their time,
+its error entries and its requests other than GET ones being skipped.
+Requests are sent over keep-alive connections, in one of three modes:
+    - closed loop (default): each of --concurrency connections sends the next request as soon as it gets a response;
+    - open loop at a fixed rate (--rate): requests arrive at --rate requests per second, with exponentially
+      distributed gaps, whether or not the previous ones have been answered;
+    - open loop with the timing of the log (--timing): requests arrive at the times of the log, sped up by --speed.
+In the open loop modes, at most --concurrency requests are in flight; the latency of a request is measured from its
+arrival time, so the time spent waiting for a free connection when the server falls behind is counted as well.
+Run from the project folder: python benchmarks/replay_load_generator.py requests.jsonl --url http://127.0.0.1:8080
+"""
+
+DEFAULT_PATH = '/api/convert'
+REQUEST_TIMEOUT = 5.0   # seconds after which a request is counted as failed
+
+
+def read_request_log(log_document):
+    """
+    Reads the log of the requests to replay.
+    :param log_document: path of the JSONL log
+    :type log_document: str
+    :return: list of (time, target) pairs, the time being None if the log does not hold it
+    """
+    requests = list()
+    with open(log_document, 'r') as f:
+        for (line_number, line) in enumerate(f, 1):
+            if line.strip() == '':
+                continue
+            try:
+                entry = json.loads(line)
+                if (entry.get('event', 'access') != 'access') or (entry.get('method', 'GET') not in ('GET', 'HEAD')):
+                    continue    # entries of the server logs which are not replayable requests
+                query = entry.get('query', None)
+                query_string = urlencode(query) if query is not None else entry.get('query_string', '')
+                target = entry.get('path', DEFAULT_PATH) + ('?' + query_string.lstrip('?') if query_string else '')
+                request_time = entry.get('time', entry.get('timestamp', None))
+                requests.append((float(request_time) if request_time is not None else None, target))
+            except (ValueError, AttributeError, TypeError) as e:
+                raise Exception('Invalid request at line {} of {}: {}'.format(line_number, log_document, e))
+    if len(requests) == 0:
+        raise Exception('No request to replay in {}'.format(log_document))
+    return requests
+
+
+def get_arrival_times(requests, mode, rate=None, speed=1.0, seed=0):
+    """
+    Returns the arrival time of each request, in seconds from the start of the replay.
+    :param requests: list of (time, target) pairs
+    :type requests: list
+    :param mode: 'rate' for exponentially distributed gaps at the given rate, 'timing' for the times of the log
+    :type mode: str
+    :param rate: requests per second, for the 'rate' mode
+    :type rate: float
+    :param speed: factor the times of the log are sped up by, for the 'timing' mode
+    :type speed: float
+    :param seed: seed of the gaps, for the 'rate' mode, so that two runs send the same arrivals
+    :type seed: int
+    :return: list of arrival times
+    """
+    if mode == 'rate':
+        random_generator = random.Random(seed)
+        arrival_times = list()
+        arrival_time = 0.0
+        for i in range(len(requests)):
+            arrival_times.append(arrival_time)
+            arrival_time += random_generator.expovariate(rate)
+        return arrival_times
+    if any(request_time is None for (request_time, target) in requests):
+        raise Exception('Every request of the log must hold its time to replay its timing')
+    first_time = min(request_time for (request_time, target) in requests)
+    return [(request_time - first_time) / speed for (request_time, target) in requests]
+
+
+async def read_response(reader):
+    """
+    Reads a complete HTTP response, delimited by its Content-Length header.
+    :return: (status_code, body)
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    content_length = 0
+    for line in lines[1:]:
+        if line.lower().startswith('content-length:'):
+            content_length = int(line.split(':', 1)[1])
+    body = await reader.readexactly(content_length)
+    return int(lines[0].split(' ')[1]), body
+
+
+def get_error(status_code, body):
+    """
+    Returns the category of a failed request, the error message of the server being kept for client errors, so
+    that the breakdown tells invalid currencies from missing dates.
+    :return: error
+    """
+    if 400 <= status_code < 500:
+        try:
+            message = json.loads(body)['message']
+            # argument errors hold a message per argument
+            return '{} {}'.format(status_code, message if isinstance(message, str) else json.dumps(message))
+        except (ValueError, KeyError, TypeError):
+            pass
+    return str(status_code)
+
+
+class ReplayConnection(object):
+    """
+    Keep-alive connection to the server under test, opened on its first request and opened again after a failure.
+    """
+    def __init__(self, host, port):
+        """
+        ReplayConnection constructor.
+        :param host: host of the server
+        :type host: str
+        :param port: port of the server
+        :type port: int
+        """
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    def close(self):
+        """
+        Closes the connection, if open.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        (self.reader, self.writer) = (None, None)
+
+    async def send(self, target):
+        """
+        Sends a GET request for the target given in input and reads its response.
+        :param target: path and querystring of the request
+        :type target: str
+        :return: error, None if the request succeeded
+        """
+        try:
+            if self.writer is None:
+                (self.reader, self.writer) = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), REQUEST_TIMEOUT)
+            self.writer.write('GET {} HTTP/1.1\r\nHost: {}\r\n\r\n'.format(target, self.host).encode('latin-1'))
+            (status_code, body) = await asyncio.wait_for(read_response(self.reader), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.close()
+            return 'timeout'
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.close()
+            return 'connection error'
+        return None if status_code == 200 else get_error(status_code, body)
+
+
+class ReplayResults(object):
+    """
+    Latencies and errors of the requests replayed.
+    """
+    def __init__(self):
+        """
+        ReplayResults constructor.
+        """
+        self.latencies = list()     # seconds taken by each request, failed ones included
+        self.errors = dict()    # error -> number of requests
+        self.duration = 0.0
+
+    def add(self, latency, error):
+        """
+        Records a request.
+        :param latency: seconds taken by the request
+        :type latency: float
+        :param error: error of the request, None if it succeeded
+        :type error: str
+        """
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def get_percentile(self, latencies, percentile):
+        """
+        Returns a percentile of the sorted latencies given in input.
+        :return: latency
+        """
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def get_summary(self):
+        """
+        Returns the summary of the replay.
+        :return: summary
+        """
+        latencies = sorted(self.latencies)
+        failed = sum(self.errors.values())
+        summary = dict(requests=len(latencies), failed=failed, duration=self.duration,
+                       throughput=len(latencies) / self.duration if self.duration > 0 else 0.0,
+                       errors=dict(sorted(self.errors.items(), key=lambda item: -item[1])))
+        for percentile in (50, 95, 99):
+            summary['p{}_ms'.format(percentile)] = self.get_percentile(latencies, percentile) * 1000
+        summary['max_ms'] = latencies[-1] * 1000
+        return summary
+
+
+async def run_closed_loop(host, port, targets, concurrency, results):
+    """
+    Replays the targets given in input over 'concurrency' connections, each one sending the next target as soon
+    as it gets a response.
+    """
+    next_target = iter(targets)
+
+    async def run_connection():
+        connection = ReplayConnection(host, port)
+        try:
+            for target in next_target:     # the iterator is shared, each target is sent once
+                start = time.perf_counter()
+                error = await connection.send(target)
+                results.add(time.perf_counter() - start, error)
+        finally:
+            connection.close()
+
+    await asyncio.gather(*[run_connection() for i in range(concurrency)])
+
+
+async def run_open_loop(host, port, targets, arrival_times, concurrency, results):
+    """
+    Replays the targets given in input at their arrival times, whether or not the previous requests have been
+    answered, with at most 'concurrency' requests in flight.
+    """
+    idle_connections = asyncio.Queue()
+    for i in range(concurrency):
+        idle_connections.put_nowait(ReplayConnection(host, port))
+    start = time.perf_counter()
+
+    async def run_request(target, arrival_time):
+        connection = await idle_connections.get()
+        try:
+            error = await connection.send(target)
+            results.add(time.perf_counter() - (start + arrival_time), error)   # from the arrival of the request
+        finally:
+            idle_connections.put_nowait(connection)
+
+    tasks = list()
+    for (target, arrival_time) in zip(targets, arrival_times):
+        delay = start + arrival_time - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(run_request(target, arrival_time)))
+    await asyncio.gather(*tasks)
+    while idle_connections.empty() is False:
+        idle_connections.get_nowait().close()
+
+
+async def replay(url, requests, concurrency, mode, rate=None, speed=1.0):
+    """
+    Replays the requests given in input against the server at the URL given in input.
+    :return: results
+    """
+    split_url = urlsplit(url)
+    (host, port) = (split_url.hostname or '127.0.0.1', split_url.port or 80)
+    targets = [target for (request_time, target) in requests]
+    results = ReplayResults()
+    start = time.perf_counter()
+    if mode == 'closed':
+        await run_closed_loop(host, port, targets, concurrency, results)
+    else:
+        arrival_times = get_arrival_times(requests, mode, rate, speed)
+        await run_open_loop(host, port, targets, arrival_times, concurrency, results)
+    results.duration = time.perf_counter() - start
+    return results
+
+
+def print_summary(summary):
+    """
+    Prints the summary of a replay.
+    """
+    print('requests    {:10}   failed {}'.format(summary['requests'], summary['failed']))
+    print('duration    {:10.2f} s'.format(summary['duration']))
+    print('throughput  {:10.1f} requests/s'.format(summary['throughput']))
+    print('latency     p50 {:.2f} ms   p95 {:.2f} ms   p99 {:.2f} ms   max {:.2f} ms'.format(
+        summary['p50_ms'], summary['p95_ms'], summary['p99_ms'], summary['max_ms']))
+    for (error, count) in summary['errors'].items():
+        print('  {:8} {}'.format(count, error))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays a JSONL log of /api/convert requests against a server.')
+    parser.add_argument('log', help='path of the JSONL log of the requests')
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help='URL of the server (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='connections, i.e. maximum requests in flight (default: %(default)s)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--rate', type=float, help='open loop: arrivals per second, with exponential gaps')
+    mode.add_argument('--timing', action='store_true', help='open loop: arrivals at the times of the log')
+    parser.add_argument('--speed', type=float, default=1.0, help='speed-up of the times of the log (--timing)')
+    parser.add_argument('--repeat', type=int, default=1, help='times the log is replayed (default: %(default)s)')
+    parser.add_argument('--output', help='path of the JSON document the summary is written to')
+    args = parser.parse_args()
+
+    requests = read_request_log(args.log)
+    if args.repeat > 1:
+        # later rounds of the log follow the previous ones in time
+        times = [request_time for (request_time, target) in requests if request_time is not None] or [0.0]
+        span = max(times) - min(times) + 1.0
+        requests = [(request_time + span * r if request_time is not None else None, target)
+                    for r in range(args.repeat) for (request_time, target) in requests]
+    mode = 'rate' if args.rate is not None else 'timing' if args.timing is True else 'closed'
+    results = asyncio.run(replay(args.url, requests, args.concurrency, mode, args.rate, args.speed))
+    summary = dict(results.get_summary(), mode=mode, concurrency=args.concurrency, url=args.url)
+    print_summary(summary)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(1 if summary['failed'] == summary['requests'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import timeit
+from flask import request
+from flask_restful import reqparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import resources  # noqa: E402
+from server.flask_server import app  # noqa: E402
+from server.exchange_rates_store import exchange_rates_store  # noqa: E402
+from server.request_validator import convert_request_validator  # noqa: E402
+
+"""
+Measures the per-request overhead of the validation of a conversion request: the Flask-RESTful request parser built
+for every request against the precompiled request validator, the uncached date and currency checks against the
+cached date check and the known currencies of the table, and a whole request served by the Flask test client.
+Run from the project folder: python benchmarks/validation_benchmark.py
+"""
+
+QUERY_STRING = 'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10'
+
+
+def parse_with_request_parser():
+    """
+    Previous validation of the arguments of a conversion request, building the request parser for every request.
+    Kept here as the reference the request validator is measured against.
+    :return: request_args
+    """
+    parser = reqparse.RequestParser()
+    parser.add_argument('amount', type=float, required=True)
+    parser.add_argument('src-currency', type=str, required=True)
+    parser.add_argument('dest-currency', type=str, required=True)
+    parser.add_argument('reference-date', type=str, required=True)
+    parser.add_argument('fallback', type=str, required=False)
+    return parser.parse_args()
+
+
+def validate_parameters_uncached(table):
+    """
+    Previous validation of the date and of the currencies of a conversion.
+    """
+    resources.validate_date_string('2019-10-10')
+    resources.validate_currency('EUR', 'Source')
+    resources.validate_currency('USD', 'Destination')
+
+
+def validate_parameters_cached(table):
+    """
+    Current validation of the date and of the currencies of a conversion.
+    """
+    resources.is_valid_date_string('2019-10-10')
+    for (currency, role) in (('EUR', 'Source'), ('USD', 'Destination')):
+        if resources.is_known_currency(table, currency) is False:
+            resources.validate_currency(currency, role)
+
+
+def measure(function, number):
+    """
+    Returns the best time per call, in microseconds, over 5 runs of 'number' calls.
+    :return: microseconds
+    """
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    table = exchange_rates_store.get_exchange_rates()
+    with app.test_request_context('/api/convert', query_string=QUERY_STRING):
+        request_parser = measure(parse_with_request_parser, 20000)
+        request_validator = measure(lambda: convert_request_validator.get_args(request.values.getlist), 20000)
+    print('arguments          request parser {:6.2f} us   request validator {:6.2f} us'.format(
+        request_parser, request_validator))
+    uncached = measure(lambda: validate_parameters_uncached(table), 20000)
+    cached = measure(lambda: validate_parameters_cached(table), 20000)
+    print('date and currency  uncached       {:6.2f} us   cached            {:6.2f} us'.format(uncached, cached))
+    print('overhead removed per request: {:.2f} us'.format(request_parser - request_validator + uncached - cached))
+    client = app.test_client()
+    whole_request = measure(lambda: client.get('/api/convert?' + QUERY_STRING), 2000)
+    print('whole request (Flask test client): {:.2f} us'.format(whole_request))
+
+
+if __name__ == '__main__':
+    main()
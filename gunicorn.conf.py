@@ -0,0 +1,47 @@
+import gc
+from server.settings import BIND, WORKERS, THREADS, MAX_REQUESTS, MAX_REQUESTS_JITTER, GRACEFUL_TIMEOUT, \
+    REFRESH_INTERVAL
+
+"""
+Configuration of the production server, a pre-forking Gunicorn server running the Flask application.
+Run from the project folder: gunicorn
+The application and the exchange rates are loaded once by the master process, then shared by the worker processes;
+each worker process serves requests with a pool of threads and is replaced, gracefully, after MAX_REQUESTS requests.
+"""
+wsgi_app = 'wsgi:app'
+bind = BIND
+workers = WORKERS
+worker_class = 'gthread'
+threads = THREADS
+preload_app = True  # loads the application in the master process, before forking
+max_requests = MAX_REQUESTS
+max_requests_jitter = MAX_REQUESTS_JITTER
+graceful_timeout = GRACEFUL_TIMEOUT
+
+
+def when_ready(server):
+    """
+    Enables the garbage collector of the master process again, once the application is loaded. Gunicorn calls it in
+    the master process before any worker process is spawned: no worker has been forked yet, each one is forked after
+    'pre_fork' has frozen the objects of the master process, and enables its own garbage collector in 'post_fork'.
+    """
+    gc.enable()
+
+
+def pre_fork(server, worker):
+    """
+    Moves every object allocated by the master process to the permanent generation before forking, so that the
+    garbage collections of the worker process never write to them and their memory pages stay shared.
+    """
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Enables the garbage collector again and starts refreshing the exchange rates in the worker process; only the
+    worker process holding the snapshot publisher lock downloads them, the other ones map what it publishes.
+    """
+    gc.enable()
+    if REFRESH_INTERVAL > 0:
+        from server.flask_server import exchange_rates_refresher
+        exchange_rates_refresher.start()
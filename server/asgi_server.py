@@ -0,0 +1,234 @@
+import time
+import asyncio
+import json
+from urllib.parse import parse_qs
+from server.resources import get_currency_converted_float_amount_at_date
+from server.exchange_rates_store import exchange_rates_store
+from server.flask_server import init_server, get_converted_amount_dict
+from server.request_validator import convert_request_validator
+from server.static_page import help_page
+from server.http_caching import get_conversion_headers, is_not_modified
+from server.metrics import metrics_registry, record_request, METRICS_CONTENT_TYPE
+from server.json_log import log_error, access_log, get_access_entry
+from custom_api_exception.customexception import CustomAPIException
+
+"""
+Asyncio-native version of the '/', '/help', '/api/convert' and '/metrics' resources of the Flask application, as a plain ASGI
+application sharing the same conversion core. Every request is handled by a coroutine on the event loop instead of
+a thread, so the number of open connections is not bounded by the number of threads; the exchange rates
+document is read on the executor of the loop only, at startup and when it has been replaced.
+Responses to GET and HEAD requests are the same, byte for byte, as the ones of the Flask application; the
+arguments are read from the querystring only, the request body, which the Flask application also looks up for a
+JSON object, being ignored.
+Run from the project folder: uvicorn server.asgi_server:app --host 0.0.0.0 --port 8080
+"""
+
+"""
+Error messages of Flask and Flask-RESTful, returned as they are by the ASGI application.
+"""
+NOT_FOUND_PAGE = '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 3.2 Final//EN">\n<title>404 Not Found</title>\n' \
+                 '<h1>Not Found</h1>\n<p>The requested URL was not found on the server. If you entered the URL ' \
+                 'manually please check your spelling and try again.</p>\n'
+METHOD_NOT_ALLOWED_MESSAGE = 'The method is not allowed for the requested URL.'
+INTERNAL_SERVER_ERROR_MESSAGE = 'Internal Server Error'
+
+"""
+Endpoints of the ASGI application, counted and timed by the metrics.
+"""
+ENDPOINTS = ('/', '/help', '/api/convert', '/metrics')
+
+
+def reload_exchange_rates_in_background(reload):
+    """
+    Runs the reload of the exchange rates table given in input on the default executor of the event loop, so that
+    reading a replaced document or snapshot never blocks the connections served by the loop.
+    :param reload: function reloading the exchange rates table
+    :type reload: callable
+    """
+    asyncio.get_running_loop().run_in_executor(None, reload).add_done_callback(log_reload_error)
+
+
+def log_reload_error(future):
+    """
+    Logs the error raised by a reload of the exchange rates table run in the background, if any.
+    :param future: future of the reload
+    :type future: asyncio.Future
+    """
+    if (future.cancelled() is False) and (future.exception() is not None):
+        log_error(future.exception(), 'reload of the exchange rates')
+
+
+def get_converted_amount_response(query_string, if_none_match=None):
+    """
+    Converts the amount of a conversion request. The table currently loaded is served while a replaced document
+    is reloaded in the background.
+    :param query_string: querystring of the request
+    :type query_string: bytes
+    :param if_none_match: value of the If-None-Match header of the request, None if missing
+    :type if_none_match: str
+    :return: (response_dict, status_code, headers), response_dict being None for a 304 response
+    """
+    try:
+        query = parse_qs(query_string.decode('utf-8', 'replace'), keep_blank_values=True)
+        (request_args, errors) = convert_request_validator.get_args(lambda name: query.get(name, []))
+        if errors is not None:
+            return dict(message=errors), 400, []
+        # gets the table containing the latest updated exchange rates, loaded once per process
+        exchange_rates_table = exchange_rates_store.get_exchange_rates(reload_exchange_rates_in_background)
+        (converted_amount, date) = get_currency_converted_float_amount_at_date(
+            exchange_rates_table, request_args['amount'], request_args['src-currency'],
+            request_args['dest-currency'], request_args['reference-date'], request_args['fallback'])
+        response_dict = get_converted_amount_dict(converted_amount, request_args['dest-currency'],
+                                                  request_args['reference-date'], request_args['fallback'], date)
+        (etag, headers) = get_conversion_headers(exchange_rates_table, request_args['reference-date'], response_dict)
+        if is_not_modified(etag, None, if_none_match, None) is True:
+            return None, 304, headers
+        return response_dict, 200, headers
+    except CustomAPIException as cae:
+        return cae.to_dict(), cae.status_code, []
+
+
+def get_request_headers(scope):
+    """
+    Returns the headers of a request, by lowercase name.
+    :param scope: ASGI connection scope
+    :type scope: dict
+    :return: headers
+    """
+    return dict((name.decode('latin-1'), value.decode('latin-1')) for (name, value) in scope['headers'])
+
+
+async def send_response(send, method, status_code, body, content_type, headers=()):
+    """
+    Sends a complete response.
+    :param send: ASGI send callable
+    :type send: callable
+    :param method: method of the request, the body being left out of the responses to HEAD requests
+    :type method: str
+    :param status_code: status code of the response
+    :type status_code: int
+    :param body: body of the response
+    :type body: bytes
+    :param content_type: content type of the response, None for a response without content (e.g. 304)
+    :type content_type: str
+    :param headers: other (name, value) headers of the response
+    :type headers: iterable
+    """
+    response_headers = [(b'content-length', str(len(body)).encode('latin-1'))]
+    if content_type is not None:
+        response_headers.insert(0, (b'content-type', content_type.encode('latin-1')))
+    await send(dict(type='http.response.start', status=status_code,
+                    headers=response_headers +
+                    [(name.lower().encode('latin-1'), value.encode('latin-1')) for (name, value) in headers]))
+    await send(dict(type='http.response.body', body=body if method != 'HEAD' else b''))
+
+
+async def send_json_response(send, method, response_dict, status_code, headers=()):
+    """
+    Sends a JSON response, serialized as Flask-RESTful does.
+    :param send: ASGI send callable
+    :type send: callable
+    :param method: method of the request
+    :type method: str
+    :param response_dict: content of the response
+    :type response_dict: dict
+    :param status_code: status code of the response
+    :type status_code: int
+    :param headers: other (name, value) headers of the response
+    :type headers: tuple
+    """
+    await send_response(send, method, status_code, (json.dumps(response_dict) + '\n').encode('utf-8'),
+                        'application/json', headers)
+
+
+async def handle_lifespan(receive, send):
+    """
+    Initializes the application when the ASGI server starts up, out of the event loop.
+    :param receive: ASGI receive callable
+    :type receive: callable
+    :param send: ASGI send callable
+    :type send: callable
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await asyncio.get_running_loop().run_in_executor(None, init_server)
+            await send(dict(type='lifespan.startup.complete'))
+        elif message['type'] == 'lifespan.shutdown':
+            await send(dict(type='lifespan.shutdown.complete'))
+            return
+
+
+async def app(scope, receive, send):
+    """
+    ASGI application serving the '/', '/help', '/api/convert' and '/metrics' resources; every HTTP request is counted
+    and timed by the metrics of the process, and logged to the access log if enabled.
+    :param scope: ASGI connection scope
+    :type scope: dict
+    :param receive: ASGI receive callable
+    :type receive: callable
+    :param send: ASGI send callable
+    :type send: callable
+    """
+    if scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    start_time = time.time()
+    start = time.perf_counter()
+    status = [500]  # status of the response, set when the response starts
+
+    async def instrumented_send(message):
+        if message['type'] == 'http.response.start':
+            status[0] = message['status']
+        await send(message)
+
+    try:
+        await handle_request(scope, instrumented_send)
+    finally:
+        path = scope['path']
+        latency = time.perf_counter() - start
+        record_request(path if path in ENDPOINTS else 'other', scope['method'], str(status[0]), latency)
+        if access_log is not None:
+            access_log.log(get_access_entry(start_time, scope['method'], path, scope['query_string'].decode('latin-1'),
+                                            status[0], latency, exchange_rates_store.snapshot))
+
+
+async def handle_request(scope, send):
+    """
+    Serves an HTTP request.
+    :param scope: ASGI connection scope
+    :type scope: dict
+    :param send: ASGI send callable
+    :type send: callable
+    """
+    method = scope['method']
+    path = scope['path']
+    try:
+        if path not in ENDPOINTS:
+            await send_response(send, method, 404, NOT_FOUND_PAGE.encode('utf-8'), 'text/html; charset=utf-8')
+        elif method not in ('GET', 'HEAD'):
+            await send_json_response(send, method, dict(message=METHOD_NOT_ALLOWED_MESSAGE), 405,
+                                     (('allow', 'GET, HEAD'),))
+        elif path == '/api/convert':
+            # the conversion reads the in-memory table only, a replaced document being reloaded on the executor: it
+            # runs on the event loop without blocking it
+            (response_dict, status_code, headers) = get_converted_amount_response(
+                scope['query_string'], get_request_headers(scope).get('if-none-match'))
+            if response_dict is None:
+                await send_response(send, method, status_code, b'', None, headers)
+            else:
+                await send_json_response(send, method, response_dict, status_code, headers)
+        elif path == '/metrics':
+            await send_response(send, method, 200, metrics_registry.render().encode('utf-8'), METRICS_CONTENT_TYPE)
+        else:
+            # the page is served from memory, it runs on the event loop without blocking it
+            request_headers = get_request_headers(scope)
+            (status_code, body, headers) = help_page.get_response(request_headers.get('if-none-match'),
+                                                                  request_headers.get('if-modified-since'),
+                                                                  request_headers.get('accept-encoding'))
+            await send_response(send, method, status_code, body, help_page.content_type, headers)
+    except Exception as e:
+        log_error(e, '{} {}'.format(method, path))
+        await send_json_response(send, method, dict(message=INTERNAL_SERVER_ERROR_MESSAGE), 500)
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from server.settings import FETCH_TIMEOUT, FETCH_RETRIES, FETCH_BACKOFF_FACTOR, FETCH_POOL_SIZE
+
+"""
+Downloads of the ECB exchange rates documents, shared by the background refresher and by the one-off update of the
+exchange rates document.
+Every download goes through a pool of keep-alive connections, is bounded by a connect and a read timeout, and is
+retried with an exponential backoff when the server cannot be reached or answers with a server error. The body is
+streamed to a file instead of being held in memory, and a document replacing another one is written aside, checked,
+then renamed in place: a reader always finds either the previous document or the complete new one.
+"""
+
+CHUNK_SIZE = 64 * 1024  # bytes written to the file at a time
+RETRY_STATUS_CODES = (500, 502, 503, 504)   # server errors a download is retried on
+
+
+class ExchangeRatesFetcher(object):
+    """
+    Downloads documents over a pooled HTTP session with timeouts and bounded retries.
+    """
+    def __init__(self, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff_factor=FETCH_BACKOFF_FACTOR,
+                 pool_size=FETCH_POOL_SIZE):
+        """
+        ExchangeRatesFetcher constructor.
+        :param timeout: (connect, read) timeouts of each download attempt, in seconds
+        :type timeout: tuple
+        :param retries: retries of a download failing to connect, timing out or answered with a server error
+        :type retries: int
+        :param backoff_factor: factor of the exponential backoff between two retries, in seconds
+        :type backoff_factor: float
+        :param pool_size: connections kept alive per host
+        :type pool_size: int
+        """
+        self.timeout = timeout
+        self.retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUS_CODES,
+                           allowed_methods=frozenset(['GET']))
+        self.session = requests.Session()   # keeps the connections to the ECB server alive between downloads
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=self.retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        """
+        Closes the connections of the pool; the next download opens new ones.
+        """
+        self.session.close()
+
+    def download(self, url, document, headers=None):
+        """
+        Downloads the document at the URL given in input, streaming its body to the path given in input.
+        :param url: URL of the document
+        :type url: str
+        :param document: path the body is written to
+        :type document: str
+        :param headers: headers of the request (e.g. If-None-Match)
+        :type headers: dict
+        :return: response, None if the server answered 304 Not Modified
+        """
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                return None
+            if response.status_code != 200:
+                raise Exception(f'Unexpected status code {response.status_code} while downloading {url}')
+            with open(document, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())    # the document is on disk before it is renamed in place
+            # a connection closed early leaves a truncated body, which is not to replace a complete document
+            content_length = response.headers.get('Content-Length', None)
+            if (content_length is not None) and (response.raw.tell() != int(content_length)):
+                raise Exception(f'Truncated document downloaded from {url}: {response.raw.tell()} bytes '
+                                f'instead of {content_length}')
+            return response
+
+    def fetch(self, url, document, check=None, headers=None):
+        """
+        Downloads the document at the URL given in input and atomically replaces the document at the path given in
+        input with it, once checked. The document in place is left untouched if the download or the check fails.
+        :param url: URL of the document
+        :type url: str
+        :param document: path of the document to replace
+        :type document: str
+        :param check: function raising if the downloaded document, given by path, is not valid
+        :type check: callable
+        :param headers: headers of the request (e.g. If-None-Match)
+        :type headers: dict
+        :return: response, None if the server answered 304 Not Modified
+        """
+        (fd, new_document) = tempfile.mkstemp(dir=os.path.dirname(document) or '.', suffix='.xml')
+        os.close(fd)
+        try:
+            response = self.download(url, new_document, headers)
+            if response is None:
+                return None
+            if check is not None:
+                check(new_document)
+            os.replace(new_document, document)  # atomic rename, on the same file system
+            return response
+        finally:
+            if os.path.exists(new_document):
+                os.remove(new_document)
+
+
+"""
+Fetcher of the one-off updates of the exchange rates document.
+"""
+exchange_rates_fetcher = ExchangeRatesFetcher()
@@ -0,0 +1,138 @@
+import os
+import json
+from datetime import date as date_type, timedelta
+from decimal import Decimal
+from server.exchange_rates_table import ExchangeRatesTable
+
+
+class ExchangeRatesHistory(object):
+    """
+    Append-only local history of the exchange rates.
+    Each line of the history file holds the exchange rates of one date, as a JSON object, in ascending date order:
+    {"time": "2019-10-15", "rates": {"USD": "1.1007", "JPY": "119.23", ...}}
+    Rates are kept as strings, so they are read back exactly as the ECB published them. Dates are only ever
+    appended after the newest one, so nothing already stored is rewritten.
+    """
+    def __init__(self, history_document='assets/exchange_rates_history.jsonl'):
+        """
+        ExchangeRatesHistory constructor.
+        :param history_document: path of the history file
+        :type history_document: str
+        """
+        self.history_document = history_document
+        self.latest_date = None     # newest date stored, read from the file on first use
+        self.latest_date_size = None    # size of the file when the newest date was read
+
+    def iter_exchange_rates(self):
+        """
+        Streams the exchange rates stored in the history, one date at a time, with Euro set to 1.
+        :return: generator of (date, exchange_rates) pairs, exchange_rates being a dict of currency -> Decimal rate
+        """
+        with open(self.history_document, 'r') as f:
+            for line in f:
+                if line.strip() == '':
+                    continue
+                try:
+                    entry = json.loads(line)
+                    exchange_rates = dict((currency, Decimal(rate)) for (currency, rate) in entry['rates'].items())
+                    exchange_rates['EUR'] = Decimal(1.0)
+                    yield entry['time'], exchange_rates
+                except (ValueError, KeyError, TypeError, AttributeError, ArithmeticError):
+                    raise TypeError('The history document is wrongly formatted.')
+
+    def get_exchange_rates_table(self):
+        """
+        Builds the exchange rates table out of the whole history.
+        :return: exchange_rates_table
+        """
+        return ExchangeRatesTable.from_exchange_rates(self.iter_exchange_rates())
+
+    def get_latest_date(self):
+        """
+        Returns the newest date stored in the history, reading the last line of the file only, again only if the
+        file changed since it was last read.
+        :return: latest_date (YYYY-MM-DD format), None if the history is empty
+        """
+        if os.path.exists(self.history_document) is False:
+            return None
+        size = os.path.getsize(self.history_document)
+        if (self.latest_date is None) or (self.latest_date_size != size):
+            # the file may have been appended to by another process since the newest date was read
+            self.latest_date = None
+            with open(self.history_document, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                position = f.tell()
+                tail = b''
+                # reads the file backwards until the last complete line is found
+                while position > 0 and tail.strip().count(b'\n') == 0:
+                    step = min(4096, position)
+                    position -= step
+                    f.seek(position)
+                    tail = f.read(step) + tail
+            lines = tail.strip().splitlines()
+            if len(lines) > 0:
+                self.latest_date = json.loads(lines[-1])['time']
+            self.latest_date_size = size
+        return self.latest_date
+
+    def get_new_exchange_rates(self, exchange_rates):
+        """
+        Keeps, out of the exchange rates given in input, the dates which are newer than the newest date stored,
+        in ascending date order.
+        :param exchange_rates: iterable of (date, exchange_rates) pairs
+        :type exchange_rates: iterable
+        :return: list of (date, exchange_rates) pairs
+        """
+        latest_date = self.get_latest_date()
+        return sorted((date, rates) for (date, rates) in exchange_rates
+                      if (latest_date is None) or (date > latest_date))
+
+    def has_gap(self, date):
+        """
+        Checks if some business days between the newest date stored and the date given in input are missing.
+        ECB closing days other than weekends are not known, so a holiday is reported as a gap as well.
+        :param date: oldest date about to be appended (YYYY-MM-DD format)
+        :type date: str
+        :return: has_gap, True if the history is empty
+        """
+        latest_date = self.get_latest_date()
+        if latest_date is None:
+            return True
+        day = date_type.fromisoformat(latest_date) + timedelta(days=1)
+        while day < date_type.fromisoformat(date):
+            if day.weekday() < 5:
+                return True
+            day += timedelta(days=1)
+        return False
+
+    def append(self, exchange_rates):
+        """
+        Appends to the history the dates, out of the exchange rates given in input, which are newer than the newest
+        date stored. The file is flushed to disk before returning.
+        :param exchange_rates: iterable of (date, exchange_rates) pairs
+        :type exchange_rates: iterable
+        :return: list of the (date, exchange_rates) pairs appended, in ascending date order
+        """
+        new_exchange_rates = self.get_new_exchange_rates(exchange_rates)
+        if len(new_exchange_rates) == 0:
+            return new_exchange_rates
+        with open(self.history_document, 'a') as f:
+            for (date, rates) in new_exchange_rates:
+                entry = dict(time=date, rates=dict((currency, str(rate)) for (currency, rate) in rates.items()
+                                                   if currency != 'EUR'))
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.latest_date = new_exchange_rates[-1][0]
+        self.latest_date_size = os.path.getsize(self.history_document)
+        return new_exchange_rates
+
+
+def get_exchange_rates_history_table(history_document):
+    """
+    Retrieves the table of the available exchange rates from the history file.
+    :param history_document: path of the history file
+    :type history_document: str
+    :return: exchange_rates_table
+    """
+    return ExchangeRatesHistory(history_document).get_exchange_rates_table()
@@ -0,0 +1,235 @@
+import os
+import time
+import tempfile
+import threading
+from datetime import date as date_type, timedelta
+from server.resources import iter_exchange_rates
+from server.exchange_rates_fetcher import ExchangeRatesFetcher
+from server.settings import ECB_EXCHANGE_RATES_URL, ECB_DAILY_EXCHANGE_RATES_URL, ECB_HISTORY_EXCHANGE_RATES_URL, \
+    REFRESH_INTERVAL, FETCH_TIMEOUT
+from server.metrics import exchange_rates_load_histogram, refresh_counter
+from server.json_log import log_error
+
+
+class ExchangeRatesRefresher(threading.Thread):
+    """
+    Background thread which periodically downloads the exchange rates document and hot-swaps the table
+    served by an exchange rates store.
+    Each download is a conditional GET (If-None-Match / If-Modified-Since), so an unchanged document costs
+    a 304 response and no parsing. A new document is parsed and validated by the refresher thread, then moved
+    in place of the current one: request threads keep reading the previous table meanwhile and are never blocked.
+    """
+    def __init__(self, exchange_rates_store, url=ECB_EXCHANGE_RATES_URL, interval=REFRESH_INTERVAL,
+                 timeout=FETCH_TIMEOUT):
+        """
+        ExchangeRatesRefresher constructor.
+        :param exchange_rates_store: store serving the exchange rates to refresh
+        :type exchange_rates_store: ExchangeRatesStore
+        :param url: URL of the exchange rates document
+        :type url: str
+        :param interval: seconds between two refreshes
+        :type interval: float
+        :param timeout: (connect, read) timeouts of each download, in seconds
+        :type timeout: tuple
+        """
+        threading.Thread.__init__(self, name='exchange-rates-refresher', daemon=True)
+        self.exchange_rates_store = exchange_rates_store
+        self.url = url
+        self.interval = interval
+        # keeps the connections to the ECB server alive between refreshes, and retries the failed downloads
+        self.fetcher = ExchangeRatesFetcher(timeout)
+        self.validators = dict()    # URL -> (ETag, Last-Modified) of the last document downloaded from it
+        self.stop_event = threading.Event()
+
+    def get_conditional_headers(self, url):
+        """
+        Returns the headers making the download of the URL given in input conditional on the document
+        having changed since it was last downloaded.
+        :param url: URL of the document
+        :type url: str
+        :return: headers
+        """
+        headers = dict()
+        (etag, last_modified) = self.validators.get(url, (None, None))
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def download(self, url, document, conditional=True):
+        """
+        Downloads the document at the URL given in input to the path given in input.
+        :param url: URL of the document
+        :type url: str
+        :param document: path the document is written to
+        :type document: str
+        :param conditional: whether to skip the download if the document did not change since the last one
+        :type conditional: bool
+        :return: response, None if the document did not change
+        """
+        headers = self.get_conditional_headers(url) if conditional is True else dict()
+        return self.fetcher.download(url, document, headers)
+
+    def remember_validators(self, url, response):
+        """
+        Keeps the ETag and Last-Modified headers of a processed download, for the next conditional download.
+        :param url: URL of the document
+        :type url: str
+        :param response: response of the download
+        :type response: requests.Response
+        """
+        self.validators[url] = (response.headers.get('ETag', None), response.headers.get('Last-Modified', None))
+
+    def get_temporary_document(self):
+        """
+        Creates an empty temporary file next to the document of the store, so that it can be renamed in place
+        atomically.
+        :return: path of the temporary file
+        """
+        document = self.exchange_rates_store.exchange_rates_document
+        (fd, temporary_document) = tempfile.mkstemp(dir=os.path.dirname(document) or '.', suffix='.xml')
+        os.close(fd)
+        return temporary_document
+
+    def refresh(self):
+        """
+        Refreshes the exchange rates, if no other process serving the same store is publishing them: the other
+        processes pick up the exchange rates published without downloading them.
+        :return: True if new exchange rates have been loaded, False otherwise
+        """
+        publisher_lock = self.exchange_rates_store.publisher_lock
+        if publisher_lock.acquire(False) is False:
+            refresh_counter.inc(('skipped',))
+            return False    # another process publishes the exchange rates
+        try:
+            refreshed = self.refresh_exchange_rates()
+            refresh_counter.inc(('updated',) if refreshed is True else ('unchanged',))
+            return refreshed
+        except Exception as e:
+            refresh_counter.inc(('failed',))
+            raise e
+        finally:
+            publisher_lock.release()
+
+    def refresh_exchange_rates(self):
+        """
+        Downloads the exchange rates document if it changed since the last download and serves its exchange rates.
+        :return: True if new exchange rates have been loaded, False if the document did not change
+        """
+        new_document = self.get_temporary_document()
+        try:
+            response = self.download(self.url, new_document)
+            if response is None:
+                return False
+            # parses the new document: a wrongly formatted document raises and leaves the current one in place
+            start = time.perf_counter()
+            exchange_rates = self.exchange_rates_store.loader(new_document)
+            exchange_rates_load_histogram.observe(time.perf_counter() - start, ('refresh',))
+            self.exchange_rates_store.replace_document(new_document, exchange_rates)
+        finally:
+            if os.path.exists(new_document):
+                os.remove(new_document)
+        self.remember_validators(self.url, response)
+        return True
+
+    def run(self):
+        """
+        Refreshes the exchange rates every 'interval' seconds, until the refresher is stopped.
+        """
+        while self.stop_event.wait(self.interval) is False:
+            try:
+                self.refresh()
+            except Exception as e:
+                log_error(e, 'refresh of the exchange rates')
+
+    def stop(self):
+        """
+        Stops the refresher, without waiting for a download in progress.
+        """
+        self.stop_event.set()
+
+
+class ExchangeRatesHistoryRefresher(ExchangeRatesRefresher):
+    """
+    Background thread which keeps the local history of the exchange rates updated.
+    Each refresh downloads the small ECB daily document and appends its date to the history; the 90-day document,
+    or the full history document if the history is older than that, is downloaded only when some business days
+    are missing between the newest date stored and the daily one. Downloads and parsing therefore scale with the
+    new data, not with the size of the history.
+    """
+    def __init__(self, exchange_rates_store, exchange_rates_history, url=ECB_DAILY_EXCHANGE_RATES_URL,
+                 backfill_url=ECB_EXCHANGE_RATES_URL, full_history_url=ECB_HISTORY_EXCHANGE_RATES_URL,
+                 interval=REFRESH_INTERVAL, timeout=FETCH_TIMEOUT):
+        """
+        ExchangeRatesHistoryRefresher constructor.
+        :param exchange_rates_store: store serving the history document
+        :type exchange_rates_store: ExchangeRatesStore
+        :param exchange_rates_history: local history of the exchange rates
+        :type exchange_rates_history: ExchangeRatesHistory
+        :param url: URL of the daily exchange rates document
+        :type url: str
+        :param backfill_url: URL of the 90-day exchange rates document
+        :type backfill_url: str
+        :param full_history_url: URL of the full history exchange rates document
+        :type full_history_url: str
+        :param interval: seconds between two refreshes
+        :type interval: float
+        :param timeout: (connect, read) timeouts of each download, in seconds
+        :type timeout: tuple
+        """
+        ExchangeRatesRefresher.__init__(self, exchange_rates_store, url, interval, timeout)
+        self.exchange_rates_history = exchange_rates_history
+        self.backfill_url = backfill_url
+        self.full_history_url = full_history_url
+
+    def download_exchange_rates(self, url, conditional=True):
+        """
+        Downloads and parses the exchange rates document at the URL given in input.
+        :param url: URL of the document
+        :type url: str
+        :param conditional: whether to skip the download if the document did not change since the last one
+        :type conditional: bool
+        :return: (exchange_rates, response), (None, None) if the document did not change
+        """
+        document = self.get_temporary_document()
+        try:
+            response = self.download(url, document, conditional)
+            if response is None:
+                return None, None
+            return list(iter_exchange_rates(document)), response
+        finally:
+            os.remove(document)
+
+    def get_backfill_url(self, date):
+        """
+        Returns the URL of the smallest document holding the dates missing before the date given in input.
+        :param date: oldest date about to be appended (YYYY-MM-DD format)
+        :type date: str
+        :return: url
+        """
+        latest_date = self.exchange_rates_history.get_latest_date()
+        if (latest_date is not None) and \
+                (date_type.fromisoformat(date) - date_type.fromisoformat(latest_date) < timedelta(days=85)):
+            return self.backfill_url
+        return self.full_history_url
+
+    def refresh_exchange_rates(self):
+        """
+        Appends the dates published since the last refresh to the history and to the table served by the store.
+        :return: True if new exchange rates have been loaded, False otherwise
+        """
+        (exchange_rates, response) = self.download_exchange_rates(self.url)
+        if exchange_rates is None:
+            return False
+        new_exchange_rates = self.exchange_rates_history.get_new_exchange_rates(exchange_rates)
+        if (len(new_exchange_rates) > 0) and (self.exchange_rates_history.has_gap(new_exchange_rates[0][0]) is True):
+            # fills the gap with a larger document, the daily one taking precedence on the dates both hold
+            backfill_url = self.get_backfill_url(new_exchange_rates[0][0])
+            (backfill_exchange_rates, backfill_response) = self.download_exchange_rates(backfill_url, False)
+            backfill_exchange_rates = dict(backfill_exchange_rates)
+            backfill_exchange_rates.update(exchange_rates)
+            new_exchange_rates = self.exchange_rates_history.get_new_exchange_rates(backfill_exchange_rates.items())
+        appended = self.exchange_rates_store.append_exchange_rates(self.exchange_rates_history, new_exchange_rates)
+        self.remember_validators(self.url, response)
+        return len(appended) > 0
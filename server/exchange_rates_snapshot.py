@@ -0,0 +1,185 @@
+import os
+import sys
+import mmap
+import struct
+import tempfile
+import threading
+from server.exchange_rates_table import ExchangeRatesTable, RATE_DIGITS
+
+"""
+Binary snapshot of an exchange rates table, written next to the document the table has been parsed out of, so that
+a process starting up maps the snapshot instead of parsing the document again.
+The snapshot is a fixed layout, in the byte order of the machine which wrote it:
+    - header: magic, mtime (ns) and size of the document, number of dates, number of currencies,
+      item size of the dates, RATE_DIGITS
+    - currencies: 3 ASCII bytes each, padded to 8 bytes
+    - dates: one ordinal per date, in ascending order
+    - scaled_rates: row-major matrix of 8 bytes integers, one row per date and one column per currency
+    - mask: row-major matrix of 1 byte flags
+The table built out of a snapshot reads its buffers straight from the mapped file, nothing is copied, so all the
+processes of a host mapping the same snapshot share one copy of the exchange rates in the page cache.
+"""
+SNAPSHOT_MAGIC = b'XRSNAP' + (b'LE' if sys.byteorder == 'little' else b'BE')
+SNAPSHOT_HEADER = struct.Struct('=8sqqqqqq')
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None    # not a POSIX system, the snapshot publisher lock is disabled
+
+
+def get_snapshot_document(exchange_rates_document):
+    """
+    Returns the path of the snapshot of the document given in input, in the same folder.
+    :param exchange_rates_document: path of the exchange rates document
+    :type exchange_rates_document: str
+    :return: snapshot_document
+    """
+    return os.path.splitext(exchange_rates_document)[0] + '.snapshot'
+
+
+def get_document_key(signature):
+    """
+    Returns the key identifying the version of the document a snapshot has been written from.
+    The inode is left out of the document signature, so that a copied document keeps its snapshot.
+    :param signature: (inode, mtime (ns), size) signature of the document, as returned by the exchange rates store
+    :type signature: tuple
+    :return: (mtime (ns), size) key
+    """
+    return signature[1], signature[2]
+
+
+def get_padded_length(length):
+    """
+    Rounds the length given in input up to a multiple of 8 bytes, so that every buffer of the snapshot is aligned.
+    :param length: length in bytes
+    :type length: int
+    :return: padded_length
+    """
+    return (length + 7) // 8 * 8
+
+
+def write_exchange_rates_snapshot(snapshot_document, exchange_rates_table, document_key):
+    """
+    Writes the snapshot of the table given in input, replacing the previous snapshot in one step.
+    :param snapshot_document: path of the snapshot
+    :type snapshot_document: str
+    :param exchange_rates_table: table to write
+    :type exchange_rates_table: ExchangeRatesTable
+    :param document_key: key of the document the table has been parsed out of
+    :type document_key: tuple
+    """
+    currencies = ''.join(exchange_rates_table.currencies).encode('ascii')
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, document_key[0], document_key[1], len(exchange_rates_table),
+                                  exchange_rates_table.width, exchange_rates_table.dates.itemsize, RATE_DIGITS)
+    (fd, temporary_document) = tempfile.mkstemp(dir=os.path.dirname(snapshot_document) or '.', suffix='.snapshot')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(currencies.ljust(get_padded_length(len(currencies)), b'\0'))
+            for buffer in (exchange_rates_table.dates, exchange_rates_table.scaled_rates, exchange_rates_table.mask):
+                f.write(buffer.tobytes().ljust(get_padded_length(buffer.nbytes), b'\0'))
+        os.replace(temporary_document, snapshot_document)
+    except Exception as e:
+        os.remove(temporary_document)
+        raise e
+
+
+def read_exchange_rates_snapshot(snapshot_document, document_key):
+    """
+    Maps the snapshot written out of the version of the document identified by the key given in input.
+    :param snapshot_document: path of the snapshot
+    :type snapshot_document: str
+    :param document_key: key of the current version of the document
+    :type document_key: tuple
+    :return: exchange_rates_table, None if there is no snapshot of that version of the document
+    """
+    try:
+        with open(snapshot_document, 'rb') as f:
+            # the mapping outlives the file descriptor, and stays valid if the snapshot is replaced
+            mapped_snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None     # missing or empty snapshot
+    if len(mapped_snapshot) < SNAPSHOT_HEADER.size:
+        return None
+    (magic, mtime, size, length, width, date_itemsize, rate_digits) = SNAPSHOT_HEADER.unpack_from(mapped_snapshot)
+    if (magic != SNAPSHOT_MAGIC) or ((mtime, size) != tuple(document_key)) or \
+            (date_itemsize != struct.calcsize('l')) or (rate_digits != RATE_DIGITS):
+        return None     # stale snapshot, or written by a different platform or version
+    currencies_end = SNAPSHOT_HEADER.size + get_padded_length(3 * width)
+    dates_end = currencies_end + get_padded_length(date_itemsize * length)
+    scaled_rates_end = dates_end + 8 * width * length
+    if len(mapped_snapshot) < scaled_rates_end + get_padded_length(width * length):
+        return None     # truncated snapshot
+    view = memoryview(mapped_snapshot)
+    currencies = bytes(view[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + 3 * width]).decode('ascii')
+    return ExchangeRatesTable(view[currencies_end:currencies_end + date_itemsize * length].cast('l'),
+                              [currencies[i:i + 3] for i in range(0, 3 * width, 3)],
+                              view[dates_end:scaled_rates_end].cast('q'),
+                              view[scaled_rates_end:scaled_rates_end + width * length])
+
+
+class SnapshotPublisherLock(object):
+    """
+    Lock electing, among the processes serving the same snapshot, the one which publishes its new versions.
+    The lock is an advisory lock on a file next to the snapshot, so it is held by one process of the host at a
+    time and released by the operating system if that process dies. Within a process it is reentrant: the
+    threads of a process are serialized by the exchange rates store, not by this lock.
+    Where file locks are not available, every process publishes on its own.
+    """
+    def __init__(self, lock_document):
+        """
+        SnapshotPublisherLock constructor.
+        :param lock_document: path of the lock file, None to disable the lock
+        :type lock_document: str
+        """
+        self.lock_document = lock_document
+        self.fd = None  # file descriptor holding the lock, opened on first use
+        self.pid = None     # process which opened the file descriptor
+        self.depth = 0  # number of acquisitions not yet released within the process
+        self.depth_lock = threading.Lock()
+
+    def acquire(self, blocking=True):
+        """
+        Acquires the lock.
+        :param blocking: whether to wait for the process holding the lock to release it
+        :type blocking: bool
+        :return: True if the lock has been acquired, False otherwise
+        """
+        with self.depth_lock:
+            if self.pid != os.getpid():
+                # a forked process shares the file descriptor, and so the lock, of its parent: opens its own
+                if self.fd is not None:
+                    os.close(self.fd)
+                (self.fd, self.pid, self.depth) = (None, os.getpid(), 0)
+            if (self.depth == 0) and (self.lock_document is not None) and (fcntl is not None):
+                if self.fd is None:
+                    self.fd = os.open(self.lock_document, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(self.fd, fcntl.LOCK_EX if blocking is True else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False    # held by another process
+            self.depth += 1
+            return True
+
+    def release(self):
+        """
+        Releases the lock.
+        """
+        with self.depth_lock:
+            self.depth -= 1
+            if (self.depth == 0) and (self.fd is not None):
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def __enter__(self):
+        """
+        Acquires the lock, waiting for the process holding it.
+        """
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        """
+        Releases the lock.
+        """
+        self.release()
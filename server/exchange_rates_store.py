@@ -0,0 +1,263 @@
+import os
+import time
+import functools
+import threading
+from server.resources import get_exchange_rates_table
+from server.exchange_rates_history import get_exchange_rates_history_table
+from server.exchange_rates_snapshot import get_snapshot_document, get_document_key, read_exchange_rates_snapshot, \
+    write_exchange_rates_snapshot, SnapshotPublisherLock
+from server.settings import EXCHANGE_RATES_HISTORY_DOCUMENT, EXCHANGE_RATES_CHECK_INTERVAL
+from server.metrics import exchange_rates_load_histogram
+from server.json_log import log_error
+
+
+class ExchangeRatesStore(object):
+    """
+    Process-wide holder of the exchange rates parsed out of the exchange rates document.
+    The document is parsed once and every request reads the same in-memory table; when the document
+    is replaced on disk, the new table is built aside and swapped in with a single reference assignment,
+    so readers always see either the old or the new table, never a partially loaded one.
+    Readers do not check the document on every request: the document is checked at most once every
+    'check_interval' seconds, and the refresher of the process swaps the tables it loads in directly, so serving
+    a request costs no system call. A document replaced by another process is served within 'check_interval'.
+    If a snapshot document is given, every table loaded is also written to it as a binary snapshot, and a later
+    load of the same version of the document maps the snapshot instead of parsing the document.
+    The stores of the processes of a host serving the same snapshot share it: the process holding the publisher
+    lock parses and publishes each new version, the other ones map it as soon as it is published, so the
+    exchange rates are held once per host whatever the number of processes.
+    """
+    def __init__(self, exchange_rates_document='assets/exchange_rates.xml', loader=get_exchange_rates_table,
+                 snapshot_document=None, check_interval=EXCHANGE_RATES_CHECK_INTERVAL):
+        """
+        ExchangeRatesStore constructor.
+        :param exchange_rates_document: path of the exchange rates document
+        :type exchange_rates_document: str
+        :param loader: function building the exchange rates table out of the document path
+        :type loader: callable
+        :param snapshot_document: path of the binary snapshot of the table, None to always parse the document
+        :type snapshot_document: str
+        :param check_interval: minimum number of seconds between two checks of the document by the readers
+        :type check_interval: float
+        """
+        self.exchange_rates_document = exchange_rates_document
+        self.loader = loader
+        self.snapshot_document = snapshot_document
+        # elects the process publishing the snapshot, disabled without snapshot
+        self.publisher_lock = SnapshotPublisherLock(snapshot_document + '.lock' if snapshot_document else None)
+        self.lock = threading.Lock()    # serializes reloads, readers never take it
+        self.snapshot = None    # (document signature, exchange rates) pair currently served
+        self.failed_signature = None    # signature of the last document which could not be loaded
+        self.loaded_at = None   # time the snapshot currently served has been swapped in
+        self.check_interval = check_interval
+        self.checked_at = None  # monotonic time of the last check of the document by a reader
+
+    def get_document_signature(self, document=None):
+        """
+        Returns the signature identifying the current version of the exchange rates document on disk.
+        :param document: path of the document, None for the exchange rates document of the store
+        :type document: str
+        :return: signature
+        """
+        stat = os.stat(self.exchange_rates_document if document is None else document)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get_exchange_rates(self, reload_in_background=None):
+        """
+        Returns the exchange rates table currently loaded, loading it first if the document
+        has never been loaded or, once every 'check_interval' seconds, if it has been replaced since the last load.
+        While another thread is loading a new version of the document, the table currently loaded is returned
+        instead of waiting for the new one.
+        :param reload_in_background: function running the reload it is given out of the calling thread (e.g. on the
+        executor of an event loop), the table currently loaded being returned meanwhile; None to reload in the
+        calling thread. The first load always happens in the calling thread.
+        :type reload_in_background: callable
+        :return: exchange_rates
+        """
+        snapshot = self.snapshot    # single read, the snapshot is never mutated in place
+        if (snapshot is not None) and (self.is_check_due() is False):
+            return snapshot[1]
+        if snapshot is None:
+            snapshot = self.reload()
+        elif self.is_document_replaced(snapshot) is True:
+            if reload_in_background is None:
+                snapshot = self.reload(blocking=False)
+            else:
+                reload_in_background(functools.partial(self.reload, blocking=False))
+        return snapshot[1]
+
+    def is_check_due(self):
+        """
+        Checks whether 'check_interval' seconds have passed since the last check of the document, starting a new
+        interval if so: the threads calling it within the same interval get False.
+        :return: True if the document has to be checked, False otherwise
+        """
+        now = time.monotonic()
+        checked_at = self.checked_at
+        if (checked_at is not None) and (now - checked_at < self.check_interval):
+            return False
+        self.checked_at = now
+        return True
+
+    def is_document_replaced(self, snapshot):
+        """
+        Checks whether the exchange rates document has been replaced since the snapshot given in input was loaded.
+        A document which cannot be read, or which could not be loaded, is not reloaded.
+        :param snapshot: snapshot currently served
+        :type snapshot: tuple
+        :return: True if the document has to be reloaded, False otherwise
+        """
+        try:
+            signature = self.get_document_signature()
+        except OSError:
+            return False    # keeps serving the last loaded table
+        return (snapshot[0] != signature) and (signature != self.failed_signature)
+
+    def reload(self, blocking=True):
+        """
+        Parses the exchange rates document and atomically replaces the table currently served.
+        The snapshot of the document is mapped instead, if it is current; otherwise the document is parsed by
+        the process holding the publisher lock, which then publishes its snapshot.
+        If the document cannot be parsed while a table is already loaded, the loaded table is kept.
+        :param blocking: whether to wait for a reload already in progress in another thread or process
+        :type blocking: bool
+        :return: snapshot
+        """
+        if self.lock.acquire(blocking) is False:
+            return self.snapshot    # another thread is loading the document, keeps serving the current table
+        try:
+            signature = self.get_document_signature()
+            snapshot = self.snapshot
+            if (snapshot is not None) and (snapshot[0] == signature):
+                return snapshot     # another thread already loaded this version
+            exchange_rates = self.read_snapshot(signature)
+            if exchange_rates is not None:
+                return self.swap(signature, exchange_rates)
+            if self.publisher_lock.acquire(blocking) is False:
+                return self.snapshot    # another process is publishing the document, keeps serving the current table
+            try:
+                # the process which held the publisher lock may have just published this version
+                signature = self.get_document_signature()
+                exchange_rates = self.read_snapshot(signature)
+                if exchange_rates is not None:
+                    return self.swap(signature, exchange_rates)
+                try:
+                    start = time.perf_counter()
+                    exchange_rates = self.loader(self.exchange_rates_document)
+                    exchange_rates_load_histogram.observe(time.perf_counter() - start, ('document',))
+                except Exception as e:
+                    if snapshot is None:
+                        raise e     # nothing to fall back on
+                    self.failed_signature = signature
+                    log_error(e, 'load of the exchange rates document')
+                    return snapshot
+                self.write_snapshot(signature, exchange_rates)
+                return self.swap(signature, exchange_rates)
+            finally:
+                self.publisher_lock.release()
+        finally:
+            self.lock.release()
+
+    def replace_document(self, new_document, exchange_rates):
+        """
+        Moves the document given in input in place of the exchange rates document and serves the exchange rates
+        already parsed out of it, so that the new document is not parsed twice. The rename and the swap happen
+        under the reload lock, so readers keep getting the previous table until the new one is in place.
+        The snapshot is published before the rename, so the other processes find it as soon as they see the
+        new document.
+        :param new_document: path of the new exchange rates document, on the same file system
+        :type new_document: str
+        :param exchange_rates: exchange rates table parsed out of the new document
+        :type exchange_rates: ExchangeRatesTable
+        :return: snapshot
+        """
+        with self.lock, self.publisher_lock:
+            signature = self.get_document_signature(new_document)   # the rename keeps inode and mtime
+            self.write_snapshot(signature, exchange_rates)
+            os.replace(new_document, self.exchange_rates_document)
+            return self.swap(signature, exchange_rates)
+
+    def append_exchange_rates(self, exchange_rates_history, exchange_rates):
+        """
+        Appends the exchange rates given in input to the history document served by the store and extends the
+        table currently served with the dates appended, without parsing the whole history again.
+        The append and the swap happen under the reload lock, so readers keep getting the previous table until
+        the extended one is in place.
+        :param exchange_rates_history: history whose document is served by the store
+        :type exchange_rates_history: ExchangeRatesHistory
+        :param exchange_rates: iterable of (date, exchange_rates) pairs
+        :type exchange_rates: iterable
+        :return: list of the (date, exchange_rates) pairs appended
+        """
+        with self.lock, self.publisher_lock:
+            appended = exchange_rates_history.append(exchange_rates)
+            if len(appended) > 0:
+                snapshot = self.snapshot
+                start = time.perf_counter()
+                if snapshot is None:
+                    table = self.loader(self.exchange_rates_document)
+                else:
+                    table = snapshot[1].append_exchange_rates(appended)
+                exchange_rates_load_histogram.observe(time.perf_counter() - start, ('append',))
+                signature = self.get_document_signature()
+                self.write_snapshot(signature, table)
+                self.swap(signature, table)
+        return appended
+
+    def read_snapshot(self, signature):
+        """
+        Maps the snapshot of the version of the document identified by the signature given in input.
+        :param signature: signature of the document
+        :type signature: tuple
+        :return: exchange_rates, None if the snapshot is disabled, missing or stale
+        """
+        if self.snapshot_document is None:
+            return None
+        start = time.perf_counter()
+        exchange_rates = read_exchange_rates_snapshot(self.snapshot_document, get_document_key(signature))
+        if exchange_rates is not None:
+            exchange_rates_load_histogram.observe(time.perf_counter() - start, ('snapshot',))
+        return exchange_rates
+
+    def write_snapshot(self, signature, exchange_rates):
+        """
+        Writes the snapshot of the exchange rates parsed out of the version of the document identified by the
+        signature given in input. A snapshot which cannot be written is reported and skipped, the document
+        being parsed again on the next start.
+        :param signature: signature of the document the exchange rates have been parsed out of
+        :type signature: tuple
+        :param exchange_rates: exchange rates table to write
+        :type exchange_rates: ExchangeRatesTable
+        """
+        if self.snapshot_document is None:
+            return
+        try:
+            write_exchange_rates_snapshot(self.snapshot_document, exchange_rates, get_document_key(signature))
+        except Exception as e:
+            log_error(e, 'write of the exchange rates snapshot')
+
+    def swap(self, signature, exchange_rates):
+        """
+        Replaces the snapshot currently served. Must be called holding the reload lock.
+        :param signature: signature of the document the exchange rates have been parsed out of
+        :type signature: tuple
+        :param exchange_rates: exchange rates table to serve
+        :type exchange_rates: ExchangeRatesTable
+        :return: snapshot
+        """
+        snapshot = (signature, exchange_rates)
+        self.snapshot = snapshot    # atomic swap
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()  # the document has just been checked
+        self.failed_signature = None
+        return snapshot
+
+
+"""
+Exchange rates store shared by every request handled by the process, serving either the local history of the
+exchange rates, if enabled, or the last downloaded ECB document.
+"""
+if EXCHANGE_RATES_HISTORY_DOCUMENT != '':
+    exchange_rates_store = ExchangeRatesStore(EXCHANGE_RATES_HISTORY_DOCUMENT, get_exchange_rates_history_table,
+                                              get_snapshot_document(EXCHANGE_RATES_HISTORY_DOCUMENT))
+else:
+    exchange_rates_store = ExchangeRatesStore(snapshot_document=get_snapshot_document('assets/exchange_rates.xml'))
@@ -0,0 +1,325 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as date_type
+from itertools import chain
+from functools import lru_cache
+from decimal import Decimal
+from types import MappingProxyType
+
+"""
+Number of decimal digits kept for every exchange rate: rates are stored as integers scaled by 10^RATE_DIGITS.
+ECB reference rates never have more than 6 decimal digits.
+"""
+RATE_DIGITS = 9
+RATE_SCALE = 10 ** RATE_DIGITS
+
+"""
+Reference date resolving to the newest date available, and fallback resolving a date without exchange rates
+to the closest prior date with exchange rates.
+"""
+LATEST_DATE = 'latest'
+PREVIOUS_FALLBACK = 'previous'
+
+
+class ExchangeRatesTable(object):
+    """
+    Validated, immutable columnar store of the available exchange rates.
+    Dates and currencies are indexed once, when the table is built, and the exchange rates are kept in a dense
+    row-major matrix of scaled integers (one row per date, one column per currency), together with a mask
+    flagging the currencies which have no exchange rate at a given date. Lookups are plain integer indexing.
+    Every exchange rate is checked when the table is built, so the conversion functions can trust its content
+    without walking it again.
+    """
+    __slots__ = ('dates', 'currencies', 'known_currencies', 'currency_indexes', 'scaled_rates', 'mask', 'width')
+
+    def __init__(self, dates, currencies, scaled_rates, mask):
+        """
+        ExchangeRatesTable constructor. Use 'from_exchange_rates' to build a table out of parsed exchange rates.
+        :param dates: ascending ordinals of the available dates
+        :type dates: array
+        :param currencies: ISO codes of the available currencies
+        :type currencies: tuple
+        :param scaled_rates: row-major matrix of the exchange rates, scaled by RATE_SCALE
+        :type scaled_rates: array
+        :param mask: row-major matrix flagging with 1 the available exchange rates
+        :type mask: bytearray
+        """
+        # the buffers are exposed as read-only views, the table cannot be altered once built
+        object.__setattr__(self, 'dates', memoryview(dates).toreadonly())
+        object.__setattr__(self, 'currencies', tuple(currencies))
+        object.__setattr__(self, 'known_currencies', frozenset(currencies))   # validated ISO codes, for membership tests
+        object.__setattr__(self, 'currency_indexes', MappingProxyType(dict((c, i) for (i, c) in enumerate(currencies))))
+        object.__setattr__(self, 'scaled_rates', memoryview(scaled_rates).toreadonly())
+        object.__setattr__(self, 'mask', memoryview(mask).toreadonly())
+        object.__setattr__(self, 'width', len(currencies))     # number of columns of the matrix
+
+    def __setattr__(self, name, value):
+        """
+        Prevents the attributes of the table from being replaced.
+        """
+        raise AttributeError('ExchangeRatesTable is immutable.')
+
+    def __delattr__(self, name):
+        """
+        Prevents the attributes of the table from being deleted.
+        """
+        raise AttributeError('ExchangeRatesTable is immutable.')
+
+    @classmethod
+    def from_exchange_rates(cls, exchange_rates):
+        """
+        Builds the table out of (date, exchange_rates) pairs, as the ones returned by 'iter_exchange_rates'.
+        A date appearing more than once keeps the exchange rates of its last occurrence.
+        Raises TypeError if a date is not in YYYY-MM-DD format, a currency is not a 3 letters code or
+        a rate is not a positive Decimal with at most RATE_DIGITS decimal digits.
+        :param exchange_rates: iterable of (date, exchange_rates) pairs, the date being a YYYY-MM-DD string and
+        exchange_rates a dict of currency -> Decimal rate
+        :type exchange_rates: iterable
+        :return: exchange_rates_table
+        """
+        date_cells = dict()     # ordinal of each date -> (start, end) range of its cells
+        cell_currencies = array('l')   # currency index of each parsed cell
+        cell_rates = array('q')     # scaled exchange rate of each parsed cell
+        currency_indexes = dict()   # currency -> index, in order of appearance
+        for (date, rates) in exchange_rates:
+            if (type(date) is not str) or (len(date) != 10) or (isinstance(rates, dict) is False):
+                raise TypeError('The XML document is wrongly formatted.')
+            try:
+                ordinal = date_type.fromisoformat(date).toordinal()
+            except ValueError:
+                raise TypeError('The XML document is wrongly formatted.')
+            start = len(cell_rates)
+            for (currency, rate) in rates.items():
+                if (type(currency) is not str) or (len(currency) != 3) or (currency.isalpha() is False):
+                    raise TypeError('The XML document is wrongly formatted.')
+                if (isinstance(rate, Decimal) is False) or (rate.is_finite() is False) or (rate <= 0):
+                    raise TypeError('The XML document is wrongly formatted.')
+                scaled_rate = rate.scaleb(RATE_DIGITS)
+                if (scaled_rate != scaled_rate.to_integral_value()) or (scaled_rate >= 2 ** 63):
+                    raise TypeError('The XML document is wrongly formatted.')  # not representable by the matrix
+                cell_currencies.append(currency_indexes.setdefault(currency, len(currency_indexes)))
+                cell_rates.append(int(scaled_rate))
+            date_cells[ordinal] = (start, len(cell_rates))
+
+        # sorts dates and currencies and moves each cell to its place in the dense matrix
+        dates = array('l', sorted(date_cells))
+        currencies = tuple(sorted(currency_indexes))
+        columns = [0] * len(currency_indexes)
+        for (column, currency) in enumerate(currencies):
+            columns[currency_indexes[currency]] = column
+        width = len(currencies)
+        scaled_rates = array('q', bytes(8 * width * len(dates)))
+        mask = bytearray(width * len(dates))
+        for (row, ordinal) in enumerate(dates):
+            (start, end) = date_cells[ordinal]
+            for cell in range(start, end):
+                position = row * width + columns[cell_currencies[cell]]
+                scaled_rates[position] = cell_rates[cell]
+                mask[position] = 1
+        return cls(dates, currencies, scaled_rates, mask)
+
+    def __len__(self):
+        """
+        Returns the number of dates available in the table.
+        :return: length
+        """
+        return len(self.dates)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def get_ordinal(date):
+        """
+        Returns the proleptic Gregorian ordinal of the date given in input, cached by date string.
+        :param date: date (YYYY-MM-DD format)
+        :type date: str
+        :return: ordinal, None if the date is not in YYYY-MM-DD format
+        """
+        if (type(date) is not str) or (len(date) != 10):
+            return None
+        try:
+            return date_type.fromisoformat(date).toordinal()
+        except ValueError:
+            return None
+
+    def get_date_index(self, date):
+        """
+        Returns the row of the matrix holding the exchange rates of the date given in input.
+        :param date: date of the exchange rates (YYYY-MM-DD format)
+        :type date: str
+        :return: date_index, None if the date is not available
+        """
+        ordinal = self.get_ordinal(date)
+        if ordinal is None:
+            return None
+        date_index = bisect_left(self.dates, ordinal)
+        if (date_index < len(self.dates)) and (self.dates[date_index] == ordinal):
+            return date_index
+        return None
+
+    def resolve_date_index(self, date, fallback=None):
+        """
+        Returns the row of the matrix holding the exchange rates to use for the date given in input, with a single
+        binary search over the dates.
+        :param date: date of the exchange rates (YYYY-MM-DD format), or LATEST_DATE for the newest date available
+        :type date: str
+        :param fallback: PREVIOUS_FALLBACK to use the closest prior date when the date is not available, None to use
+        the date only
+        :type fallback: str
+        :return: date_index, None if no date can be used
+        """
+        if date == LATEST_DATE:
+            return len(self.dates) - 1 if len(self.dates) > 0 else None
+        if fallback != PREVIOUS_FALLBACK:
+            return self.get_date_index(date)
+        ordinal = self.get_ordinal(date)
+        if ordinal is None:
+            return None
+        date_index = bisect_right(self.dates, ordinal) - 1  # newest date not after the one given in input
+        return date_index if date_index >= 0 else None
+
+    def get_date_indexes(self, from_date, to_date):
+        """
+        Returns the rows of the matrix holding the exchange rates of the dates between the two dates given in input,
+        both included.
+        :param from_date: oldest date of the range (YYYY-MM-DD format)
+        :type from_date: str
+        :param to_date: newest date of the range (YYYY-MM-DD format)
+        :type to_date: str
+        :return: date_indexes, range of rows in ascending date order, None if a date is not in YYYY-MM-DD format
+        """
+        from_ordinal = self.get_ordinal(from_date)
+        to_ordinal = self.get_ordinal(to_date)
+        if (from_ordinal is None) or (to_ordinal is None):
+            return None
+        return range(bisect_left(self.dates, from_ordinal), bisect_right(self.dates, to_ordinal))
+
+    def get_date(self, date_index):
+        """
+        Returns the date, in YYYY-MM-DD format, of the row given in input.
+        :param date_index: row of the matrix
+        :type date_index: int
+        :return: date
+        """
+        return date_type.fromordinal(self.dates[date_index]).isoformat()
+
+    def get_currency_index(self, currency):
+        """
+        Returns the column of the matrix holding the exchange rates of the currency given in input.
+        :param currency: ISO code of the currency
+        :type currency: str
+        :return: currency_index, None if the currency is not available
+        """
+        return self.currency_indexes.get(currency, None)
+
+    def get_scaled_rate(self, date_index, currency_index):
+        """
+        Returns the exchange rate, scaled by RATE_SCALE, at the given row and column of the matrix.
+        :param date_index: row of the matrix
+        :type date_index: int
+        :param currency_index: column of the matrix
+        :type currency_index: int
+        :return: scaled_rate, None if the currency has no exchange rate at that date
+        """
+        if (date_index is None) or (currency_index is None):
+            return None
+        position = date_index * self.width + currency_index
+        if self.mask[position] == 0:
+            return None
+        return self.scaled_rates[position]
+
+    def get_scaled_rates(self, date, src_currency, dst_currency):
+        """
+        Returns the exchange rates, scaled by RATE_SCALE, of two currencies at the date given in input, with a single
+        call instead of one per lookup.
+        :param date: date of the exchange rates (YYYY-MM-DD format)
+        :type date: str
+        :param src_currency: ISO code of the first currency
+        :type src_currency: str
+        :param dst_currency: ISO code of the second currency
+        :type dst_currency: str
+        :return: (src_scaled_rate, dst_scaled_rate), a rate being None if the currency has no exchange rate at that
+        date; None if the date is not available
+        """
+        ordinal = self.get_ordinal(date)
+        if ordinal is None:
+            return None
+        dates = self.dates
+        date_index = bisect_left(dates, ordinal)
+        if (date_index == len(dates)) or (dates[date_index] != ordinal):
+            return None
+        row = date_index * self.width
+        src_currency_index = self.currency_indexes.get(src_currency, None)
+        dst_currency_index = self.currency_indexes.get(dst_currency, None)
+        src_scaled_rate = None
+        if (src_currency_index is not None) and (self.mask[row + src_currency_index] == 1):
+            src_scaled_rate = self.scaled_rates[row + src_currency_index]
+        dst_scaled_rate = None
+        if (dst_currency_index is not None) and (self.mask[row + dst_currency_index] == 1):
+            dst_scaled_rate = self.scaled_rates[row + dst_currency_index]
+        return src_scaled_rate, dst_scaled_rate
+
+    def get_rate(self, date_index, currency_index):
+        """
+        Returns the exchange rate at the given row and column of the matrix.
+        :param date_index: row of the matrix
+        :type date_index: int
+        :param currency_index: column of the matrix
+        :type currency_index: int
+        :return: rate, None if the currency has no exchange rate at that date
+        """
+        scaled_rate = self.get_scaled_rate(date_index, currency_index)
+        if scaled_rate is None:
+            return None
+        return Decimal(scaled_rate).scaleb(-RATE_DIGITS)
+
+    def iter_exchange_rates(self):
+        """
+        Streams the table as (date, exchange_rates) pairs in ascending date order, as 'iter_exchange_rates' does
+        for a document.
+        :return: generator of (date, exchange_rates) pairs, exchange_rates being a dict of currency -> Decimal rate
+        """
+        for date_index in range(len(self.dates)):
+            yield self.get_date(date_index), dict(
+                (currency, self.get_rate(date_index, currency_index))
+                for (currency_index, currency) in enumerate(self.currencies)
+                if self.mask[date_index * self.width + currency_index] == 1)
+
+    def append_exchange_rates(self, exchange_rates):
+        """
+        Returns a new table holding the exchange rates of this table followed by the ones given in input.
+        When the new dates all follow the newest date of the table and bring no new currency, the buffers of this
+        table are copied as they are and only the new rows are built, so the work scales with the new data.
+        Otherwise the whole table is rebuilt.
+        :param exchange_rates: iterable of (date, exchange_rates) pairs, as the ones returned by 'iter_exchange_rates'
+        :type exchange_rates: iterable
+        :return: exchange_rates_table
+        """
+        exchange_rates = list(exchange_rates)
+        appended = ExchangeRatesTable.from_exchange_rates(exchange_rates)
+        if len(appended) == 0:
+            return self
+        if ((len(self.dates) > 0) and (appended.dates[0] <= self.dates[-1])) or \
+                (set(appended.currencies).issubset(self.currency_indexes) is False):
+            return ExchangeRatesTable.from_exchange_rates(chain(self.iter_exchange_rates(), exchange_rates))
+
+        dates = array('l', self.dates.tobytes())
+        dates.extend(appended.dates)
+        scaled_rates = array('q', self.scaled_rates.tobytes())
+        scaled_rates.frombytes(bytes(8 * self.width * len(appended)))
+        mask = bytearray(self.mask) + bytearray(self.width * len(appended))
+        columns = [self.currency_indexes[currency] for currency in appended.currencies]
+        for row in range(len(appended)):
+            for (appended_column, column) in enumerate(columns):
+                appended_position = row * appended.width + appended_column
+                if appended.mask[appended_position] == 1:
+                    position = (len(self.dates) + row) * self.width + column
+                    scaled_rates[position] = appended.scaled_rates[appended_position]
+                    mask[position] = 1
+        return ExchangeRatesTable(dates, self.currencies, scaled_rates, mask)
+
+    def to_dict(self):
+        """
+        Returns the table as a dict of dates, each one containing a dict of currency -> Decimal rate.
+        :return: exchange_rates_dict
+        """
+        return dict(self.iter_exchange_rates())
@@ -0,0 +1,64 @@
+"""
+Fixed-point conversion engine: amounts are converted in integer minor units (cents) with the exchange rates scaled
+to integers by the exchange rates table, instead of going through Decimal operations.
+The engine returns the same amount, rounded down to the cent, as the Decimal conversion path, which computes with
+the exact value of the float amount and 28 significant digits: a converted amount is returned only when it lies
+far enough from a cent boundary for both computations to fall within the same cent, every other amount being
+left to the Decimal path.
+"""
+
+# number of decimal digits of the minor units, and scale of an amount in minor units
+MINOR_UNIT_DIGITS = 2
+MINOR_UNIT_SCALE = 10 ** MINOR_UNIT_DIGITS
+
+# amounts from MAX_AMOUNT on are left to the Decimal path, and so are the converted amounts from
+# MAX_CONVERTED_MINOR_UNITS on, so that the Decimal path keeps raising for results it cannot represent
+MAX_AMOUNT = 1e15
+MAX_CONVERTED_MINOR_UNITS = 10 ** 24
+
+# a converted amount closer to a cent boundary than 1 / BOUNDARY_GUARD of its value is left to the Decimal path;
+# the engine and the Decimal path differ by less than 2^-52 of the value (the float amount being rounded to whole
+# minor units, and the Decimal operations to 28 significant digits)
+BOUNDARY_GUARD = 10 ** 15
+
+
+def get_minor_units(amount):
+    """
+    Returns the amount given in input in minor units, if it is a positive float amount of whole minor units.
+    :param amount: amount to convert
+    :type amount: float
+    :return: minor_units, None if the amount is not positive, not finite, from MAX_AMOUNT on or not a whole number
+    of minor units
+    """
+    if (type(amount) is not float) or ((0.0 < amount < MAX_AMOUNT) is False):
+        return None
+    minor_units = round(amount * MINOR_UNIT_SCALE)
+    # the float closest to the minor units is the amount itself, the two differ by less than 2^-53 of the amount
+    if minor_units / MINOR_UNIT_SCALE != amount:
+        return None
+    return minor_units
+
+
+def get_converted_minor_units(amount, src_scaled_rate, dst_scaled_rate):
+    """
+    Converts the amount given in input with the exchange rates given in input, scaled by the same factor, rounding
+    the result down to the minor unit as the Decimal conversion path does.
+    :param amount: amount to convert
+    :type amount: float
+    :param src_scaled_rate: exchange rate of the source currency, scaled to an integer
+    :type src_scaled_rate: int
+    :param dst_scaled_rate: exchange rate of the destination currency, scaled to an integer
+    :type dst_scaled_rate: int
+    :return: converted_minor_units, None if the amount has to be converted by the Decimal path
+    """
+    minor_units = get_minor_units(amount)
+    if minor_units is None:
+        return None
+    # the scale of the two exchange rates cancels out
+    numerator = minor_units * dst_scaled_rate
+    (converted_minor_units, remainder) = divmod(numerator, src_scaled_rate)
+    if (remainder * BOUNDARY_GUARD <= numerator) or ((src_scaled_rate - remainder) * BOUNDARY_GUARD <= numerator):
+        return None     # too close to a cent boundary, the Decimal path may round to the other cent
+    if converted_minor_units >= MAX_CONVERTED_MINOR_UNITS:
+        return None
+    return converted_minor_units
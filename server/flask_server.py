@@ -1,8 +1,20 @@
-from flask import Flask, make_response
-from flask_restful import Resource, Api, reqparse
-from traceback import print_exc
-from server.resources import get_updated_exchange_rates_document, get_exchange_rates_dict, get_currency_converted_amount
-import traceback
+from flask import Flask, make_response, request
+from flask_restful import Resource, Api
+from server.resources import get_currency_converted_float_amount_at_date, get_currency_converted_series
+from server.exchange_rates_store import exchange_rates_store
+from server.exchange_rates_refresher import ExchangeRatesRefresher, ExchangeRatesHistoryRefresher
+from server.exchange_rates_history import ExchangeRatesHistory
+from server.exchange_rates_table import LATEST_DATE
+from server.request_validator import convert_request_validator, series_request_validator, get_request_values
+from server.static_page import help_page
+from server.http_caching import get_conversion_headers, is_not_modified
+from server.metrics import metrics_registry, MetricsMiddleware, collect_exchange_rates_metrics, METRICS_CONTENT_TYPE, \
+    convert_stage_histogram
+from server.server_timing import StageTimer
+from server.profiling import ProfilingMiddleware, is_profiling_enabled
+from server.json_log import log_error, access_log, AccessLogMiddleware
+from server.settings import MAX_BATCH_SIZE, REFRESH_INTERVAL, EXCHANGE_RATES_HISTORY_DOCUMENT, SERVER_TIMING
+import json
 from decimal import Decimal
 
 from custom_api_exception.customexception import CustomAPIException
@@ -13,6 +25,27 @@ Initializes Flask application and Flask-RESTful API.
 app = Flask(__name__)
 api = Api(app)
 
+"""
+Refreshes in the background the exchange rates served by the application.
+"""
+if EXCHANGE_RATES_HISTORY_DOCUMENT != '':
+    exchange_rates_refresher = ExchangeRatesHistoryRefresher(exchange_rates_store,
+                                                             ExchangeRatesHistory(EXCHANGE_RATES_HISTORY_DOCUMENT))
+else:
+    exchange_rates_refresher = ExchangeRatesRefresher(exchange_rates_store)
+
+"""
+Endpoints of the application, counted and timed by the metrics middleware; the exchange rates served are described
+by the metrics when these are scraped. The profiling and access log middlewares are installed only when enabled.
+"""
+ENDPOINTS = ('/', '/help', '/api/convert', '/api/convert/batch', '/api/convert/series', '/metrics')
+if is_profiling_enabled() is True:
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, ENDPOINTS)
+if access_log is not None:
+    app.wsgi_app = AccessLogMiddleware(app.wsgi_app, access_log, exchange_rates_store)
+app.wsgi_app = MetricsMiddleware(app.wsgi_app, ENDPOINTS)
+metrics_registry.add_collector(lambda: collect_exchange_rates_metrics(exchange_rates_store))
+
 
 class IndexResource(Resource):
     """
@@ -20,71 +53,248 @@ class IndexResource(Resource):
     """
     def get(self):
         """
-        Returns the index of the web application.
+        Returns the index of the web application, served from memory; a conditional request matching the page
+        served gets a 304 response, and a client accepting gzip gets the compressed copy of the page.
         """
-        to_return = 'Currency Converter Index'    # initializes the string to return
-        response = None  # initializes the variable used for the response
-        try:
-            with open('assets/currency_converter_help.html', 'r') as f:
-                to_return = f.read()    # sets the string to return in the response.
-            f.close()   # closes the file
-        except Exception as e:
-            # prints the exception
-            print_exc()
-            print(e)
-        response = make_response(to_return, 200)
-        response.content_type = 'text/html'
+        (status_code, body, headers) = help_page.get_response(request.headers.get('If-None-Match'),
+                                                              request.headers.get('If-Modified-Since'),
+                                                              request.headers.get('Accept-Encoding'))
+        response = make_response(body, status_code)
+        response.content_type = help_page.content_type
+        response.headers.extend(headers)
         return response
 
 
+def get_converted_amount_dict(converted_amount, dst_currency, reference_date, fallback, date):
+    """
+    Builds the result of a conversion; the date whose exchange rates have been used is reported only when the
+    reference date has been resolved, so the result of a conversion at an exact date is left unchanged.
+    :param converted_amount: converted amount
+    :type converted_amount: float or Decimal
+    :param dst_currency: destination currency of the amount
+    :type dst_currency: str
+    :param reference_date: reference date requested
+    :type reference_date: str
+    :param fallback: fallback requested
+    :type fallback: str
+    :param date: date whose exchange rates have been used
+    :type date: str
+    :return: converted_amount_dict
+    """
+    converted_amount_dict = dict(amount=float(converted_amount), currency=dst_currency)
+    if (reference_date == LATEST_DATE) or (fallback is not None):
+        converted_amount_dict['date'] = date
+    return converted_amount_dict
+
+
 class ConvertResource(Resource):
     """
     Defines the API Resource which handles currency converting requests.
+    The arguments are validated by a precompiled validator, shared by every request, accepting the same arguments
+    and returning the same errors as the Flask-RESTful request parser:
+    amount: amount to convert
+    src-currency: original currency of the amount in input
+    dest-currency: destination currency of the amount to convert
+    reference-date: date to take as reference to get the exchange rate, or 'latest'
+    fallback: 'previous' to use the closest prior date if the date has no exchange rates (optional)
     """
-    def __init__(self):
-        # gets the dict containing the latest updated exchange rates
-        self.exchange_rates_dict = get_exchange_rates_dict()
-        """
-        Initializes the request parser and all the arguments
-        amount: amount to convert
-        src_curr: original currency of the amount in input
-        dst_curr: destination currency of the amount to convert
-        date: date to take as reference to get the exchange rate
-        """
-        self.parser = reqparse.RequestParser()
-        self.parser.add_argument('amount', type=float, required=True)
-        self.parser.add_argument('src-currency', type=str, required=True)
-        self.parser.add_argument('dest-currency', type=str, required=True)
-        self.parser.add_argument('reference-date', type=str, required=True)
-
     def get(self):
         """
         Gets an amount to convert, the source currency, the destination currency and the date to use as reference for
         the exchange rate an return the converted amount, together with the requested destination currency.
+        When the reference date is resolved ('latest' or a fallback), the date actually used is returned as well.
+        The response carries a strong ETag and a Cache-Control header, long for the dates older than the newest one,
+        and a conditional request matching the ETag gets a 304 response.
+        With SERVER_TIMING enabled, the response carries a Server-Timing header splitting the request into stages:
+        argument parsing, table access, validation, factor lookup, rounding and serialization.
         """
         try:
             to_return = None  # initializes the dict to return
-            request_args = self.parser.parse_args()
-            converted_amount = get_currency_converted_amount(self.exchange_rates_dict, Decimal(request_args['amount']),
-                                                             request_args['src-currency'], request_args['dest-currency'],
-                                                             request_args['reference-date'])
-            to_return = dict(amount=float(converted_amount), currency=request_args['dest-currency'])
+            stage_timer = StageTimer() if SERVER_TIMING is True else None
+            (request_args, errors) = convert_request_validator.get_args(get_request_values(request))
+            if errors is not None:
+                return dict(message=errors), 400
+            if stage_timer is not None:
+                stage_timer.mark('parse')
+            # gets the table containing the latest updated exchange rates, loaded once per process
+            exchange_rates_table = exchange_rates_store.get_exchange_rates()
+            if stage_timer is not None:
+                stage_timer.mark('table')
+            (converted_amount, date) = get_currency_converted_float_amount_at_date(
+                exchange_rates_table, request_args['amount'], request_args['src-currency'],
+                request_args['dest-currency'], request_args['reference-date'], request_args['fallback'], stage_timer)
+            to_return = get_converted_amount_dict(converted_amount, request_args['dest-currency'],
+                                                  request_args['reference-date'], request_args['fallback'], date)
+            # the exchange rates of a past date never change, the conversion can be cached and revalidated
+            (etag, headers) = get_conversion_headers(exchange_rates_table, request_args['reference-date'], to_return)
+            if is_not_modified(etag, None, request.headers.get('If-None-Match'), None) is True:
+                response = make_response('', 304, headers)
+            elif stage_timer is None:
+                return to_return, 200, headers
+            else:
+                response = api.make_response(to_return, 200, headers)   # serializes as Flask-RESTful does
+            if stage_timer is not None:
+                stage_timer.mark('serialization')
+                stage_timer.observe(convert_stage_histogram)
+                response.headers['Server-Timing'] = stage_timer.get_header()
+            return response
+        except CustomAPIException as cae:
+            return cae.to_dict(), cae.status_code
+
+
+class SeriesConvertResource(Resource):
+    """
+    Defines the API Resource which handles currency converting requests over a range of dates.
+    The arguments are validated by a precompiled validator, shared by every request, accepting the same arguments
+    and returning the same errors as the Flask-RESTful request parser:
+    amount: amount to convert
+    src-currency: original currency of the amount in input
+    dest-currency: destination currency of the amount to convert
+    from: oldest date of the range
+    to: newest date of the range
+    """
+    def get(self):
+        """
+        Gets an amount to convert, the source currency, the destination currency and a range of dates and returns
+        the amount converted at every date of the range with published exchange rates, in ascending date order.
+        """
+        try:
+            (request_args, errors) = series_request_validator.get_args(get_request_values(request))
+            if errors is not None:
+                return dict(message=errors), 400
+            # gets the table containing the latest updated exchange rates, loaded once per process
+            exchange_rates_table = exchange_rates_store.get_exchange_rates()
+            converted_series = get_currency_converted_series(exchange_rates_table, Decimal(request_args['amount']),
+                                                             request_args['src-currency'],
+                                                             request_args['dest-currency'],
+                                                             request_args['from'], request_args['to'])
+            to_return = dict(currency=request_args['dest-currency'],
+                             amounts=[dict(date=date, amount=float(converted_amount))
+                                      for (date, converted_amount) in converted_series])
             return to_return, 200
         except CustomAPIException as cae:
             return cae.to_dict(), cae.status_code
 
 
+"""
+JSON types accepted for each argument of a batch item, with their description, checked before the item is validated
+as a querystring: a JSON boolean or array would otherwise be accepted, as 1.0 or as its string representation.
+"""
+BATCH_ITEM_TYPES = {'amount': ((int, float, str), 'a string or a real number'), 'src-currency': ((str,), 'a string'),
+                    'dest-currency': ((str,), 'a string'), 'reference-date': ((str,), 'a string'),
+                    'fallback': ((str,), 'a string')}
+
+
+def get_batch_item_args(item):
+    """
+    Validates an item of a batch conversion request, with the validator of the querystring of a single conversion
+    request, so that an invalid item gets the same error messages as an invalid single conversion request.
+    :param item: item of the batch, holding amount, src-currency, dest-currency, reference-date and, optionally,
+    fallback
+    :type item: dict
+    :return: (request_args, errors), errors being None if the item is valid, a dict of argument name -> error
+    message otherwise
+    """
+    if isinstance(item, dict) is False:
+        raise CustomAPIException('Each item must be a JSON object.', 400)
+    for (name, (argument_types, description)) in BATCH_ITEM_TYPES.items():
+        value = item.get(name, None)
+        if (value is not None) and ((isinstance(value, argument_types) is False) or (type(value) is bool)):
+            return None, {name: f"{name} must be {description}, not '{type(value).__name__}'"}
+    return convert_request_validator.get_args(lambda name: [] if item.get(name, None) is None else [item[name]])
+
+
+class BatchConvertResource(Resource):
+    """
+    Defines the API Resource which handles batches of currency converting requests.
+    """
+    def post(self):
+        """
+        Gets a JSON array, or newline-delimited JSON objects, of conversion requests, each one holding an amount,
+        the source currency, the destination currency and the reference date, and returns the list of the
+        converted amounts in the same order. An item which cannot be converted gets its own error message and
+        status code, without failing the whole batch. Every item is converted with the same exchange rates table.
+        """
+        try:
+            body = request.get_data(cache=False, as_text=True)
+            items = list()  # initializes the list of the items of the batch, each one parsed or a parsing error
+            if body.lstrip().startswith('['):
+                try:
+                    items = json.loads(body)
+                except ValueError:
+                    raise CustomAPIException('The request body is not a valid JSON array.', 400)
+            else:
+                for line in body.splitlines():
+                    if line.strip() != '':
+                        try:
+                            items.append(json.loads(line))
+                        except ValueError:
+                            items.append(CustomAPIException('The item is not a valid JSON object.', 400))
+            if len(items) == 0:
+                raise CustomAPIException('The request body contains no item.', 400)
+            if len(items) > MAX_BATCH_SIZE:
+                raise CustomAPIException(f'A batch can contain at most {MAX_BATCH_SIZE} items.', 400)
+
+            # gets the table once, so that every item is converted with the same exchange rates
+            exchange_rates_table = exchange_rates_store.get_exchange_rates()
+            to_return = list()  # initializes the list of results to return
+            for item in items:
+                try:
+                    if isinstance(item, CustomAPIException) is True:
+                        raise item
+                    (request_args, errors) = get_batch_item_args(item)
+                    if errors is not None:
+                        to_return.append(dict(message=errors, status=400))
+                        continue
+                    # a non-finite amount, or one out of the range of the conversion, fails its item only
+                    (converted_amount, date) = get_currency_converted_float_amount_at_date(
+                        exchange_rates_table, request_args['amount'], request_args['src-currency'],
+                        request_args['dest-currency'], request_args['reference-date'], request_args['fallback'])
+                    to_return.append(get_converted_amount_dict(converted_amount, request_args['dest-currency'],
+                                                               request_args['reference-date'],
+                                                               request_args['fallback'], date))
+                except CustomAPIException as cae:
+                    to_return.append(dict(cae.to_dict(), status=cae.status_code))
+            return to_return, 200
+        except CustomAPIException as cae:
+            return cae.to_dict(), cae.status_code
+
+
+class MetricsResource(Resource):
+    """
+    Defines the API Resource which exposes the metrics of the process in the Prometheus text format.
+    """
+    def get(self):
+        """
+        Returns the metrics of the process.
+        """
+        response = make_response(metrics_registry.render(), 200)
+        response.content_type = METRICS_CONTENT_TYPE
+        return response
+
+
 api.add_resource(IndexResource, '/', '/help')
 api.add_resource(ConvertResource, '/api/convert')
+api.add_resource(BatchConvertResource, '/api/convert/batch')
+api.add_resource(SeriesConvertResource, '/api/convert/series')
+api.add_resource(MetricsResource, '/metrics')
 
 
-def init_server():
+def init_server(start_refresher=True):
     """
     This method initializes the application before server runs.
+    :param start_refresher: whether to start refreshing the exchange rates in the background, a pre-forking server
+    starting it in each worker process instead
+    :type start_refresher: bool
     """
     try:
-        get_updated_exchange_rates_document()  # gets updated exchange rate XML file
+        exchange_rates_refresher.refresh()  # gets updated exchange rate XML file and loads it
+    except Exception as e:
+        log_error(e, 'refresh of the exchange rates')
+    try:
+        exchange_rates_store.reload()  # loads the local exchange rates if they could not be downloaded
     except Exception as e:
-        print(e)
-        traceback.print_exc()
+        log_error(e, 'load of the exchange rates')
+    if (start_refresher is True) and (REFRESH_INTERVAL > 0):
+        exchange_rates_refresher.start()    # keeps the exchange rates updated while the server runs
 
@@ -0,0 +1,94 @@
+import json
+import hashlib
+from email.utils import parsedate_to_datetime
+from server.exchange_rates_table import LATEST_DATE
+from server.settings import REFRESH_INTERVAL, HISTORICAL_CONVERSION_MAX_AGE
+
+"""
+HTTP caching of the responses of the server application: validators of the responses, answers to conditional
+requests and lifetimes of the conversions.
+"""
+
+
+def get_etag(body):
+    """
+    Returns the strong ETag of a response body, which changes with the body only.
+    :param body: body of the response
+    :type body: bytes
+    :return: etag, without quotes
+    """
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+def get_json_etag(response_dict):
+    """
+    Returns the strong ETag of a JSON response, serialized as Flask-RESTful does.
+    :param response_dict: content of the response
+    :type response_dict: dict
+    :return: etag, without quotes
+    """
+    return get_etag(json.dumps(response_dict).encode('utf-8'))
+
+
+def is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+    """
+    Checks if the response is the one the client already holds, according to the conditional headers of the
+    request; If-Modified-Since is ignored when If-None-Match is given.
+    :param etag: ETag of the response, without quotes
+    :type etag: str
+    :param last_modified: Last-Modified date of the response, None if it has none
+    :type last_modified: str
+    :param if_none_match: value of the If-None-Match header, None if missing
+    :type if_none_match: str
+    :param if_modified_since: value of the If-Modified-Since header, None if missing
+    :type if_modified_since: str
+    :return: is_not_modified
+    """
+    if if_none_match is not None:
+        # weak comparison: a weak validator of the same content matches
+        etags = [tag.strip() for tag in if_none_match.split(',')]
+        return ('*' in etags) or any(tag.replace('W/', '', 1).strip('"') == etag for tag in etags)
+    if (if_modified_since is not None) and (last_modified is not None):
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def get_conversion_cache_control(exchange_rates_table, reference_date):
+    """
+    Returns the Cache-Control header of a conversion at the reference date given in input.
+    The exchange rates of a date available and older than the newest date available are never published again, so
+    the conversion is cached for HISTORICAL_CONVERSION_MAX_AGE seconds; a conversion at the newest date, at
+    LATEST_DATE or at a date resolved to a prior one by a fallback may change with the next refresh of the exchange
+    rates (a backfill of the history may add the missing date), so it is cached until then.
+    :param exchange_rates_table: table containing all available exchange rates
+    :type exchange_rates_table: ExchangeRatesTable
+    :param reference_date: reference date of the conversion (YYYY-MM-DD format), or LATEST_DATE
+    :type reference_date: str
+    :return: cache_control
+    """
+    # the dates of the table are sorted ordinals: a row before the last one holds an older date than the newest one
+    date_index = exchange_rates_table.get_date_index(reference_date) if reference_date != LATEST_DATE else None
+    if (date_index is not None) and (date_index < len(exchange_rates_table) - 1):
+        return 'public, max-age={}, immutable'.format(HISTORICAL_CONVERSION_MAX_AGE)
+    if int(REFRESH_INTERVAL) > 0:
+        return 'public, max-age={}'.format(int(REFRESH_INTERVAL))
+    return 'no-cache'   # the exchange rates may change at any time, every hit is revalidated
+
+
+def get_conversion_headers(exchange_rates_table, reference_date, response_dict):
+    """
+    Returns the caching headers of the response to a conversion.
+    :param exchange_rates_table: table containing all available exchange rates
+    :type exchange_rates_table: ExchangeRatesTable
+    :param reference_date: reference date of the conversion (YYYY-MM-DD format), or LATEST_DATE
+    :type reference_date: str
+    :param response_dict: content of the response
+    :type response_dict: dict
+    :return: (etag, headers), etag being without quotes and headers a list of (name, value) pairs
+    """
+    etag = get_json_etag(response_dict)
+    return etag, [('ETag', '"{}"'.format(etag)),
+                  ('Cache-Control', get_conversion_cache_control(exchange_rates_table, reference_date))]
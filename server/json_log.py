@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+import traceback
+from urllib.parse import parse_qsl
+from server.metrics import metrics_registry, Counter
+from server.exchange_rates_table import LATEST_DATE
+from server.settings import ACCESS_LOG, ERROR_LOG, LOG_QUEUE_SIZE
+
+"""
+Structured logs of the server application: access and error entries are written as JSON lines by a background
+thread, request threads only putting them on a bounded queue, so that they never wait for the log to be written.
+Entries which do not fit in the queue are dropped and counted by the metrics, instead of blocking the request.
+Access entries hold the path and querystring parameters of the request, its status, its latency and the version of
+the exchange rates it has been served with; the access log can be replayed as it is by
+benchmarks/replay_load_generator.py.
+"""
+
+
+class JsonLogWriter(object):
+    """
+    Log of JSON entries, one per line, written by a background thread fed by a bounded queue.
+    The thread is started by the first entry logged by the process, and started again in a forked process.
+    """
+    def __init__(self, name, log_document, default_stream, max_queued=LOG_QUEUE_SIZE):
+        """
+        JsonLogWriter constructor.
+        :param name: name of the log, labelling its dropped entries in the metrics
+        :type name: str
+        :param log_document: path of the log document, '-' to write to the default stream
+        :type log_document: str
+        :param default_stream: stream written to when the log document is '-'
+        :type default_stream: file
+        :param max_queued: maximum number of entries waiting to be written
+        :type max_queued: int
+        """
+        self.name = name
+        self.log_document = log_document
+        self.default_stream = default_stream
+        self.max_queued = max_queued
+        self.queue = queue.Queue(max_queued)
+        self.thread = None
+        self.lock = threading.Lock()    # serializes the start of the writer thread
+        os.register_at_fork(after_in_child=self.reset)
+        atexit.register(self.flush)
+
+    def reset(self):
+        """
+        Drops the queue and the writer thread inherited from the parent process, the thread not surviving the fork.
+        """
+        self.queue = queue.Queue(self.max_queued)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the writer thread, if not started yet.
+        """
+        with self.lock:
+            if self.thread is None:
+                thread = threading.Thread(target=self.run, name='{}-log-writer'.format(self.name), daemon=True)
+                thread.start()
+                self.thread = thread
+
+    def log(self, entry):
+        """
+        Queues an entry, without waiting: an entry which does not fit in the queue is dropped.
+        :param entry: entry to write, formatted by the writer thread
+        :type entry: dict
+        """
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            dropped_entries_counter.inc((self.name,))
+
+    def flush(self, timeout=5.0):
+        """
+        Waits for the entries queued so far to be written.
+        :param timeout: maximum seconds to wait, so that a stuck log never keeps the process from exiting
+        :type timeout: float
+        :return: True if every entry has been written, False otherwise
+        """
+        if self.thread is None:
+            return True
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(lambda: self.queue.unfinished_tasks == 0, timeout)
+
+    def run(self):
+        """
+        Writes the queued entries, flushing the log every time the queue is empty.
+        """
+        stream = self.default_stream if self.log_document == '-' else open(self.log_document, 'a')
+        while True:
+            entry = self.queue.get()
+            try:
+                stream.write(json.dumps(format_entry(entry)) + '\n')
+                if self.queue.empty() is True:
+                    stream.flush()
+            except Exception as e:
+                print(e, file=sys.stderr)   # the log cannot be written, the error can only be reported here
+            finally:
+                self.queue.task_done()
+
+
+def format_entry(entry):
+    """
+    Turns the raw fields of a queued entry into their logged form: the querystring into its parameters, the
+    snapshot of the exchange rates into their version, and the exception into its type and traceback.
+    :param entry: queued entry
+    :type entry: dict
+    :return: entry
+    """
+    query_string = entry.pop('query_string', None)
+    if query_string is not None:
+        entry['query'] = dict(parse_qsl(query_string, keep_blank_values=True))
+    if 'snapshot' in entry:
+        entry.update(get_data_version(entry.pop('snapshot')))
+    exception = entry.pop('exception', None)
+    if exception is not None:
+        entry['exception'] = type(exception).__name__
+        entry['traceback'] = ''.join(traceback.format_exception(type(exception), exception, exception.__traceback__))
+    return entry
+
+
+def get_data_version(snapshot):
+    """
+    Returns the version of the exchange rates of the snapshot of a store: the newest date they hold and the key of
+    the version of their document.
+    :param snapshot: (document signature, exchange rates table) pair served by the store, None if nothing is loaded
+    :type snapshot: tuple
+    :return: dict of the data_date and data_version fields
+    """
+    if snapshot is None:
+        return dict(data_date=None, data_version=None)
+    (signature, table) = snapshot
+    date_index = table.resolve_date_index(LATEST_DATE)
+    return dict(data_date=table.get_date(date_index) if date_index is not None else None,
+                data_version='{}-{}'.format(signature[1], signature[2]))
+
+
+def get_access_entry(start, method, path, query_string, status, latency, snapshot):
+    """
+    Builds the access entry of a request, its fields being formatted by the writer thread.
+    :param start: UNIX time the request was received at
+    :type start: float
+    :param method: method of the request
+    :type method: str
+    :param path: path of the request
+    :type path: str
+    :param query_string: raw querystring of the request
+    :type query_string: str
+    :param status: status code of the response
+    :type status: int
+    :param latency: seconds taken to serve the request
+    :type latency: float
+    :param snapshot: snapshot of the exchange rates served
+    :type snapshot: tuple
+    :return: entry
+    """
+    return dict(event='access', time=start, method=method, path=path, query_string=query_string, status=status,
+                latency_ms=round(latency * 1000, 3), snapshot=snapshot)
+
+
+def log_error(exception, context=None):
+    """
+    Logs an error, with its traceback, to the error log.
+    :param exception: exception raised
+    :type exception: Exception
+    :param context: what was being done when the exception was raised
+    :type context: str
+    """
+    error_log.log(dict(event='error', time=time.time(), context=context, message=str(exception), exception=exception))
+
+
+class AccessLogMiddleware(object):
+    """
+    WSGI middleware logging every request served by an application to an access log.
+    """
+    def __init__(self, wsgi_app, access_log, exchange_rates_store):
+        """
+        AccessLogMiddleware constructor.
+        :param wsgi_app: WSGI application whose requests are logged
+        :type wsgi_app: callable
+        :param access_log: log the access entries are written to
+        :type access_log: JsonLogWriter
+        :param exchange_rates_store: store serving the exchange rates, whose version is logged
+        :type exchange_rates_store: ExchangeRatesStore
+        """
+        self.wsgi_app = wsgi_app
+        self.access_log = access_log
+        self.exchange_rates_store = exchange_rates_store
+
+    def __call__(self, environ, start_response):
+        """
+        Serves a request with the application and logs it.
+        """
+        start_time = time.time()
+        start = time.perf_counter()
+        status = ['500']    # status of the response, set by the application through start_response
+
+        def logged_start_response(status_line, headers, exc_info=None):
+            status[0] = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, logged_start_response)
+        finally:
+            self.access_log.log(get_access_entry(
+                start_time, environ.get('REQUEST_METHOD', ''), environ.get('PATH_INFO', ''),
+                environ.get('QUERY_STRING', ''), int(status[0]), time.perf_counter() - start,
+                self.exchange_rates_store.snapshot))
+
+
+"""
+Access and error logs of the process, and count of the entries dropped by a full queue.
+"""
+dropped_entries_counter = metrics_registry.register(Counter(
+    'currency_converter_log_entries_dropped_total', 'Log entries dropped by a full log queue, by log.', ('log',)))
+access_log = JsonLogWriter('access', ACCESS_LOG, sys.stdout) if ACCESS_LOG != '' else None
+error_log = JsonLogWriter('error', ERROR_LOG, sys.stderr)
@@ -0,0 +1,360 @@
+import time
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+"""
+Metrics of the server application, exposed in the Prometheus text format by the '/metrics' endpoint.
+Requests and loads only increment counters kept in memory; everything which can be read from the state of the
+application (age of the exchange rates, cache hit ratios) is collected when the metrics are scraped, so the
+conversion hot path pays for one counter and one histogram update per request.
+The metrics are kept per process: behind a pre-forking server, each scrape reports the worker serving it.
+"""
+
+"""
+Upper bounds, in seconds, of the buckets of the request, conversion stage and load duration histograms.
+"""
+REQUEST_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STAGE_DURATION_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                          0.001, 0.0025, 0.01)
+LOAD_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+"""
+Content type of the Prometheus text format.
+"""
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(label_names, label_values, extra=''):
+    """
+    Formats the labels of a sample, escaping their values.
+    :param label_names: names of the labels
+    :type label_names: tuple
+    :param label_values: values of the labels, in the same order
+    :type label_values: tuple
+    :param extra: label appended as it is (e.g. the 'le' label of a histogram bucket)
+    :type extra: str
+    :return: labels, empty if there is none
+    """
+    labels = ['{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+              for (name, value) in zip(label_names, label_values)]
+    if extra != '':
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if len(labels) > 0 else ''
+
+
+def format_value(value):
+    """
+    Formats the value of a sample.
+    :param value: value of the sample
+    :type value: float
+    :return: value
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    """
+    Monotonic counter, one value per combination of label values.
+    """
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        Counter constructor.
+        :param name: name of the metric
+        :type name: str
+        :param documentation: help text of the metric
+        :type documentation: str
+        :param label_names: names of the labels of the metric
+        :type label_names: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = dict()    # label values -> value
+        self.lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        """
+        Increments the counter of the label values given in input.
+        :param label_values: values of the labels, in the order of their names
+        :type label_values: tuple
+        :param amount: increment
+        :type amount: float
+        """
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get_value(self, label_values=()):
+        """
+        Returns the value of the counter of the label values given in input.
+        :return: value
+        """
+        return self.values.get(label_values, 0)
+
+    def get_samples(self):
+        """
+        Returns the samples of the metric, in the Prometheus text format.
+        :return: list of lines
+        """
+        with self.lock:
+            values = sorted(self.values.items())
+        return ['{}{} {}'.format(self.name, format_labels(self.label_names, label_values), format_value(value))
+                for (label_values, value) in values]
+
+
+class Gauge(Counter):
+    """
+    Value which can go up and down, one value per combination of label values.
+    """
+    metric_type = 'gauge'
+
+    def set(self, value, label_values=()):
+        """
+        Sets the value of the gauge of the label values given in input.
+        :param value: value
+        :type value: float
+        :param label_values: values of the labels, in the order of their names
+        :type label_values: tuple
+        """
+        with self.lock:
+            self.values[label_values] = value
+
+
+class Histogram(object):
+    """
+    Distribution of observed values over fixed buckets, one distribution per combination of label values.
+    """
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=REQUEST_DURATION_BUCKETS):
+        """
+        Histogram constructor.
+        :param name: name of the metric
+        :type name: str
+        :param documentation: help text of the metric
+        :type documentation: str
+        :param label_names: names of the labels of the metric
+        :type label_names: tuple
+        :param buckets: ascending upper bounds of the buckets, the +Inf bucket being implicit
+        :type buckets: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.distributions = dict()    # label values -> [count per bucket, +Inf included, sum of the observations]
+        self.lock = threading.Lock()
+
+    def observe(self, value, label_values=()):
+        """
+        Adds an observation to the distribution of the label values given in input.
+        :param value: observed value
+        :type value: float
+        :param label_values: values of the labels, in the order of their names
+        :type label_values: tuple
+        """
+        bucket = bisect_left(self.buckets, value)     # first bucket whose upper bound is not below the value
+        with self.lock:
+            distribution = self.distributions.get(label_values, None)
+            if distribution is None:
+                distribution = [0] * (len(self.buckets) + 1) + [0.0]
+                self.distributions[label_values] = distribution
+            distribution[bucket] += 1
+            distribution[-1] += value
+
+    def get_count(self, label_values=()):
+        """
+        Returns the number of observations of the label values given in input.
+        :return: count
+        """
+        distribution = self.distributions.get(label_values, None)
+        return 0 if distribution is None else sum(distribution[:-1])
+
+    def get_samples(self):
+        """
+        Returns the samples of the metric, in the Prometheus text format, with cumulative buckets.
+        :return: list of lines
+        """
+        with self.lock:
+            distributions = sorted((label_values, list(distribution))
+                                   for (label_values, distribution) in self.distributions.items())
+        lines = list()
+        for (label_values, distribution) in distributions:
+            cumulative_count = 0
+            for (upper_bound, count) in zip(self.buckets + (float('inf'),), distribution[:-1]):
+                cumulative_count += count
+                lines.append('{}_bucket{} {}'.format(self.name, format_labels(
+                    self.label_names, label_values, 'le="{}"'.format(format_value(upper_bound))), cumulative_count))
+            labels = format_labels(self.label_names, label_values)
+            lines.append('{}_sum{} {}'.format(self.name, labels, format_value(distribution[-1])))
+            lines.append('{}_count{} {}'.format(self.name, labels, cumulative_count))
+        return lines
+
+
+class MetricsRegistry(object):
+    """
+    Set of the metrics exposed by the application, together with the collectors updating the gauges read out of
+    the state of the application when the metrics are scraped.
+    """
+    def __init__(self):
+        """
+        MetricsRegistry constructor.
+        """
+        self.metrics = list()
+        self.collectors = list()
+
+    def register(self, metric):
+        """
+        Adds a metric to the registry.
+        :param metric: Counter, Gauge or Histogram
+        :type metric: object
+        :return: metric
+        """
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Adds a function called every time the metrics are scraped, before they are rendered.
+        :param collector: function without arguments
+        :type collector: callable
+        """
+        self.collectors.append(collector)
+
+    def render(self):
+        """
+        Runs the collectors and renders every metric in the Prometheus text format.
+        :return: metrics
+        """
+        for collector in self.collectors:
+            collector()
+        lines = list()
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.metric_type))
+            lines.extend(metric.get_samples())
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware(object):
+    """
+    WSGI middleware counting the requests served by an application and timing them, by endpoint; paths which are
+    not endpoints of the application are counted under 'other', so that the number of series stays bounded.
+    """
+    def __init__(self, wsgi_app, endpoints):
+        """
+        MetricsMiddleware constructor.
+        :param wsgi_app: WSGI application to instrument
+        :type wsgi_app: callable
+        :param endpoints: paths of the endpoints of the application
+        :type endpoints: iterable
+        """
+        self.wsgi_app = wsgi_app
+        self.endpoints = frozenset(endpoints)
+
+    def __call__(self, environ, start_response):
+        """
+        Serves a request with the instrumented application and records its status and duration.
+        """
+        start = time.perf_counter()
+        status = ['500']    # status of the response, set by the application through start_response
+
+        def instrumented_start_response(status_line, headers, exc_info=None):
+            status[0] = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, instrumented_start_response)
+        finally:
+            path = environ.get('PATH_INFO', '')
+            record_request(path if path in self.endpoints else 'other', environ.get('REQUEST_METHOD', ''),
+                           status[0], time.perf_counter() - start)
+
+
+def record_request(endpoint, method, status, duration):
+    """
+    Records a request served by the application.
+    :param endpoint: endpoint of the request
+    :type endpoint: str
+    :param method: method of the request
+    :type method: str
+    :param status: status code of the response
+    :type status: str
+    :param duration: seconds taken to serve the request
+    :type duration: float
+    """
+    request_counter.inc((endpoint, method, status))
+    request_duration_histogram.observe(duration, (endpoint,))
+
+
+def collect_exchange_rates_metrics(exchange_rates_store):
+    """
+    Sets the gauges describing the exchange rates served by the store given in input and the hit ratios of the
+    caches of the conversion path.
+    :param exchange_rates_store: store serving the exchange rates
+    :type exchange_rates_store: ExchangeRatesStore
+    """
+    # imported here, the conversion path importing this module
+    from server.resources import is_valid_date_string
+    from server.exchange_rates_table import ExchangeRatesTable, LATEST_DATE
+    snapshot = exchange_rates_store.snapshot
+    caches = [('date_validation', is_valid_date_string.cache_info().hits, is_valid_date_string.cache_info().misses),
+              ('date_ordinal', ExchangeRatesTable.get_ordinal.cache_info().hits,
+               ExchangeRatesTable.get_ordinal.cache_info().misses)]
+    if snapshot is not None:
+        (signature, table) = snapshot
+        exchange_rates_fetched_gauge.set(signature[1] / 1e9)   # modification time of the document
+        exchange_rates_loaded_gauge.set(exchange_rates_store.loaded_at)
+        date_index = table.resolve_date_index(LATEST_DATE)
+        if date_index is not None:
+            newest_date = datetime.fromisoformat(table.get_date(date_index)).replace(tzinfo=timezone.utc)
+            exchange_rates_newest_date_gauge.set(newest_date.timestamp())
+        exchange_rates_dates_gauge.set(len(table))
+    for (cache, hits, misses) in caches:
+        cache_hits_gauge.set(hits, (cache,))
+        cache_misses_gauge.set(misses, (cache,))
+        cache_hit_ratio_gauge.set(hits / (hits + misses) if hits + misses > 0 else 0.0, (cache,))
+
+
+"""
+Registry of the metrics of the process, and metrics of the server application.
+"""
+metrics_registry = MetricsRegistry()
+request_counter = metrics_registry.register(Counter(
+    'currency_converter_requests_total', 'Requests served, by endpoint, method and status code.',
+    ('endpoint', 'method', 'status')))
+request_duration_histogram = metrics_registry.register(Histogram(
+    'currency_converter_request_duration_seconds', 'Time taken to serve a request, by endpoint.', ('endpoint',)))
+convert_stage_histogram = metrics_registry.register(Histogram(
+    'currency_converter_convert_stage_duration_seconds',
+    'Time taken by each stage of a conversion request, recorded when SERVER_TIMING is enabled.', ('stage',),
+    STAGE_DURATION_BUCKETS))
+exchange_rates_load_histogram = metrics_registry.register(Histogram(
+    'currency_converter_exchange_rates_load_duration_seconds',
+    'Time taken to load the exchange rates table, by source (snapshot mapped, document parsed, refresh, append).',
+    ('source',), LOAD_DURATION_BUCKETS))
+refresh_counter = metrics_registry.register(Counter(
+    'currency_converter_exchange_rates_refreshes_total',
+    'Background refreshes of the exchange rates, by result (updated, unchanged, skipped, failed).', ('result',)))
+exchange_rates_newest_date_gauge = metrics_registry.register(Gauge(
+    'currency_converter_exchange_rates_newest_date_timestamp_seconds',
+    'Newest date of the exchange rates served, as a UTC timestamp.'))
+exchange_rates_fetched_gauge = metrics_registry.register(Gauge(
+    'currency_converter_exchange_rates_fetched_timestamp_seconds',
+    'Time the exchange rates document served was written to disk.'))
+exchange_rates_loaded_gauge = metrics_registry.register(Gauge(
+    'currency_converter_exchange_rates_loaded_timestamp_seconds',
+    'Time the exchange rates table served was loaded by the process.'))
+exchange_rates_dates_gauge = metrics_registry.register(Gauge(
+    'currency_converter_exchange_rates_dates', 'Number of dates of the exchange rates table served.'))
+cache_hits_gauge = metrics_registry.register(Gauge(
+    'currency_converter_cache_hits', 'Lookups served by a cache of the conversion path.', ('cache',)))
+cache_misses_gauge = metrics_registry.register(Gauge(
+    'currency_converter_cache_misses', 'Lookups missed by a cache of the conversion path.', ('cache',)))
+cache_hit_ratio_gauge = metrics_registry.register(Gauge(
+    'currency_converter_cache_hit_ratio', 'Ratio of the lookups served by a cache of the conversion path.',
+    ('cache',)))
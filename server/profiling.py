@@ -0,0 +1,208 @@
+import os
+import sys
+import hmac
+import time
+import atexit
+import pstats
+import random
+import hashlib
+import itertools
+import cProfile
+import threading
+from server.settings import PROFILING_SAMPLE_RATE, PROFILING_SECRET, PROFILING_DIRECTORY, PROFILING_DUMP_EVERY
+from server.json_log import log_error
+
+"""
+Opt-in profiling hook of the server application: a WSGI middleware running cProfile over a sampled fraction of the
+requests, and over the requests carrying a valid X-Profile-Token header, signed with the profiling secret.
+Sampled profiles are aggregated by endpoint and written every PROFILING_DUMP_EVERY profiles, and when the process
+exits, to '<endpoint>.<pid>.prof'; the profile of a request asking for it with the header is written on its own,
+to '<endpoint>.<pid>.<time>.<number>.prof', whose name is returned in the X-Profile-Document response header.
+The profiles are pstats documents: python -m pstats profiles/api_convert.1234.prof, or any pstats viewer.
+A single request is profiled at a time in each process, a request sampled or asking for its profile while another
+one is profiled being served without profile (and without the X-Profile-Document header): from Python 3.12, cProfile
+runs on sys.monitoring, which cannot hold two profilers at once and records the events of every thread, so a profile
+may also hold the functions run by the other threads of the worker process while the request was served.
+The middleware is installed only when sampling or the header is enabled, so a disabled hook costs nothing.
+"""
+
+PROFILE_TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'   # WSGI name of the X-Profile-Token request header
+
+
+def get_profile_token(secret, expiry):
+    """
+    Returns the token asking for the profile of the requests carrying it, until its expiry.
+    :param secret: profiling secret of the server
+    :type secret: str
+    :param expiry: UNIX time the token expires at
+    :type expiry: int
+    :return: token
+    """
+    signature = hmac.new(secret.encode('utf-8'), str(expiry).encode('ascii'), hashlib.sha256).hexdigest()
+    return '{}.{}'.format(expiry, signature)
+
+
+def is_valid_profile_token(secret, token):
+    """
+    Checks whether the token given in input has been signed with the secret given in input and has not expired.
+    :param secret: profiling secret of the server, empty to reject every token
+    :type secret: str
+    :param token: value of the X-Profile-Token header
+    :type token: str
+    :return: True if the token is valid, False otherwise
+    """
+    if (secret == '') or (token is None):
+        return False
+    (expiry, separator, signature) = token.partition('.')
+    if (expiry.isdigit() is False) or (int(expiry) < time.time()):
+        return False
+    return hmac.compare_digest(get_profile_token(secret, int(expiry)), token)
+
+
+def get_profile_name(endpoint):
+    """
+    Returns the name the profiles of the endpoint given in input are written under.
+    :param endpoint: endpoint of the application
+    :type endpoint: str
+    :return: name
+    """
+    return endpoint.strip('/').replace('/', '_') or 'index'
+
+
+class ProfilingMiddleware(object):
+    """
+    WSGI middleware profiling a sampled fraction of the requests served by an application, and the requests asking
+    for it with a signed header.
+    """
+    def __init__(self, wsgi_app, endpoints, sample_rate=PROFILING_SAMPLE_RATE, secret=PROFILING_SECRET,
+                 directory=PROFILING_DIRECTORY, dump_every=PROFILING_DUMP_EVERY):
+        """
+        ProfilingMiddleware constructor.
+        :param wsgi_app: WSGI application to profile
+        :type wsgi_app: callable
+        :param endpoints: paths of the endpoints of the application, the other paths being profiled as 'other'
+        :type endpoints: iterable
+        :param sample_rate: fraction of the requests profiled
+        :type sample_rate: float
+        :param secret: key of the tokens of the X-Profile-Token header, empty to ignore the header
+        :type secret: str
+        :param directory: folder the profiles are written to
+        :type directory: str
+        :param dump_every: number of sampled profiles of an endpoint aggregated between two writes
+        :type dump_every: int
+        """
+        self.wsgi_app = wsgi_app
+        self.endpoints = frozenset(endpoints)
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.directory = directory
+        self.dump_every = max(1, dump_every)
+        self.profiles = dict()  # endpoint -> [aggregated pstats.Stats, number of profiles not written yet]
+        self.lock = threading.Lock()
+        self.profile_lock = threading.Lock()    # held while a request is profiled
+        self.profile_counter = itertools.count(1)   # number of the next profile asked for with the header
+        atexit.register(self.dump_profiles)
+
+    def __call__(self, environ, start_response):
+        """
+        Serves a request with the application, profiling it if it is sampled or asks for it and no other request
+        is being profiled.
+        """
+        requested = is_valid_profile_token(self.secret, environ.get(PROFILE_TOKEN_HEADER))
+        if (requested is False) and ((self.sample_rate <= 0) or (random.random() >= self.sample_rate)):
+            return self.wsgi_app(environ, start_response)
+        path = environ.get('PATH_INFO', '')
+        endpoint = path if path in self.endpoints else 'other'
+        if requested is True:
+            # the counter tells apart the profiles of an endpoint written by the process within the same second
+            profile_document = os.path.join(self.directory, '{}.{}.{}.{}.prof'.format(
+                get_profile_name(endpoint), os.getpid(), time.strftime('%Y%m%dT%H%M%S'), next(self.profile_counter)))
+
+            def profiled_start_response(status, headers, exc_info=None):
+                return start_response(status, headers + [('X-Profile-Document', os.path.basename(profile_document))],
+                                      exc_info)
+        else:
+            profiled_start_response = start_response
+        # one request is profiled at a time per process, the other ones being served without profile: from Python
+        # 3.12, a profiler records the events of every thread and a second one cannot be enabled while it is active
+        if self.profile_lock.acquire(blocking=False) is False:
+            return self.wsgi_app(environ, start_response)
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                log_error(e, 'start of a profile')  # another profiler is active, the request is served without it
+                return self.wsgi_app(environ, start_response)
+            try:
+                # the application builds the whole response within the call
+                return self.wsgi_app(environ, profiled_start_response)
+            finally:
+                profile.disable()
+                try:
+                    if requested is True:
+                        os.makedirs(self.directory, exist_ok=True)
+                        profile.dump_stats(profile_document)
+                    else:
+                        self.add_profile(endpoint, profile)
+                except Exception as e:
+                    log_error(e, 'write of a profile')    # a profile which cannot be written never fails the request
+        finally:
+            self.profile_lock.release()
+
+    def add_profile(self, endpoint, profile):
+        """
+        Aggregates a sampled profile with the previous ones of its endpoint, writing them every 'dump_every'
+        profiles.
+        :param endpoint: endpoint of the request profiled
+        :type endpoint: str
+        :param profile: profile of the request
+        :type profile: cProfile.Profile
+        """
+        with self.lock:
+            aggregated_profile = self.profiles.get(endpoint, None)
+            if aggregated_profile is None:
+                aggregated_profile = [pstats.Stats(profile), 0]
+                self.profiles[endpoint] = aggregated_profile
+            else:
+                aggregated_profile[0].add(profile)
+            aggregated_profile[1] += 1
+            if aggregated_profile[1] >= self.dump_every:
+                self.dump_profile(endpoint)
+
+    def dump_profile(self, endpoint):
+        """
+        Writes the aggregated profile of the endpoint given in input. Must be called holding the lock.
+        :param endpoint: endpoint of the application
+        :type endpoint: str
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        aggregated_profile = self.profiles[endpoint]
+        profile_document = os.path.join(self.directory, '{}.{}.prof'.format(get_profile_name(endpoint), os.getpid()))
+        aggregated_profile[0].dump_stats(profile_document + '.tmp')
+        os.replace(profile_document + '.tmp', profile_document)     # viewers never read a partial profile
+        aggregated_profile[1] = 0
+
+    def dump_profiles(self):
+        """
+        Writes the aggregated profiles holding profiles not written yet.
+        """
+        with self.lock:
+            for (endpoint, aggregated_profile) in self.profiles.items():
+                if aggregated_profile[1] > 0:
+                    self.dump_profile(endpoint)
+
+
+def is_profiling_enabled(sample_rate=PROFILING_SAMPLE_RATE, secret=PROFILING_SECRET):
+    """
+    Checks whether the profiling hook has to be installed.
+    :return: True if requests are sampled or may ask for their profile, False otherwise
+    """
+    return (sample_rate > 0) or (secret != '')
+
+
+if __name__ == '__main__':
+    # prints a token valid for the number of seconds given in input (default: 600), signed with PROFILING_SECRET
+    if PROFILING_SECRET == '':
+        sys.exit('PROFILING_SECRET is not set')
+    print(get_profile_token(PROFILING_SECRET, int(time.time()) + int(sys.argv[1] if len(sys.argv) > 1 else 600)))
@@ -0,0 +1,81 @@
+from werkzeug.datastructures import MultiDict
+
+"""
+Error message of the Flask-RESTful request parser for a missing required argument, returned as it is.
+"""
+MISSING_PARAMETER_MESSAGE = 'Missing required parameter in the JSON body or the post body or the query string'
+
+
+class RequestValidator(object):
+    """
+    Precompiled validator of the querystring arguments of a request, returning the same arguments and the same
+    error messages as a Flask-RESTful request parser declaring the same arguments, without building a parser
+    for every request.
+    """
+    def __init__(self, arguments):
+        """
+        RequestValidator constructor.
+        :param arguments: (name, type, required) triples, in the order the arguments are validated
+        :type arguments: iterable
+        """
+        self.arguments = tuple(arguments)
+
+    def get_args(self, get_values):
+        """
+        Validates the arguments of a request: the first argument missing or of the wrong type makes the whole
+        request fail, an optional argument missing is None, and an argument given more than once must have valid
+        values only, the first one being kept.
+        :param get_values: function returning the list of the values of an argument, empty if it is missing
+        (e.g. 'getlist' of the request values)
+        :type get_values: callable
+        :return: (request_args, errors), errors being None if the arguments are valid, a dict of argument name ->
+        error message otherwise
+        """
+        request_args = dict()   # initializes the dict of the parsed arguments
+        for (name, argument_type, required) in self.arguments:
+            values = get_values(name)
+            if len(values) == 0:
+                if required is True:
+                    return None, {name: MISSING_PARAMETER_MESSAGE}
+                request_args[name] = None
+                continue
+            try:
+                # a null value of a JSON body is kept as None, as the request parser does
+                if len(values) == 1:
+                    request_args[name] = argument_type(values[0]) if values[0] is not None else None
+                else:
+                    request_args[name] = [argument_type(value) if value is not None else None for value in values][0]
+            except (TypeError, ValueError) as e:
+                return None, {name: str(e)}
+        return request_args, None
+
+
+def get_request_values(request):
+    """
+    Returns the function getting the values of an argument of a Flask request, looked up in the JSON body first,
+    then in the querystring and the form body, as the Flask-RESTful request parser does with its default locations.
+    A request without JSON body, the usual case, is read straight from its values.
+    :param request: Flask request
+    :type request: flask.Request
+    :return: function returning the list of the values of an argument, empty if it is missing
+    """
+    json_body = request.json    # None without a JSON content type, a malformed body being rejected with 400
+    if isinstance(json_body, dict) is False:
+        return request.values.getlist
+    values = MultiDict(json_body)
+    values.update(request.values)
+    return values.getlist
+
+
+"""
+Validator of the arguments of a conversion request.
+"""
+convert_request_validator = RequestValidator([('amount', float, True), ('src-currency', str, True),
+                                              ('dest-currency', str, True), ('reference-date', str, True),
+                                              ('fallback', str, False)])
+
+"""
+Validator of the arguments of a conversion request over a range of dates.
+"""
+series_request_validator = RequestValidator([('amount', float, True), ('src-currency', str, True),
+                                             ('dest-currency', str, True), ('from', str, True), ('to', str, True)])
@@ -1,19 +1,139 @@
-import requests
-import traceback
-from xml.dom import minidom
-from decimal import Decimal, ROUND_DOWN
+from xml.parsers import expat
+from decimal import Decimal, ROUND_DOWN, InvalidOperation
 from custom_api_exception.customexception import CustomAPIException
+from server.exchange_rates_table import ExchangeRatesTable, LATEST_DATE, PREVIOUS_FALLBACK
+from server.fixed_point import get_converted_minor_units, MINOR_UNIT_SCALE
+from server.json_log import log_error
+from server.exchange_rates_fetcher import exchange_rates_fetcher
+from server.settings import ECB_EXCHANGE_RATES_URL
+from bisect import bisect_right
+from functools import lru_cache
 from datetime import datetime
 
 
+def validate_exchange_rates(exchange_rates_dict):
+    """
+    Checks if the exchange rates given in input can be used by the conversion functions.
+    An ExchangeRatesTable is validated once, when it is built, and is trusted as it is;
+    a dict is walked to check that every date maps to a dict of str -> Decimal exchange rates.
+    :param exchange_rates_dict: dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :return: is_valid
+    """
+    if isinstance(exchange_rates_dict, ExchangeRatesTable) is True:
+        return True
+    if isinstance(exchange_rates_dict, dict) is False:
+        return False
+    if all(isinstance(er, dict) for (kr, er) in exchange_rates_dict.items()) is False:
+        return False
+    return all(all((type(k) is str) and (isinstance(v, Decimal) is True) for (k, v) in er.items()) is True
+               for (kr, er) in exchange_rates_dict.items())
+
+
+def lookup_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date):
+    """
+    Gets the EUR/SRC_CURR and EUR/DST_CURR exchange rates at the given date and computes the conversion factor.
+    The parameters are expected to have been validated by the caller.
+    :param exchange_rates_dict: validated dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :param src_currency: original currency of the amount to convert.
+    :type src_currency: str
+    :param dst_currency: destination currency of the amount to convert.
+    :type dst_currency: str
+    :param date: date of the exchange rate to consider (YYYY-MM-DD format)
+    :type date: str
+    :return: conversion_factor: factor to be used to convert the amount
+    """
+    if isinstance(exchange_rates_dict, ExchangeRatesTable) is True:
+        (src_exchange_rate, dst_exchange_rate) = lookup_scaled_rates(exchange_rates_dict, src_currency, dst_currency,
+                                                                     date)
+        # gets the conversion factor, the scale of the two rates cancelling out
+        return Decimal(dst_exchange_rate) / Decimal(src_exchange_rate)
+
+    # retrieves the dict containing the exchange rate at the selected date
+    selected_exchange_rates = exchange_rates_dict.get(date, None)
+    # if there is no exchange rate available for the selected date
+    if selected_exchange_rates is None:
+        raise CustomAPIException(f'No exchange rate found for the selected date {date}.', 400)
+    # gets the source currency exchange rate
+    src_exchange_rate = selected_exchange_rates.get(src_currency, None)
+    if src_exchange_rate is None:
+        raise CustomAPIException(f'No exchange rate found for the currency {src_currency}.', 400)
+    # gets the destination currency exchange rate
+    dst_exchange_rate = selected_exchange_rates.get(dst_currency, None)
+    if dst_exchange_rate is None:
+        raise CustomAPIException(f'No exchange rate found for the currency {dst_currency}.', 400)
+    return Decimal(dst_exchange_rate / src_exchange_rate)  # gets the conversion factor
+
+
+def lookup_scaled_rates(exchange_rates_table, src_currency, dst_currency, date):
+    """
+    Gets the EUR/SRC_CURR and EUR/DST_CURR exchange rates at the given date, scaled to integers by the table.
+    The parameters are expected to have been validated by the caller.
+    :param exchange_rates_table: table containing all available exchange rates
+    :type exchange_rates_table: ExchangeRatesTable
+    :param src_currency: original currency of the amount to convert.
+    :type src_currency: str
+    :param dst_currency: destination currency of the amount to convert.
+    :type dst_currency: str
+    :param date: date of the exchange rate to consider (YYYY-MM-DD format)
+    :type date: str
+    :return: (src_scaled_rate, dst_scaled_rate)
+    """
+    # gets the source and destination currency exchange rates at the selected date, scaled by the table
+    scaled_rates = exchange_rates_table.get_scaled_rates(date, src_currency, dst_currency)
+    # if there is no exchange rate available for the selected date
+    if scaled_rates is None:
+        raise CustomAPIException(f'No exchange rate found for the selected date {date}.', 400)
+    (src_exchange_rate, dst_exchange_rate) = scaled_rates
+    if src_exchange_rate is None:
+        raise CustomAPIException(f'No exchange rate found for the currency {src_currency}.', 400)
+    if dst_exchange_rate is None:
+        raise CustomAPIException(f'No exchange rate found for the currency {dst_currency}.', 400)
+    return src_exchange_rate, dst_exchange_rate
+
+
+def resolve_date(exchange_rates_dict, date, fallback=None):
+    """
+    Resolves the reference date of a conversion to the date whose exchange rates are used: LATEST_DATE resolves
+    to the newest date available and, with the PREVIOUS_FALLBACK fallback, a date without exchange rates (e.g. a
+    weekend or a holiday) resolves to the closest prior date with exchange rates.
+    The parameters are expected to have been validated by the caller.
+    :param exchange_rates_dict: validated dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :param date: date of the exchange rate to consider (YYYY-MM-DD format), or LATEST_DATE
+    :type date: str
+    :param fallback: PREVIOUS_FALLBACK, or None to use the date only
+    :type fallback: str
+    :return: resolved_date (YYYY-MM-DD format)
+    """
+    if isinstance(exchange_rates_dict, ExchangeRatesTable) is True:
+        # a single binary search over the sorted dates of the table
+        date_index = exchange_rates_dict.resolve_date_index(date, fallback)
+        if date_index is None:
+            raise CustomAPIException(f'No exchange rate found for the selected date {date}.', 400)
+        return exchange_rates_dict.get_date(date_index)
+
+    dates = sorted(exchange_rates_dict.keys())
+    if date == LATEST_DATE:
+        date_index = len(dates) - 1
+    elif fallback == PREVIOUS_FALLBACK:
+        date_index = bisect_right(dates, date) - 1  # newest date not after the one given in input
+    else:
+        date_index = len(dates) if exchange_rates_dict.get(date, None) is None else dates.index(date)
+    if (date_index < 0) or (date_index >= len(dates)):
+        raise CustomAPIException(f'No exchange rate found for the selected date {date}.', 400)
+    return dates[date_index]
+
+
 def get_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date):
     """
     Opens the updated XML document containing the updated exchange rates,
     gets the EUR/SRC_CURR and EUR/DST_CURR exchange rates and computes the
     factor to be used to convert an monetary amount from the source currency
     to the destination one.
-    :param exchange_rates_dict: dict containing all available exchange rates
-    :type exchange_rates_dict: dict
+    :param exchange_rates_dict: dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
     :param src_currency: original currency of the amount to convert.
     :type src_currency: str
     :param dst_currency: destination currency of the amount to convert.
@@ -26,17 +146,12 @@ def get_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date)
     try:
         # parameters validation section
 
-        if isinstance(exchange_rates_dict, dict) is False:
-            raise CustomAPIException('Internal Error.', 500)
-        if all(isinstance(er, dict) for (kr, er) in exchange_rates_dict.items()) is False:
-            raise CustomAPIException('Internal Error.', 500)
-        if all(all((type(k) is str) and (isinstance(v, Decimal) is True) for (k, v) in er.items()) is True
-                for (kr, er) in exchange_rates_dict.items()) is False:
+        if validate_exchange_rates(exchange_rates_dict) is False:
             raise CustomAPIException('Internal Error.', 500)
 
         if type(date) is not str:
             raise CustomAPIException('Date must be a string.', 400)
-        if validate_date_string(date) is False:
+        if is_valid_date_string(date) is False:
             raise CustomAPIException('Invalid date ' + str(date), 400)
 
         if type(src_currency) is not str:
@@ -44,32 +159,78 @@ def get_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date)
         if type(dst_currency) is not str:
             raise CustomAPIException('Destination currency must be a string.', 400)
 
-        # retrieves the dict containing the exchange rate at the selected date
-        selected_exchange_rates = exchange_rates_dict.get(date, None)
-        # if there is no exchange rate available for the selected date
-        if selected_exchange_rates is None:
-            raise CustomAPIException(f'No exchange rate found for the selected date {date}.', 400)
-        # gets the source currency exchange rate
-        src_exchange_rate = selected_exchange_rates.get(src_currency, None)
-        if src_exchange_rate is None:
-            raise CustomAPIException(f'No exchange rate found for the currency {src_currency}.', 400)
-        # gets the destination currency exchange rate
-        dst_exchange_rate = selected_exchange_rates.get(dst_currency, None)
-        if dst_exchange_rate is None:
-            raise CustomAPIException(f'No exchange rate found for the currency {dst_currency}.', 400)
-        conversion_factor = Decimal(dst_exchange_rate / src_exchange_rate)  # gets the conversion factor
+        # gets the conversion factor
+        conversion_factor = lookup_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date)
     except Exception as e:
         raise e  # propagates the Exception
 
     return conversion_factor
 
 
+def validate_currency(currency, currency_role):
+    """
+    Checks if the currency given in input is a string without digits, raising a CustomAPIException otherwise.
+    :param currency: ISO code of the currency
+    :type currency: str
+    :param currency_role: role of the currency in the conversion, used in the error message (e.g. 'Source')
+    :type currency_role: str
+    """
+    if type(currency) is not str:
+        raise CustomAPIException(f'{currency_role} currency must be a string.', 400)
+    if currency.isnumeric() is True:
+        raise CustomAPIException(f'{currency_role} currency must be a string.', 400)
+    if any(char.isdigit() for char in currency) is True:
+        raise CustomAPIException(f'{currency_role} currency must not contain digits.', 400)
+
+
+def is_known_currency(exchange_rates_dict, currency):
+    """
+    Checks if the currency given in input is one of the currencies of the table given in input, all of them being
+    validated ISO codes.
+    :param exchange_rates_dict: dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :param currency: ISO code of the currency
+    :type currency: str
+    :return: is_known, always False for a dict
+    """
+    return (type(currency) is str) and (isinstance(exchange_rates_dict, ExchangeRatesTable) is True) and \
+        (currency in exchange_rates_dict.known_currencies)
+
+
+def validate_amount(amount):
+    """
+    Checks that the amount to convert is a finite number, raising a CustomAPIException otherwise: the Decimal
+    conversion path would return NaN, which is not valid JSON, or fail on an infinite amount.
+    :param amount: amount to convert
+    :type amount: float or Decimal
+    """
+    if Decimal(amount).is_finite() is False:
+        raise CustomAPIException(f'Invalid amount {float(amount)}', 400)  # the same message for float and Decimal
+
+
+def get_converted_amount(amount, conversion_factor):
+    """
+    Multiplies the amount by the conversion factor, rounding the result down to the cent.
+    An amount whose converted amount has more digits than the precision of the Decimal context raises a
+    CustomAPIException with status code 400.
+    :param amount: amount to convert
+    :type amount: Decimal
+    :param conversion_factor: factor to be used to convert the amount
+    :type conversion_factor: Decimal
+    :return: converted_amount
+    """
+    try:
+        return Decimal(Decimal(amount)*conversion_factor).quantize(Decimal('.01'), rounding=ROUND_DOWN)
+    except InvalidOperation:
+        raise CustomAPIException(f'Invalid amount {float(amount)}', 400)   # out of the range of the conversion
+
+
 def get_currency_converted_amount(exchange_rates_dict, amount, src_currency, dst_currency, date):
     """
     Converts the amount given in input from a specific source currency to a destination currency.
     The currency conversion exploits the conversion rate updated at the date given in input.
-    :param exchange_rates_dict: dict containing all available exchange rates
-    :type exchange_rates_dict: dict
+    :param exchange_rates_dict: dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
     :param amount: amount to convert
     :type amount: Decimal
     :param src_currency: original currency of the amount to convert
@@ -80,110 +241,311 @@ def get_currency_converted_amount(exchange_rates_dict, amount, src_currency, dst
     :type date: str
     :return: converted_amount
     """
+    try:
+        (converted_amount, date) = get_currency_converted_amount_at_date(exchange_rates_dict, amount, src_currency,
+                                                                         dst_currency, date)
+    except Exception as e:
+        raise e
+    return converted_amount
+
+
+def validate_conversion_at_date(exchange_rates_dict, src_currency, dst_currency, date, fallback=None):
+    """
+    Checks the currencies, the date and the fallback of a conversion, raising a CustomAPIException if any of them
+    is invalid, and resolves the date whose exchange rates are to be used.
+    :param exchange_rates_dict: validated dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :param src_currency: original currency of the amount to convert
+    :type src_currency: str
+    :param dst_currency: destination currency of the amount to convert
+    :type dst_currency: str
+    :param date: date of the exchange rate to consider (YYYY-MM-DD format), or LATEST_DATE
+    :type date: str
+    :param fallback: PREVIOUS_FALLBACK, or None to use the date only
+    :type fallback: str
+    :return: date, the date whose exchange rates are to be used
+    """
+    if type(date) is not str:
+        raise CustomAPIException('Date must be a string.', 400)
+    if (date != LATEST_DATE) and (is_valid_date_string(date) is False):
+        raise CustomAPIException(f'Invalid date {date}', 400)
+    if fallback not in (None, PREVIOUS_FALLBACK):
+        raise CustomAPIException(f'Invalid fallback {fallback}', 400)
+
+    # a currency of the table has already been validated, only the other ones are checked
+    if is_known_currency(exchange_rates_dict, src_currency) is False:
+        validate_currency(src_currency, 'Source')
+    if is_known_currency(exchange_rates_dict, dst_currency) is False:
+        validate_currency(dst_currency, 'Destination')
+
+    if (date == LATEST_DATE) or (fallback is not None):
+        date = resolve_date(exchange_rates_dict, date, fallback)    # gets the date actually used
+    return date
+
+
+def get_currency_converted_amount_at_date(exchange_rates_dict, amount, src_currency, dst_currency, date,
+                                          fallback=None):
+    """
+    Converts the amount given in input from a specific source currency to a destination currency, with the
+    exchange rates of the date given in input, of the newest date available if the date is LATEST_DATE, or of the
+    closest prior date if the date has no exchange rates and the fallback is PREVIOUS_FALLBACK.
+    :param exchange_rates_dict: dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :param amount: amount to convert
+    :type amount: Decimal
+    :param src_currency: original currency of the amount to convert
+    :type src_currency: str
+    :param dst_currency:
+    :type dst_currency: str
+    :param date: date of the exchange rate to consider (YYYY-MM-DD format), or LATEST_DATE
+    :type date: str
+    :param fallback: PREVIOUS_FALLBACK, or None to use the date only
+    :type fallback: str
+    :return: (converted_amount, date), date being the date whose exchange rates have been used
+    """
     converted_amount = None  # initializes the variable used ot store the value to return
     try:
         # parameter validation section
-        if isinstance(exchange_rates_dict, dict) is False:
-            raise CustomAPIException('Internal Error.', 500)
-        if all(isinstance(er, dict) for (kr, er) in exchange_rates_dict.items()) is False:
-            raise CustomAPIException('Internal Error.', 500)
-        if all(all((type(k) is str) and (isinstance(v, Decimal) is True) for (k, v) in er.items()) is True
-                for (kr, er) in exchange_rates_dict.items()) is False:
+        if validate_exchange_rates(exchange_rates_dict) is False:
             raise CustomAPIException('Internal Error.', 500)
 
         if isinstance(amount, Decimal) is False:
             raise CustomAPIException(f'Invalid amount {amount}', 400)
+        validate_amount(amount)
 
-        if type(date) is not str:
-            raise CustomAPIException('Date must be a string.', 400)
-        if validate_date_string(date) is False:
-            raise CustomAPIException(f'Invalid date {date}', 400)
-
-        if type(src_currency) is not str:
-            raise CustomAPIException('Source currency must be a string.', 400)
-        if src_currency.isnumeric() is True:
-            raise CustomAPIException('Source currency must be a string.', 400)
-        if any(char.isdigit() for char in src_currency) is True:
-            raise CustomAPIException('Source currency must not contain digits.', 400)
-
-        if type(dst_currency) is not str:
-            raise CustomAPIException('Destination currency must be a string.', 400)
-        if dst_currency.isnumeric() is True:
-            raise CustomAPIException('Destination currency must be a string.', 400)
-        if any(char.isdigit() for char in dst_currency) is True:
-            raise CustomAPIException('Destination currency must not contain digits.', 400)
-
-        # gets the factor to be used to convert the amount in input to the destination factor
-        conversion_factor = get_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date)
+        date = validate_conversion_at_date(exchange_rates_dict, src_currency, dst_currency, date, fallback)
+        # gets the factor to be used to convert the amount in input to the destination factor,
+        # the parameters having already been validated
+        conversion_factor = lookup_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date)
         if conversion_factor is not None:
             # calculates the converted amount
-            converted_amount = Decimal(Decimal(amount)*conversion_factor).quantize(Decimal('.01'), rounding=ROUND_DOWN)
+            converted_amount = get_converted_amount(amount, conversion_factor)
         elif conversion_factor is None:
             raise Exception('An error occurred while trying to convert currency for the desired amount')
     except Exception as e:
         raise e
-    return converted_amount
+    return converted_amount, date
 
 
-def get_exchange_rates_dict():
+def get_currency_converted_float_amount_at_date(exchange_rates_dict, amount, src_currency, dst_currency, date,
+                                                fallback=None, stage_timer=None):
+    """
+    Converts the float amount given in input as 'get_currency_converted_amount_at_date' does, returning the float
+    of the same converted amount. With an exchange rates table, an amount of whole cents is converted by the
+    fixed-point engine, with integer operations only; the Decimal conversion path is used otherwise.
+    :param exchange_rates_dict: dict or table containing all available exchange rates
+    :type exchange_rates_dict: dict or ExchangeRatesTable
+    :param amount: amount to convert
+    :type amount: float
+    :param src_currency: original currency of the amount to convert
+    :type src_currency: str
+    :param dst_currency: destination currency of the amount to convert
+    :type dst_currency: str
+    :param date: date of the exchange rate to consider (YYYY-MM-DD format), or LATEST_DATE
+    :type date: str
+    :param fallback: PREVIOUS_FALLBACK, or None to use the date only
+    :type fallback: str
+    :param stage_timer: timer marking the validation, factor and rounding stages, None not to time them
+    :type stage_timer: StageTimer
+    :return: (converted_amount, date), date being the date whose exchange rates have been used
+    """
+    converted_amount = None  # initializes the variable used to store the value to return
+    try:
+        # parameter validation section
+        if validate_exchange_rates(exchange_rates_dict) is False:
+            raise CustomAPIException('Internal Error.', 500)
+
+        if type(amount) is not float:
+            raise CustomAPIException(f'Invalid amount {amount}', 400)
+        validate_amount(amount)
+
+        date = validate_conversion_at_date(exchange_rates_dict, src_currency, dst_currency, date, fallback)
+        if stage_timer is not None:
+            stage_timer.mark('validation')
+        converted_minor_units = None    # initializes the amount converted by the fixed-point engine
+        if isinstance(exchange_rates_dict, ExchangeRatesTable) is True:
+            (src_exchange_rate, dst_exchange_rate) = lookup_scaled_rates(exchange_rates_dict, src_currency,
+                                                                         dst_currency, date)
+            if stage_timer is not None:
+                stage_timer.mark('factor')
+            converted_minor_units = get_converted_minor_units(amount, src_exchange_rate, dst_exchange_rate)
+        if converted_minor_units is not None:
+            converted_amount = converted_minor_units / MINOR_UNIT_SCALE
+        else:
+            # the amount is not a whole number of cents, or its converted amount is too close to a cent boundary
+            conversion_factor = lookup_conversion_factor(exchange_rates_dict, src_currency, dst_currency, date)
+            # with a table, the factor stage closed at the scaled rates lookup: falling back to the Decimal path is
+            # part of the rounding stage
+            if (stage_timer is not None) and (isinstance(exchange_rates_dict, ExchangeRatesTable) is False):
+                stage_timer.mark('factor')
+            converted_amount = float(get_converted_amount(Decimal(amount), conversion_factor))
+        if stage_timer is not None:
+            stage_timer.mark('rounding')
+    except Exception as e:
+        raise e
+    return converted_amount, date
+
+
+def get_currency_converted_series(exchange_rates_table, amount, src_currency, dst_currency, from_date, to_date):
+    """
+    Converts the amount given in input from a specific source currency to a destination currency, once for every
+    date between the two dates given in input for which the ECB published both exchange rates.
+    The dates are read in a single pass over the rows of the table; dates without exchange rates are skipped.
+    :param exchange_rates_table: table containing all available exchange rates
+    :type exchange_rates_table: ExchangeRatesTable
+    :param amount: amount to convert
+    :type amount: Decimal
+    :param src_currency: original currency of the amount to convert
+    :type src_currency: str
+    :param dst_currency: destination currency of the amount to convert
+    :type dst_currency: str
+    :param from_date: oldest date of the series (YYYY-MM-DD format)
+    :type from_date: str
+    :param to_date: newest date of the series (YYYY-MM-DD format)
+    :type to_date: str
+    :return: converted_series, list of (date, converted_amount) pairs in ascending date order
+    """
+    converted_series = list()   # initializes the list used to store the values to return
+    try:
+        # parameter validation section
+        if isinstance(exchange_rates_table, ExchangeRatesTable) is False:
+            raise CustomAPIException('Internal Error.', 500)
+
+        if isinstance(amount, Decimal) is False:
+            raise CustomAPIException(f'Invalid amount {amount}', 400)
+        validate_amount(amount)
+
+        for date in (from_date, to_date):
+            if type(date) is not str:
+                raise CustomAPIException('Date must be a string.', 400)
+            if is_valid_date_string(date) is False:
+                raise CustomAPIException(f'Invalid date {date}', 400)
+        # gets the rows of the table holding the dates of the series
+        date_indexes = exchange_rates_table.get_date_indexes(from_date, to_date)
+        if (date_indexes is None) or (from_date > to_date):
+            raise CustomAPIException(f'Invalid date range {from_date} - {to_date}', 400)
+
+        validate_currency(src_currency, 'Source')
+        validate_currency(dst_currency, 'Destination')
+        src_currency_index = exchange_rates_table.get_currency_index(src_currency)
+        if src_currency_index is None:
+            raise CustomAPIException(f'No exchange rate found for the currency {src_currency}.', 400)
+        dst_currency_index = exchange_rates_table.get_currency_index(dst_currency)
+        if dst_currency_index is None:
+            raise CustomAPIException(f'No exchange rate found for the currency {dst_currency}.', 400)
+
+        for date_index in date_indexes:
+            # gets the source and destination exchange rates at the current date, scaled by the table
+            src_exchange_rate = exchange_rates_table.get_scaled_rate(date_index, src_currency_index)
+            dst_exchange_rate = exchange_rates_table.get_scaled_rate(date_index, dst_currency_index)
+            if (src_exchange_rate is not None) and (dst_exchange_rate is not None):
+                conversion_factor = Decimal(dst_exchange_rate) / Decimal(src_exchange_rate)
+                converted_series.append((exchange_rates_table.get_date(date_index),
+                                         get_converted_amount(amount, conversion_factor)))
+    except Exception as e:
+        raise e
+    return converted_series
+
+
+def iter_exchange_rates(exchange_rates_document='assets/exchange_rates.xml', chunk_size=65536):
+    """
+    Streams the exchange rates out of the exchange rates document, one date at a time.
+    The document is fed to an expat parser in chunks and every 'Cube' element is dropped as soon as
+    its attributes have been read, so memory usage does not grow with the size of the document.
+    :param exchange_rates_document: full name of the exchange rates document
+    :type exchange_rates_document: str
+    :param chunk_size: number of bytes read from the document at each step
+    :type chunk_size: int
+    :return: generator of (date, exchange_rates) pairs, exchange_rates being a dict of currency -> Decimal rate
+    """
+    parsed_dates = []  # initializes the list of (date, exchange_rates) pairs completed by the current chunk
+    # initializes the parsing state: date currently open, its exchange rates and its depth in the document
+    state = dict(date=None, exchange_rates=None, date_depth=0, depth=0)
+
+    def start_element(name, attributes):
+        state['depth'] += 1
+        if state['date'] is not None:
+            # every direct child of a dated 'Cube' must define an exchange rate
+            if state['depth'] == state['date_depth'] + 1:
+                if ('currency' in attributes) and ('rate' in attributes):
+                    state['exchange_rates'][attributes['currency']] = Decimal(attributes['rate'])
+                else:
+                    raise TypeError('The XML document is wrongly formatted.')
+        elif (name == 'Cube') and ('time' in attributes):
+            # opens the exchange rates updated at the date defined by the node 'time' attribute
+            state['date'] = attributes['time']
+            state['exchange_rates'] = dict()
+            state['date_depth'] = state['depth']
+
+    def end_element(name):
+        if (state['date'] is not None) and (state['depth'] == state['date_depth']):
+            # sets the exchange rates for Euro and closes the current date
+            state['exchange_rates']['EUR'] = Decimal(1.0)
+            parsed_dates.append((state['date'], state['exchange_rates']))
+            state['date'] = None
+            state['exchange_rates'] = None
+        state['depth'] -= 1
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    is_empty = True     # initializes the flag used to check whether the document contains at least one date
+    with open(exchange_rates_document, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            parser.Parse(chunk, len(chunk) == 0)
+            if len(parsed_dates) > 0:
+                is_empty = False
+                yield from parsed_dates
+                parsed_dates.clear()
+            if len(chunk) == 0:
+                break
+    if is_empty is True:
+        raise TypeError('The XML document is wrongly formatted.')
+
+
+def get_exchange_rates_dict(exchange_rates_document='assets/exchange_rates.xml'):
     """
     Retrieves the list of the available exchange rates from the updated exchange rates document.
+    :param exchange_rates_document: full name of the exchange rates document
+    :type exchange_rates_document: str
     :return: exchange_rates_dict
     """
     # initializes the variable used to store the dict containing all the available exchange rates
     exchange_rates_dict = None
-    # initializes the variable containing the full name of the exchange rate document
-    exchange_rates_document = 'assets/exchange_rates.xml'
 
     try:
-        # parses the XML file containing the updated exchange rates
-        exchange_rate_doc = minidom.parse(exchange_rates_document)
-        # initializes the variable used to store the dict containing all the available exchange rates
         exchange_rates_dict = dict()
-        # initializes the variable used to store the dict containing all the available exchange rates
-        cube_nodes = exchange_rate_doc.getElementsByTagName('Cube')
-        # for each sub-element in the main node
-        for c in cube_nodes:
-            # if the sub-element contains the 'time' attribute
-            if 'time' in c.attributes:
-                # initializes the dict of currency exchange rates updated at the date
-                # defined by the node 'time' attribute
-                exchange_rates_dict[c.attributes['time'].value] = dict()
-                # for each exchange rate in the current sub-element
-                for er in c.childNodes:
-                    # if the exchange rate node contains the 'currency' and 'rate' attributes
-                    if ('currency' in er.attributes) and ('rate' in er.attributes):
-                        # sets the exchange rate value for the current exchange rate node
-                        exchange_rates_dict[c.attributes['time'].value][er.attributes['currency'].value] = \
-                            Decimal(er.attributes['rate'].value)
-                    else:
-                        raise TypeError('The XML document is wrongly formatted.')
-                # sets the exchange rates for Euro
-                exchange_rates_dict[c.attributes['time'].value]['EUR'] = Decimal(1.0)
-        if len(list(exchange_rates_dict.keys())) == 0:
-            raise TypeError('The XML document is wrongly formatted.')
+        # streams the exchange rates updated at each date defined in the document
+        for (date, exchange_rates) in iter_exchange_rates(exchange_rates_document):
+            exchange_rates_dict[date] = exchange_rates
     except Exception as e:
         raise e  # raises exception
     return exchange_rates_dict
 
 
+def get_exchange_rates_table(exchange_rates_document='assets/exchange_rates.xml'):
+    """
+    Retrieves the table of the available exchange rates from the updated exchange rates document.
+    :param exchange_rates_document: full name of the exchange rates document
+    :type exchange_rates_document: str
+    :return: exchange_rates_table
+    """
+    return ExchangeRatesTable.from_exchange_rates(iter_exchange_rates(exchange_rates_document))
+
+
 def get_updated_exchange_rates_document():
     """
     Sends an HTTP GET request to ECB Europe to get the updated
     exchange rate XML document, with EURO as reference.
-    The XML document is then saved inside an XML file.
+    The XML document is streamed to a temporary file, checked, then renamed in place of the exchange rates document,
+    so that a reader never parses a partially written document; the document in place is kept if the download fails.
     """
     try:
-        # sends an HTTP GET request to ECB Europe to get the updated exchange rate XML file
-        response = requests.get('https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist-90d.xml')
-        # if the response is valid
-        if (response.status_code == 200) and (response.content is not None):
-            with open('assets/exchange_rates.xml', 'w') as f:
-                f.write(str(response.content, 'utf-8'))
-            f.close()
+        # downloads the updated exchange rate XML file, retried and bounded by timeouts, and replaces the local one
+        exchange_rates_fetcher.fetch(ECB_EXCHANGE_RATES_URL, 'assets/exchange_rates.xml', get_exchange_rates_table)
     except Exception as e:
-        traceback.print_exc()
-        print(e)
+        log_error(e, 'download of the exchange rates document')
 
 
 def validate_date_string(date):
@@ -202,3 +564,14 @@ def validate_date_string(date):
         pass
     return is_valid  # returns the flag
 
+
+@lru_cache(maxsize=4096)
+def is_valid_date_string(date):
+    """
+    Cached version of 'validate_date_string', for date strings: requests refer to few distinct dates, so most of them
+    are checked without parsing the date string again.
+    :param date: date string
+    :type date: str
+    :return: is_valid
+    """
+    return validate_date_string(date)
@@ -0,0 +1,76 @@
+import os
+
+"""
+Settings of the currency converter server, read once from the environment variables.
+"""
+
+# maximum number of items of a batch conversion request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# URL of the ECB document holding the exchange rates of the last 90 days
+ECB_EXCHANGE_RATES_URL = os.environ.get('ECB_EXCHANGE_RATES_URL',
+                                        'https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist-90d.xml')
+
+# seconds between two checks of the exchange rates document by the requests, which otherwise serve the table in
+# memory; the refresher of the process swaps a new table in as soon as it loads it, whatever the interval
+EXCHANGE_RATES_CHECK_INTERVAL = float(os.environ.get('EXCHANGE_RATES_CHECK_INTERVAL', 1.0))
+
+# seconds between two refreshes of the exchange rates in the background, 0 disables the background refresh
+REFRESH_INTERVAL = float(os.environ.get('REFRESH_INTERVAL', 3600))
+
+# seconds a conversion at a date older than the newest published one may be cached by clients and proxies
+HISTORICAL_CONVERSION_MAX_AGE = int(os.environ.get('HISTORICAL_CONVERSION_MAX_AGE', 31536000))
+
+# URLs of the ECB documents holding the exchange rates of the last business day and of the full history
+ECB_DAILY_EXCHANGE_RATES_URL = os.environ.get('ECB_DAILY_EXCHANGE_RATES_URL',
+                                              'https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml')
+ECB_HISTORY_EXCHANGE_RATES_URL = os.environ.get('ECB_HISTORY_EXCHANGE_RATES_URL',
+                                                'https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.xml')
+
+# path of the append-only local history of the exchange rates, fed by the daily ECB document; empty to serve the
+# last downloaded 90-day document instead
+EXCHANGE_RATES_HISTORY_DOCUMENT = os.environ.get('EXCHANGE_RATES_HISTORY_DOCUMENT', '')
+
+# address the production server listens on
+BIND = os.environ.get('BIND', '0.0.0.0:8080')
+
+# number of worker processes and of threads per worker process of the production server
+WORKERS = int(os.environ.get('WORKERS', os.cpu_count() or 1))
+THREADS = int(os.environ.get('THREADS', 4))
+
+# number of requests after which a worker process of the production server is replaced, 0 never replaces it;
+# a random jitter up to MAX_REQUESTS_JITTER keeps the workers from being replaced at the same time
+MAX_REQUESTS = int(os.environ.get('MAX_REQUESTS', 10000))
+MAX_REQUESTS_JITTER = int(os.environ.get('MAX_REQUESTS_JITTER', 1000))
+
+# seconds a worker process of the production server is given to finish its requests before being killed
+GRACEFUL_TIMEOUT = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+
+# fraction of the requests profiled by the profiling hook, 0 profiles none of them
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+
+# key of the tokens of the X-Profile-Token request header, asking for the profile of a single request; empty
+# ignores the header
+PROFILING_SECRET = os.environ.get('PROFILING_SECRET', '')
+
+# folder the profiles are written to, and number of sampled profiles aggregated between two writes
+PROFILING_DIRECTORY = os.environ.get('PROFILING_DIRECTORY', 'profiles')
+PROFILING_DUMP_EVERY = int(os.environ.get('PROFILING_DUMP_EVERY', 100))
+
+# whether '/api/convert' responses carry a Server-Timing header splitting the request into stages, whose durations
+# are recorded by the metrics as well
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+
+# path of the JSON access log, '-' for the standard output, empty disables it; path of the JSON error log, '-' for
+# the standard error; maximum number of entries waiting to be written, the entries beyond it being dropped
+ACCESS_LOG = os.environ.get('ACCESS_LOG', '')
+ERROR_LOG = os.environ.get('ERROR_LOG', '-')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+# (connect, read) timeouts, in seconds, of each download of an ECB document, retries of a download failing to
+# connect or answered with a server error, backoff factor of the retries (0, 2, 4... times the factor, in seconds),
+# and connections kept alive per host
+FETCH_TIMEOUT = (float(os.environ.get('FETCH_CONNECT_TIMEOUT', 5)), float(os.environ.get('FETCH_READ_TIMEOUT', 30)))
+FETCH_RETRIES = int(os.environ.get('FETCH_RETRIES', 3))
+FETCH_BACKOFF_FACTOR = float(os.environ.get('FETCH_BACKOFF_FACTOR', 0.2))
+FETCH_POOL_SIZE = int(os.environ.get('FETCH_POOL_SIZE', 4))
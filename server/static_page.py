@@ -0,0 +1,122 @@
+import os
+import gzip
+import time
+import threading
+from email.utils import formatdate
+from server.http_caching import get_etag, is_not_modified
+from server.json_log import log_error
+
+
+class StaticPage(object):
+    """
+    Static page served from memory.
+    The page is read once, together with its gzip-compressed copy, its ETag and its Last-Modified date, and read
+    again only when the file changes on disk; the file is checked at most once every 'check_interval' seconds, so
+    serving the page costs no disk I/O. Conditional requests matching the page served get a 304 response.
+    """
+    def __init__(self, page_document, content_type='text/html', default_content='', check_interval=1.0):
+        """
+        StaticPage constructor.
+        :param page_document: path of the page
+        :type page_document: str
+        :param content_type: content type of the page
+        :type content_type: str
+        :param default_content: content served if the page has never been read
+        :type default_content: str
+        :param check_interval: minimum number of seconds between two checks of the file
+        :type check_interval: float
+        """
+        self.page_document = page_document
+        self.content_type = content_type
+        self.default_content = default_content
+        self.check_interval = check_interval
+        self.lock = threading.Lock()    # serializes reloads, readers never take it
+        self.snapshot = None    # (signature, content, gzip_content, etag, last_modified) of the page served
+        self.checked_at = None  # monotonic time of the last check of the file
+
+    def get_snapshot(self):
+        """
+        Returns the page currently served, reading the file again first if it changed since it was read.
+        :return: (signature, content, gzip_content, etag, last_modified)
+        """
+        snapshot = self.snapshot    # single read, the snapshot is never mutated in place
+        now = time.monotonic()
+        if (snapshot is not None) and (now - self.checked_at < self.check_interval):
+            return snapshot
+        if self.lock.acquire(snapshot is None) is False:
+            return snapshot     # another thread is checking the file
+        try:
+            self.checked_at = now
+            try:
+                stat = os.stat(self.page_document)
+                signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if (self.snapshot is None) or (self.snapshot[0] != signature):
+                    with open(self.page_document, 'rb') as f:
+                        content = f.read()
+                    self.snapshot = self.get_page_snapshot(signature, content, stat.st_mtime)
+            except Exception as e:
+                # logs the exception and keeps serving the page already read, if any
+                log_error(e, 'read of the page')
+                if self.snapshot is None:
+                    self.snapshot = self.get_page_snapshot(None, self.default_content.encode('utf-8'), time.time())
+            return self.snapshot
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def get_page_snapshot(signature, content, modified_time):
+        """
+        Builds the snapshot of the page, with its gzip-compressed copy and its validators.
+        :param signature: signature of the file the page has been read from
+        :type signature: tuple
+        :param content: content of the page
+        :type content: bytes
+        :param modified_time: last modification time of the page, in seconds since the epoch
+        :type modified_time: float
+        :return: (signature, content, gzip_content, etag, last_modified)
+        """
+        return signature, content, gzip.compress(content, mtime=0), get_etag(content), \
+            formatdate(modified_time, usegmt=True)
+
+    @staticmethod
+    def accepts_gzip(accept_encoding):
+        """
+        Checks if the Accept-Encoding header of a request accepts gzip-compressed responses.
+        :param accept_encoding: value of the Accept-Encoding header, None if missing
+        :type accept_encoding: str
+        :return: accepts_gzip
+        """
+        for coding in (accept_encoding or '').split(','):
+            (name, separator, parameters) = coding.strip().partition(';')
+            if name.strip().lower() in ('gzip', '*'):
+                return parameters.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+        return False
+
+    def get_response(self, if_none_match=None, if_modified_since=None, accept_encoding=None):
+        """
+        Returns the response serving the page to a request with the headers given in input.
+        :param if_none_match: value of the If-None-Match header, None if missing
+        :type if_none_match: str
+        :param if_modified_since: value of the If-Modified-Since header, None if missing
+        :type if_modified_since: str
+        :param accept_encoding: value of the Accept-Encoding header, None if missing
+        :type accept_encoding: str
+        :return: (status_code, body, headers), headers being a list of (name, value) pairs
+        """
+        (signature, content, gzip_content, etag, last_modified) = self.get_snapshot()
+        compressed = self.accepts_gzip(accept_encoding)
+        if compressed is True:
+            (content, etag) = (gzip_content, etag + '-gzip')    # each encoding has its own strong ETag
+        headers = [('ETag', '"{}"'.format(etag)), ('Last-Modified', last_modified), ('Cache-Control', 'no-cache'),
+                   ('Vary', 'Accept-Encoding')]
+        if is_not_modified(etag, last_modified, if_none_match, if_modified_since) is True:
+            return 304, b'', headers
+        if compressed is True:
+            headers.append(('Content-Encoding', 'gzip'))
+        return 200, content, headers
+
+
+"""
+Help page of the currency converter application, shared by every request handled by the process.
+"""
+help_page = StaticPage('assets/currency_converter_help.html', default_content='Currency Converter Index')
@@ -1,13 +1,69 @@
 import unittest
 from tests.test_server import ServerTest
+from tests.test_asgi_server import AsgiServerTest
+from tests.test_request_validator import RequestValidatorTest
 from tests.test_resources import ResourcesTest
+from tests.test_exchange_rates_store import ExchangeRatesStoreTest
+from tests.test_exchange_rates_table import ExchangeRatesTableTest
+from tests.test_exchange_rates_refresher import ExchangeRatesRefresherTest
+from tests.test_exchange_rates_fetcher import ExchangeRatesFetcherTest
+from tests.test_exchange_rates_history import ExchangeRatesHistoryTest
+from tests.test_exchange_rates_snapshot import ExchangeRatesSnapshotTest
+from tests.test_static_page import StaticPageTest
+from tests.test_fixed_point import FixedPointTest
+from tests.test_metrics import MetricsTest
+from tests.test_profiling import ProfilingTest
+from tests.test_json_log import JsonLogTest
+from tests.test_replay_load_generator import ReplayLoadGeneratorTest
 
 if __name__ == '__main__':
     # initializes the Test Suite Runner, setting it up to return verbose output
     runner = unittest.TextTestRunner(verbosity=2)
+    # initializes the Test Suite related to the columnar exchange rates table
+    suite_table = unittest.TestLoader().loadTestsFromTestCase(ExchangeRatesTableTest)
+    runner.run(suite_table)  # runs the Test Suite related to the exchange rates table
+    # initializes the Test Suite related to the fetcher of the ECB documents
+    suite_fetcher = unittest.TestLoader().loadTestsFromTestCase(ExchangeRatesFetcherTest)
+    runner.run(suite_fetcher)   # runs the Test Suite related to the exchange rates fetcher
+    # initializes the Test Suite related to the background refresher of the exchange rates
+    suite_refresher = unittest.TestLoader().loadTestsFromTestCase(ExchangeRatesRefresherTest)
+    runner.run(suite_refresher)  # runs the Test Suite related to the exchange rates refresher
+    # initializes the Test Suite related to the local history of the exchange rates
+    suite_history = unittest.TestLoader().loadTestsFromTestCase(ExchangeRatesHistoryTest)
+    runner.run(suite_history)  # runs the Test Suite related to the exchange rates history
+    # initializes the Test Suite related to the binary snapshot of the exchange rates table
+    suite_snapshot = unittest.TestLoader().loadTestsFromTestCase(ExchangeRatesSnapshotTest)
+    runner.run(suite_snapshot)  # runs the Test Suite related to the exchange rates snapshot
+    # initializes the Test Suite related to the fixed-point conversion engine
+    suite_fixed_point = unittest.TestLoader().loadTestsFromTestCase(FixedPointTest)
+    runner.run(suite_fixed_point)   # runs the Test Suite related to the fixed-point conversion engine
     # initializes the Test Suite regarding the resource functions used by the main server application
     suite_resources = unittest.TestLoader().loadTestsFromTestCase(ResourcesTest)
     runner.run(suite_resources)  # runs the Test Suite related to resource functions
+    # initializes the Test Suite related to the process-wide exchange rates store
+    suite_store = unittest.TestLoader().loadTestsFromTestCase(ExchangeRatesStoreTest)
+    runner.run(suite_store)  # runs the Test Suite related to the exchange rates store
+    # initializes the Test Suite related to the validation of the requests
+    suite_validator = unittest.TestLoader().loadTestsFromTestCase(RequestValidatorTest)
+    runner.run(suite_validator)  # runs the Test Suite related to the request validator
+    # initializes the Test Suite related to the static pages served from memory
+    suite_static_page = unittest.TestLoader().loadTestsFromTestCase(StaticPageTest)
+    runner.run(suite_static_page)   # runs the Test Suite related to the static pages
+    # initializes the Test Suite related to the metrics of the server application
+    suite_metrics = unittest.TestLoader().loadTestsFromTestCase(MetricsTest)
+    runner.run(suite_metrics)   # runs the Test Suite related to the metrics
+    # initializes the Test Suite related to the profiling hook of the server application
+    suite_profiling = unittest.TestLoader().loadTestsFromTestCase(ProfilingTest)
+    runner.run(suite_profiling)     # runs the Test Suite related to the profiling hook
+    # initializes the Test Suite related to the structured logs of the server application
+    suite_json_log = unittest.TestLoader().loadTestsFromTestCase(JsonLogTest)
+    runner.run(suite_json_log)  # runs the Test Suite related to the structured logs
+    # initializes the Test Suite related to the load generator replaying the logged requests
+    suite_replay = unittest.TestLoader().loadTestsFromTestCase(ReplayLoadGeneratorTest)
+    runner.run(suite_replay)    # runs the Test Suite related to the replay load generator
     # initializes the Test Suite related to the main server application
     suite_server = unittest.TestLoader().loadTestsFromTestCase(ServerTest)
     runner.run(suite_server)    # runs the Test Suite relates to the main server application
+    # initializes the Test Suite related to the ASGI version of the server application
+    suite_asgi_server = unittest.TestLoader().loadTestsFromTestCase(AsgiServerTest)
+    runner.run(suite_asgi_server)   # runs the Test Suite related to the ASGI server application
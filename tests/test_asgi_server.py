@@ -0,0 +1,161 @@
+import unittest
+from unittest import TestCase
+import asyncio
+import threading
+from server import asgi_server
+from server.flask_server import app
+
+
+def call_asgi_application(method, path, query_string='', request_headers=()):
+    """
+    Sends a request to the ASGI application and collects its response.
+    :param method: method of the request
+    :type method: str
+    :param path: path of the request
+    :type path: str
+    :param query_string: querystring of the request
+    :type query_string: str
+    :param request_headers: (name, value) headers of the request
+    :type request_headers: tuple
+    :return: (status_code, headers, body)
+    """
+    messages = list()
+
+    async def receive():
+        return dict(type='http.request', body=b'', more_body=False)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = dict(type='http', method=method, path=path, query_string=query_string.encode('latin-1'),
+                 headers=[(name.lower().encode('latin-1'), value.encode('latin-1')) for (name, value) in request_headers])
+    asyncio.run(asgi_server.app(scope, receive, send))
+    headers = dict((name.decode('latin-1'), value.decode('latin-1')) for (name, value) in messages[0]['headers'])
+    return messages[0]['status'], headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+
+class AsgiServerTest(TestCase):
+    """
+    This class defines the tests for the ASGI version of the server application.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.ta = app.test_client()   # runs the Flask application test client
+
+    def assert_same_response(self, method, path, query_string=''):
+        """
+        Checks that the ASGI application and the Flask application return the same response to a request.
+        """
+        (status_code, headers, body) = call_asgi_application(method, path, query_string)
+        response = self.ta.open(path, method=method, query_string=query_string)
+        self.assertEqual(status_code, response.status_code)
+        self.assertEqual(headers['content-type'], response.headers['Content-Type'])
+        self.assertEqual(headers.get('etag'), response.headers.get('ETag'))
+        self.assertEqual(headers.get('cache-control'), response.headers.get('Cache-Control'))
+        self.assertEqual(body, response.data)
+
+    def test_convert_same_as_flask(self):
+        """
+        Tests conversion requests, valid and invalid, against the ASGI application and the Flask application.
+        :except: both applications should return the same status code, content type, caching headers and body.
+        """
+        for query_string in [
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=%201e1&src-currency=GBP&dest-currency=JPY&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-12',
+            'amount=14.0&src-currency=AAA&dest-currency=USD&reference-date=2019-10-10',
+            'amount=-14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&dest-currency=US1&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=10-10-2019',
+            'amount=abc&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=nan&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=1e30&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=1&amount=x&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=1&amount=2&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=latest',
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-12&fallback=previous',
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-12&fallback=next',
+            'src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&dest-currency=USD',
+            ''
+        ]:
+            with self.subTest(query_string=query_string):
+                self.assert_same_response('GET', '/api/convert', query_string)
+
+    def test_index_and_errors_same_as_flask(self):
+        """
+        Tests the help page, an unknown path, a method not allowed and a HEAD request against the ASGI application
+        and the Flask application.
+        :except: both applications should return the same status code, content type and body.
+        """
+        self.assert_same_response('GET', '/')
+        self.assert_same_response('GET', '/help')
+        self.assert_same_response('GET', '/api/unknown')
+        self.assert_same_response('POST', '/api/convert')
+        self.assert_same_response('HEAD', '/api/convert',
+                                  'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10')
+
+
+    def test_conditional_requests(self):
+        """
+        Tests conditional requests to the ASGI application.
+        :except: a request matching the ETag of the conversion or of the help page should get a 304 response
+        without body.
+        """
+        query_string = 'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10'
+        for (path, query_string) in [('/api/convert', query_string), ('/help', '')]:
+            with self.subTest(path=path):
+                (status_code, headers, body) = call_asgi_application('GET', path, query_string)
+                self.assertEqual(status_code, 200)
+                (status_code, headers, body) = call_asgi_application('GET', path, query_string,
+                                                                     (('If-None-Match', headers['etag']),))
+                self.assertEqual(status_code, 304)
+                self.assertEqual(body, b'')
+
+    def test_replaced_document_reloaded_out_of_event_loop(self):
+        """
+        Tests a conversion request to the ASGI application once the exchange rates document has been replaced.
+        :except: the request should be served with the table currently loaded, and the document reloaded by a
+        thread other than the one running the event loop.
+        """
+        threads = list()
+        store = asgi_server.exchange_rates_store
+        table = store.get_exchange_rates()
+        (snapshot, checked_at) = (store.snapshot, store.checked_at)
+
+        def recorded_reload(blocking=True):
+            threads.append(threading.current_thread())
+            return snapshot
+
+        store.reload = recorded_reload
+        store.snapshot = (None, table)  # signature of a replaced document
+        store.checked_at = None     # the document is checked on the next request
+        try:
+            (status_code, headers, body) = call_asgi_application(
+                'GET', '/api/convert', 'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10')
+        finally:
+            del store.reload
+            (store.snapshot, store.checked_at) = (snapshot, checked_at)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_metrics(self):
+        """
+        Tests '/metrics' endpoint of the ASGI application.
+        :except: the metrics should be returned in the Prometheus text format, counting the requests served by the
+        ASGI application.
+        """
+        call_asgi_application('GET', '/api/unknown')
+        (status_code, headers, body) = call_asgi_application('GET', '/metrics')
+        self.assertEqual(status_code, 200)
+        self.assertEqual(headers['content-type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('currency_converter_requests_total{endpoint="other",method="GET",status="404"}',
+                      body.decode('utf-8'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+from server.exchange_rates_fetcher import ExchangeRatesFetcher
+from server.resources import get_exchange_rates_table
+from tests.test_exchange_rates_refresher import ECBStandIn
+
+
+class ExchangeRatesFetcherTest(TestCase):
+    """
+    This class defines the tests for the fetcher of the ECB documents, run against a local stand-in of the ECB
+    endpoint.
+    """
+
+    def setUp(self):
+        """
+        Sets up the ECB stand-in, a fetcher retrying without backoff and a document in a temporary folder.
+        """
+        self.ecb = ECBStandIn()
+        self.ecb.publish('2019-10-10', '1.103')
+        self.fetcher = ExchangeRatesFetcher(timeout=(1, 0.5), retries=2, backoff_factor=0)
+        self.folder = tempfile.mkdtemp()
+        self.document = os.path.join(self.folder, 'exchange_rates.xml')
+        with open(self.document, 'w') as f:
+            f.write('previous document')
+
+    def tearDown(self):
+        """
+        Closes the fetcher and the ECB stand-in and removes the temporary folder.
+        """
+        self.fetcher.close()
+        self.ecb.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def assert_document_untouched(self):
+        """
+        Checks that the document in place is still the previous one, and that no temporary file is left behind.
+        """
+        self.assertEqual(os.listdir(self.folder), ['exchange_rates.xml'])
+        with open(self.document, 'r') as f:
+            self.assertEqual(f.read(), 'previous document')
+
+    def test_fetch_replaces_document(self):
+        """
+        Tests the download of a document replacing the one in place, then a conditional download of the same one.
+        :except:
+            - the checked document should replace the one in place, without temporary file left behind
+            - a download answered with 304 should return None and leave the document in place
+        """
+        checked = list()
+        response = self.fetcher.fetch(self.ecb.get_url(), self.document, checked.append)
+        self.assertEqual(response.headers['ETag'], '"2019-10-10"')
+        self.assertEqual(len(checked), 1)
+        self.assertEqual(os.listdir(self.folder), ['exchange_rates.xml'])
+        self.assertIsNotNone(get_exchange_rates_table(self.document).get_date_index('2019-10-10'))
+        self.assertIsNone(self.fetcher.fetch(self.ecb.get_url(), self.document, checked.append,
+                                             {'If-None-Match': response.headers['ETag']}))
+        self.assertEqual(len(checked), 1)
+        self.assertIsNotNone(get_exchange_rates_table(self.document).get_date_index('2019-10-10'))
+
+    def test_fetch_retries_server_errors(self):
+        """
+        Tests the retries of the downloads answered with a server error.
+        :except:
+            - a download failing fewer times than the retries should succeed
+            - a download failing more times than the retries should raise and leave the document in place
+        """
+        self.ecb.failures = 2
+        self.assertIsNotNone(self.fetcher.fetch(self.ecb.get_url(), self.document, get_exchange_rates_table))
+        self.assertEqual(len(self.ecb.requests), 3)
+        with open(self.document, 'w') as f:
+            f.write('previous document')
+        self.ecb.failures = 3
+        self.assertRaises(Exception, self.fetcher.fetch, self.ecb.get_url(), self.document, get_exchange_rates_table)
+        self.assert_document_untouched()
+
+    def test_fetch_invalid_downloads(self):
+        """
+        Tests downloads which must not replace the document in place: a wrongly formatted document, a truncated
+        body and a server answering after the read timeout.
+        :except: each download should raise, leaving the document in place and no temporary file behind.
+        """
+        self.ecb.documents['/eurofxref-hist-90d.xml'] = (b'<item>Here is an item</item>', '"broken"')
+        self.assertRaises(TypeError, self.fetcher.fetch, self.ecb.get_url(), self.document,
+                          get_exchange_rates_table)
+        self.assert_document_untouched()
+        self.ecb.publish('2019-10-10', '1.103')
+        self.ecb.truncated = True
+        self.assertRaises(Exception, self.fetcher.fetch, self.ecb.get_url(), self.document)
+        self.assert_document_untouched()
+        self.ecb.truncated = False
+        self.ecb.delay = 1.0
+        fetcher = ExchangeRatesFetcher(timeout=(1, 0.2), retries=0)
+        try:
+            self.assertRaises(Exception, fetcher.fetch, self.ecb.get_url(), self.document)
+        finally:
+            fetcher.close()
+            self.ecb.delay = 0.0
+        self.assert_document_untouched()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from server.exchange_rates_history import ExchangeRatesHistory, get_exchange_rates_history_table
+from server.exchange_rates_refresher import ExchangeRatesHistoryRefresher
+from server.exchange_rates_store import ExchangeRatesStore
+from server.exchange_rates_table import ExchangeRatesTable
+from tests.test_exchange_rates_refresher import ECBStandIn, get_exchange_rates_document
+
+
+class ExchangeRatesHistoryTest(TestCase):
+    """
+    This class defines the tests for the append-only local history of the exchange rates and its refresher.
+    """
+
+    def setUp(self):
+        """
+        Sets up an empty history in a temporary folder.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.history_document = os.path.join(self.folder, 'exchange_rates_history.jsonl')
+        self.history = ExchangeRatesHistory(self.history_document)
+
+    def tearDown(self):
+        """
+        Removes the temporary folder.
+        """
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_append_newer_dates_only(self):
+        """
+        Tests that only dates newer than the newest date stored are appended, in ascending order.
+        :except: the history should hold each date once, in ascending order, with the rates as published.
+        """
+        self.assertIsNone(self.history.get_latest_date())
+        self.history.append([('2019-10-10', dict(USD=Decimal('1.103'), EUR=Decimal(1))),
+                             ('2019-10-09', dict(USD=Decimal('1.0969'), EUR=Decimal(1)))])
+        appended = self.history.append([('2019-10-11', dict(USD=Decimal('1.1043'))),
+                                        ('2019-10-10', dict(USD=Decimal('2.0')))])
+        self.assertEqual([date for (date, rates) in appended], ['2019-10-11'])
+        self.assertEqual(ExchangeRatesHistory(self.history_document).get_latest_date(), '2019-10-11')
+        self.assertEqual(list(self.history.iter_exchange_rates()), [
+            ('2019-10-09', dict(USD=Decimal('1.0969'), EUR=Decimal(1))),
+            ('2019-10-10', dict(USD=Decimal('1.103'), EUR=Decimal(1))),
+            ('2019-10-11', dict(USD=Decimal('1.1043'), EUR=Decimal(1)))
+        ])
+
+    def test_has_gap(self):
+        """
+        Tests the detection of business days missing between the newest date stored and a new date.
+        :except: a weekend should not be a gap, a missing Monday should.
+        """
+        self.assertTrue(self.history.has_gap('2019-10-11'))
+        self.history.append([('2019-10-11', dict(USD=Decimal('1.1043')))])
+        self.assertFalse(self.history.has_gap('2019-10-14'))
+        self.assertTrue(self.history.has_gap('2019-10-15'))
+
+    def test_append_exchange_rates_to_table(self):
+        """
+        Tests that extending a table gives the same table as building it out of all the exchange rates.
+        :except: both tables should hold the same exchange rates, with and without new currencies.
+        """
+        exchange_rates = [('2019-10-09', dict(USD=Decimal('1.0969'), GBP=Decimal('0.9'), EUR=Decimal(1))),
+                          ('2019-10-10', dict(USD=Decimal('1.103'), EUR=Decimal(1)))]
+        table = ExchangeRatesTable.from_exchange_rates(exchange_rates[:1])
+        self.assertEqual(table.append_exchange_rates(exchange_rates[1:]).to_dict(), dict(exchange_rates))
+        new_currency = [('2019-10-11', dict(JPY=Decimal('119.23'), EUR=Decimal(1)))]
+        self.assertEqual(table.append_exchange_rates(exchange_rates[1:]).append_exchange_rates(new_currency).to_dict(),
+                         dict(exchange_rates + new_currency))
+
+    def test_refresh_daily_and_backfill(self):
+        """
+        Tests the history refresher against a local stand-in of the ECB endpoints.
+        :except:
+            - an empty history should be filled from the full history document
+            - the next business day should come from the daily document only
+            - a gap should be filled from the 90-day document
+        """
+        ecb = ECBStandIn()
+        try:
+            ecb.documents['/eurofxref-hist.xml'] = (get_exchange_rates_document([
+                ('2019-10-10', dict(USD='1.103')), ('2019-10-09', dict(USD='1.0969'))]), '"hist"')
+            ecb.publish('2019-10-10', '1.103', '/eurofxref-daily.xml')
+            store = ExchangeRatesStore(self.history_document, get_exchange_rates_history_table)
+            refresher = ExchangeRatesHistoryRefresher(store, self.history, ecb.get_url('/eurofxref-daily.xml'),
+                                                      ecb.get_url('/eurofxref-hist-90d.xml'),
+                                                      ecb.get_url('/eurofxref-hist.xml'))
+            self.assertTrue(refresher.refresh())
+            self.assertEqual(len(store.get_exchange_rates()), 2)
+
+            ecb.requests.clear()
+            ecb.publish('2019-10-11', '1.1043', '/eurofxref-daily.xml')
+            self.assertTrue(refresher.refresh())
+            self.assertFalse(refresher.refresh())
+            self.assertEqual([path for (path, headers) in ecb.requests], ['/eurofxref-daily.xml'] * 2)
+            self.assertEqual(len(store.get_exchange_rates()), 3)
+
+            ecb.requests.clear()
+            ecb.documents['/eurofxref-hist-90d.xml'] = (get_exchange_rates_document([
+                ('2019-10-15', dict(USD='1.1007')), ('2019-10-14', dict(USD='1.1031'))]), '"90d"')
+            ecb.publish('2019-10-15', '1.1007', '/eurofxref-daily.xml')
+            self.assertTrue(refresher.refresh())
+            self.assertEqual([path for (path, headers) in ecb.requests],
+                             ['/eurofxref-daily.xml', '/eurofxref-hist-90d.xml'])
+            table = store.get_exchange_rates()
+            self.assertEqual(table.to_dict(), get_exchange_rates_history_table(self.history_document).to_dict())
+            self.assertEqual([table.get_date(i) for i in range(len(table))],
+                             ['2019-10-09', '2019-10-10', '2019-10-11', '2019-10-14', '2019-10-15'])
+        finally:
+            ecb.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import time
+import threading
+from decimal import Decimal
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from server.exchange_rates_store import ExchangeRatesStore
+from server.exchange_rates_refresher import ExchangeRatesRefresher
+
+
+def get_exchange_rates_document(exchange_rates):
+    """
+    Returns an ECB-like exchange rates document holding the (date, {currency: rate}) pairs given in input.
+    """
+    cubes = ''.join('<Cube time="{}">{}</Cube>'.format(date, ''.join(
+        '<Cube currency="{}" rate="{}"/>'.format(currency, rate) for (currency, rate) in rates.items()))
+        for (date, rates) in exchange_rates)
+    return '<Envelope><Cube>{}</Cube></Envelope>'.format(cubes).encode('utf-8')
+
+
+class ECBStandIn(object):
+    """
+    Local HTTP server standing in for the ECB endpoints, serving one document with an ETag per path.
+    """
+    def __init__(self):
+        self.documents = dict()     # path -> (document, ETag)
+        self.status_code = 200
+        self.failures = 0   # number of the next requests answered with 503
+        self.delay = 0.0    # seconds waited before answering
+        self.truncated = False  # whether the body is cut halfway, the Content-Length announcing it whole
+        self.requests = list()  # (path, headers) of the requests received
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append((self.path, dict(self.headers)))
+                (document, etag) = stand_in.documents.get(self.path, (None, None))
+                time.sleep(stand_in.delay)
+                if stand_in.failures > 0:
+                    stand_in.failures -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                elif stand_in.status_code != 200:
+                    self.send_response(stand_in.status_code)
+                    self.end_headers()
+                elif document is None:
+                    self.send_response(404)
+                    self.end_headers()
+                elif self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    self.send_response(200)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', str(len(document)))
+                    self.end_headers()
+                    self.wfile.write(document[:len(document) // 2] if stand_in.truncated is True else document)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def get_url(self, path='/eurofxref-hist-90d.xml'):
+        """
+        Returns the URL of the document served at the path given in input.
+        """
+        return 'http://127.0.0.1:{}{}'.format(self.server.server_address[1], path)
+
+    def publish(self, date, usd_rate, path='/eurofxref-hist-90d.xml'):
+        """
+        Publishes at the path given in input a new document holding a single date.
+        """
+        self.documents[path] = (get_exchange_rates_document([(date, dict(USD=usd_rate))]), '"{}"'.format(date))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ExchangeRatesRefresherTest(TestCase):
+    """
+    This class defines the tests for the background refresher of the exchange rates, run against a local
+    stand-in of the ECB endpoint.
+    """
+
+    def setUp(self):
+        """
+        Sets up the ECB stand-in and a store reading its document from a temporary folder.
+        """
+        self.ecb = ECBStandIn()
+        self.ecb.publish('2019-10-10', '1.103')
+        self.folder = tempfile.mkdtemp()
+        self.store = ExchangeRatesStore(os.path.join(self.folder, 'exchange_rates.xml'))
+        self.refresher = ExchangeRatesRefresher(self.store, self.ecb.get_url(), interval=0.05)
+
+    def tearDown(self):
+        """
+        Stops the refresher and the ECB stand-in and removes the temporary folder.
+        """
+        self.refresher.stop()
+        self.ecb.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_refresh_conditional_get(self):
+        """
+        Tests that a second refresh of an unchanged document is answered with 304 and reuses the loaded table.
+        :except: the first refresh should load the rates, the second one should send If-None-Match and load nothing.
+        """
+        self.assertTrue(self.refresher.refresh())
+        table = self.store.get_exchange_rates()
+        self.assertFalse(self.refresher.refresh())
+        self.assertEqual(self.ecb.requests[1][1].get('If-None-Match'), '"2019-10-10"')
+        self.assertIs(self.store.get_exchange_rates(), table)
+        self.assertEqual(table.get_rate(table.get_date_index('2019-10-10'), table.get_currency_index('USD')),
+                         Decimal('1.103'))
+
+    def test_refresh_wrongly_formatted_document(self):
+        """
+        Tests that a wrongly formatted document does not replace the document and table in place.
+        :except: the refresh should raise and the previous table should still be served.
+        """
+        self.refresher.refresh()
+        table = self.store.get_exchange_rates()
+        self.ecb.documents['/eurofxref-hist-90d.xml'] = (b'<item>Here is an item</item>', '"broken"')
+        self.assertRaises(TypeError, self.refresher.refresh)
+        self.assertIs(self.store.get_exchange_rates(), table)
+        self.assertEqual(os.listdir(self.folder), ['exchange_rates.xml'])
+
+    def test_refresh_server_error(self):
+        """
+        Tests that an error status code does not replace the table in place.
+        :except: the refresh should raise and the previous table should still be served.
+        """
+        self.refresher.refresh()
+        table = self.store.get_exchange_rates()
+        self.ecb.status_code = 503
+        self.assertRaises(Exception, self.refresher.refresh)
+        self.assertIs(self.store.get_exchange_rates(), table)
+
+    def test_background_hot_reload(self):
+        """
+        Tests that the refresher thread picks a new document up and swaps the table served by the store.
+        :except: the store should serve the new date shortly after it is published.
+        """
+        self.refresher.refresh()
+        self.refresher.start()
+        self.ecb.publish('2019-10-11', '1.104')
+        for i in range(100):
+            if self.store.get_exchange_rates().get_date_index('2019-10-11') is not None:
+                break
+            threading.Event().wait(0.05)
+        self.assertIsNotNone(self.store.get_exchange_rates().get_date_index('2019-10-11'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import multiprocessing
+from decimal import Decimal
+from server import resources
+from server.exchange_rates_snapshot import get_snapshot_document, read_exchange_rates_snapshot, \
+    write_exchange_rates_snapshot
+from server.exchange_rates_store import ExchangeRatesStore
+from server.exchange_rates_refresher import ExchangeRatesRefresher
+from tests.test_exchange_rates_store import write_exchange_rates_document
+
+
+def load_exchange_rates_in_worker(document, snapshot_document, results):
+    """
+    Loads the exchange rates in a worker process, recording each parse of the document in a file next to it.
+    :param document: path of the exchange rates document
+    :type document: str
+    :param snapshot_document: path of the snapshot
+    :type snapshot_document: str
+    :param results: queue the exchange rates loaded are put to
+    :type results: multiprocessing.Queue
+    """
+    def recording_loader(path):
+        with open(document + '.parses', 'a') as f:
+            f.write('{}\n'.format(os.getpid()))
+        return resources.get_exchange_rates_table(path)
+    store = ExchangeRatesStore(document, recording_loader, snapshot_document)
+    results.put(store.get_exchange_rates().to_dict())
+
+
+class ExchangeRatesSnapshotTest(TestCase):
+    """
+    This class defines the tests for the binary snapshot of the exchange rates table.
+    """
+
+    def setUp(self):
+        """
+        Sets up a temporary folder holding the exchange rates document and its snapshot.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.document = os.path.join(self.folder, 'exchange_rates.xml')
+        self.snapshot_document = get_snapshot_document(self.document)
+        self.load_count = 0
+
+    def tearDown(self):
+        """
+        Removes the temporary folder.
+        """
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def counting_loader(self, document):
+        """
+        Loader wrapping 'get_exchange_rates_table' which counts how many times the document is parsed.
+        """
+        self.load_count += 1
+        return resources.get_exchange_rates_table(document)
+
+    def test_snapshot_same_as_document(self):
+        """
+        Tests that the table mapped out of a snapshot holds the same exchange rates as the table it was written from.
+        :except: the tables should be equal and the mapped one should convert the same amounts.
+        """
+        self.assertEqual(self.snapshot_document, os.path.join(self.folder, 'exchange_rates.snapshot'))
+        table = resources.get_exchange_rates_table()
+        write_exchange_rates_snapshot(self.snapshot_document, table, (1, 2))
+        mapped_table = read_exchange_rates_snapshot(self.snapshot_document, (1, 2))
+        self.assertEqual(mapped_table.to_dict(), table.to_dict())
+        self.assertEqual(mapped_table.currencies, table.currencies)
+        self.assertEqual(resources.get_currency_converted_amount(mapped_table, Decimal(14), 'USD', 'JPY', '2019-10-10'),
+                         resources.get_currency_converted_amount(table, Decimal(14), 'USD', 'JPY', '2019-10-10'))
+
+    def test_snapshot_stale_or_invalid(self):
+        """
+        Tests reading a snapshot written out of another version of the document, a truncated snapshot and a missing one.
+        :except: no table should be returned.
+        """
+        self.assertIsNone(read_exchange_rates_snapshot(self.snapshot_document, (1, 2)))
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        write_exchange_rates_snapshot(self.snapshot_document, resources.get_exchange_rates_table(self.document), (1, 2))
+        self.assertIsNone(read_exchange_rates_snapshot(self.snapshot_document, (1, 3)))
+        with open(self.snapshot_document, 'rb') as f:
+            content = f.read()
+        for truncated_content in (b'', content[:20], content[:-8]):
+            with open(self.snapshot_document, 'wb') as f:
+                f.write(truncated_content)
+            self.assertIsNone(read_exchange_rates_snapshot(self.snapshot_document, (1, 2)))
+
+    def test_store_loads_snapshot(self):
+        """
+        Tests that a store started on a document it has already parsed maps the snapshot instead, and that
+        a replaced document is parsed again.
+        :except: the document should be parsed once per version, the snapshot serving the same exchange rates.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        store = ExchangeRatesStore(self.document, self.counting_loader, self.snapshot_document)
+        table = store.get_exchange_rates()
+        mapped_table = ExchangeRatesStore(self.document, self.counting_loader, self.snapshot_document)\
+            .get_exchange_rates()
+        self.assertEqual(self.load_count, 1)
+        self.assertEqual(mapped_table.to_dict(), table.to_dict())
+
+        write_exchange_rates_document(self.document, '2019-10-11', '1.1043')
+        os.utime(self.document, ns=(0, 0))     # a new version, whatever the resolution of the file system clock
+        restarted_store = ExchangeRatesStore(self.document, self.counting_loader, self.snapshot_document)
+        self.assertEqual(list(restarted_store.get_exchange_rates().to_dict().keys()), ['2019-10-11'])
+        self.assertEqual(self.load_count, 2)
+
+    def test_worker_processes_parse_once(self):
+        """
+        Tests several processes starting up on the same document at the same time.
+        :except: the document should be parsed by one process only, the other ones mapping its snapshot.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=load_exchange_rates_in_worker,
+                                   args=(self.document, self.snapshot_document, results)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        exchange_rates = [results.get(timeout=30) for worker in workers]
+        for worker in workers:
+            worker.join()
+        with open(self.document + '.parses', 'r') as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertEqual(exchange_rates, [dict({'2019-10-10': dict(USD=Decimal('1.103'), GBP=Decimal('0.89'),
+                                                                    EUR=Decimal(1))})] * 4)
+
+    def test_replaced_document_published(self):
+        """
+        Tests that a document replaced by the publishing store is picked up by another store without parsing it,
+        and that a store which is not the publisher neither publishes nor refreshes.
+        :except: the other store should serve the new exchange rates with no parse, and skip the refresh.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        publisher = ExchangeRatesStore(self.document, self.counting_loader, self.snapshot_document)
+        worker = ExchangeRatesStore(self.document, self.counting_loader, self.snapshot_document, check_interval=0)
+        self.assertEqual(publisher.get_exchange_rates().to_dict(), worker.get_exchange_rates().to_dict())
+        self.assertEqual(self.load_count, 1)
+
+        new_document = os.path.join(self.folder, 'new_exchange_rates.xml')
+        write_exchange_rates_document(new_document, '2019-10-11', '1.1043')
+        os.utime(new_document, ns=(0, 0))   # a new version, whatever the resolution of the file system clock
+        publisher.replace_document(new_document, resources.get_exchange_rates_table(new_document))
+        self.assertEqual(list(worker.get_exchange_rates().to_dict().keys()), ['2019-10-11'])
+        self.assertEqual(self.load_count, 1)
+
+        self.assertTrue(publisher.publisher_lock.acquire(False))
+        try:
+            # the URL is never requested: the worker store does not hold the publisher lock
+            self.assertFalse(ExchangeRatesRefresher(worker, 'http://127.0.0.1:9/exchange_rates.xml').refresh())
+            os.utime(self.document, ns=(1, 1))
+            self.assertEqual(list(worker.get_exchange_rates().to_dict().keys()), ['2019-10-11'])
+            self.assertEqual(self.load_count, 1)
+        finally:
+            publisher.publisher_lock.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from server.exchange_rates_store import ExchangeRatesStore
+
+
+def write_exchange_rates_document(path, date, usd_rate):
+    """
+    Writes an ECB-like exchange rates document containing a single date to the path given in input,
+    replacing the previous file in one step.
+    :param path: path of the document to write
+    :type path: str
+    :param date: date of the exchange rates (YYYY-MM-DD format)
+    :type date: str
+    :param usd_rate: EUR/USD exchange rate
+    :type usd_rate: str
+    """
+    xml_string = '<Envelope><Cube><Cube time="{}"><Cube currency="USD" rate="{}"/>' \
+                 '<Cube currency="GBP" rate="0.89"/></Cube></Cube></Envelope>'.format(date, usd_rate)
+    with open(path + '.tmp', 'w') as f:
+        f.write(xml_string)
+    os.replace(path + '.tmp', path)
+
+
+class ExchangeRatesStoreTest(TestCase):
+    """
+    This class defines the tests for the process-wide exchange rates store.
+    """
+
+    def setUp(self):
+        """
+        Sets up a temporary folder holding the exchange rates document used by each test.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.document = os.path.join(self.folder, 'exchange_rates.xml')
+        self.load_count = 0
+
+    def tearDown(self):
+        """
+        Removes the temporary folder.
+        """
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def counting_loader(self, document):
+        """
+        Loader wrapping 'get_exchange_rates_dict' which counts how many times the document is parsed.
+        """
+        from server.resources import get_exchange_rates_dict
+        self.load_count += 1
+        return get_exchange_rates_dict(document)
+
+    def test_get_exchange_rates_document_not_found(self):
+        """
+        Tests 'get_exchange_rates' when the document has never been loaded and does not exist.
+        :except: the method should raise FileNotFoundError.
+        """
+        store = ExchangeRatesStore(self.document)
+        self.assertRaises(FileNotFoundError, store.get_exchange_rates)
+
+    def test_get_exchange_rates_loaded_once(self):
+        """
+        Tests that repeated reads of an unchanged document parse it only once.
+        :except: the document should be parsed once and the same table returned every time.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        store = ExchangeRatesStore(self.document, self.counting_loader)
+        first = store.get_exchange_rates()
+        for i in range(10):
+            self.assertIs(store.get_exchange_rates(), first)
+        self.assertEqual(self.load_count, 1)
+        self.assertEqual(first['2019-10-10']['USD'], Decimal('1.103'))
+
+    def test_get_exchange_rates_document_replaced(self):
+        """
+        Tests that replacing the document swaps the table served by the store.
+        :except: the store should return the rates of the new document.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        store = ExchangeRatesStore(self.document, self.counting_loader, check_interval=0)
+        first = store.get_exchange_rates()
+        write_exchange_rates_document(self.document, '2019-10-11', '1.104')
+        second = store.get_exchange_rates()
+        self.assertIsNot(first, second)
+        self.assertTrue('2019-10-11' in second)
+        self.assertTrue('2019-10-10' in first)
+        self.assertEqual(self.load_count, 2)
+
+    def test_get_exchange_rates_check_interval(self):
+        """
+        Tests that the document is checked at most once every 'check_interval' seconds, and that a document replaced
+        by the store itself is served at once.
+        :except: a document replaced on disk should be served only once the interval has passed, a document
+        replaced through the store right away.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        store = ExchangeRatesStore(self.document, self.counting_loader, check_interval=60)
+        first = store.get_exchange_rates()
+        write_exchange_rates_document(self.document, '2019-10-11', '1.104')
+        self.assertIs(store.get_exchange_rates(), first)
+        store.checked_at -= 60  # the interval has passed
+        self.assertTrue('2019-10-11' in store.get_exchange_rates())
+        new_document = os.path.join(self.folder, 'new_exchange_rates.xml')
+        write_exchange_rates_document(new_document, '2019-10-12', '1.105')
+        store.replace_document(new_document, self.counting_loader(new_document))
+        self.assertTrue('2019-10-12' in store.get_exchange_rates())
+        self.assertEqual(self.load_count, 3)
+
+    def test_get_exchange_rates_wrongly_formatted_replacement(self):
+        """
+        Tests that a wrongly formatted replacement document does not discard the table already loaded.
+        :except: the store should keep serving the previous table and parse the broken document only once.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        store = ExchangeRatesStore(self.document, self.counting_loader, check_interval=0)
+        first = store.get_exchange_rates()
+        with open(self.document + '.tmp', 'w') as f:
+            f.write('<item>Here is an item</item>')
+        os.replace(self.document + '.tmp', self.document)
+        self.assertIs(store.get_exchange_rates(), first)
+        self.assertIs(store.get_exchange_rates(), first)
+        self.assertEqual(self.load_count, 2)
+
+    def test_get_exchange_rates_document_removed(self):
+        """
+        Tests that removing the document once loaded does not discard the table already loaded.
+        :except: the store should keep serving the previous table.
+        """
+        write_exchange_rates_document(self.document, '2019-10-10', '1.103')
+        store = ExchangeRatesStore(self.document)
+        first = store.get_exchange_rates()
+        os.remove(self.document)
+        self.assertIs(store.get_exchange_rates(), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
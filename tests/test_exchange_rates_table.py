@@ -0,0 +1,161 @@
+import unittest
+from unittest import TestCase
+from decimal import Decimal
+from custom_api_exception.customexception import CustomAPIException
+from server import resources
+from server.exchange_rates_table import ExchangeRatesTable
+
+
+class ExchangeRatesTableTest(TestCase):
+    """
+    This class defines the tests for the columnar exchange rates table.
+    """
+
+    def setUp(self):
+        """
+        Sets up the exchange rates used by each test, listed newest date first as in the ECB document.
+        """
+        self.exchange_rates = [
+            ('2019-10-10', dict(USD=Decimal('1.103'), GBP=Decimal('0.89'), EUR=Decimal(1))),
+            ('2019-10-09', dict(USD=Decimal('1.0969'), JPY=Decimal('117.77'), EUR=Decimal(1)))
+        ]
+        self.table = ExchangeRatesTable.from_exchange_rates(self.exchange_rates)
+
+    def test_from_exchange_rates_indexes(self):
+        """
+        Tests that dates are sorted and currencies indexed once.
+        :except: the table should contain 2 dates in ascending order and 4 currencies.
+        """
+        self.assertEqual(len(self.table), 2)
+        self.assertEqual(self.table.get_date(0), '2019-10-09')
+        self.assertEqual(self.table.get_date(1), '2019-10-10')
+        self.assertEqual(self.table.currencies, ('EUR', 'GBP', 'JPY', 'USD'))
+
+    def test_get_date_index_unknown_date(self):
+        """
+        Tests 'get_date_index' with dates which are not available or not in YYYY-MM-DD format.
+        :except: the method should return None.
+        """
+        self.assertIsNone(self.table.get_date_index('2019-10-11'))
+        self.assertIsNone(self.table.get_date_index('20191010'))
+        self.assertIsNone(self.table.get_date_index('2019-13-10'))
+        self.assertIsNone(self.table.get_date_index(None))
+
+    def test_resolve_date_index(self):
+        """
+        Tests 'resolve_date_index' with the latest date, exact dates and the previous date fallback.
+        :except: the method should return the row of the newest date not after the requested one, if any.
+        """
+        self.assertEqual(self.table.resolve_date_index('latest'), 1)
+        self.assertEqual(self.table.resolve_date_index('2019-10-09'), 0)
+        self.assertIsNone(self.table.resolve_date_index('2019-10-12'))
+        self.assertEqual(self.table.resolve_date_index('2019-10-12', 'previous'), 1)
+        self.assertEqual(self.table.resolve_date_index('2019-10-10', 'previous'), 1)
+        self.assertIsNone(self.table.resolve_date_index('2019-10-08', 'previous'))
+        self.assertIsNone(self.table.resolve_date_index('10-12-2019', 'previous'))
+        self.assertIsNone(ExchangeRatesTable.from_exchange_rates([]).resolve_date_index('latest'))
+
+    def test_get_rate_missing_value(self):
+        """
+        Tests 'get_rate' for a currency which has no exchange rate at the selected date.
+        :except: the method should return None.
+        """
+        date_index = self.table.get_date_index('2019-10-10')
+        self.assertIsNone(self.table.get_rate(date_index, self.table.get_currency_index('JPY')))
+        self.assertIsNone(self.table.get_rate(date_index, self.table.get_currency_index('AAA')))
+        self.assertEqual(self.table.get_rate(date_index, self.table.get_currency_index('GBP')), Decimal('0.89'))
+
+    def test_get_scaled_rates(self):
+        """
+        Tests 'get_scaled_rates' with available and missing dates and exchange rates.
+        :except: the method should return the scaled rates of both currencies, None for a missing rate and None
+        for a missing date.
+        """
+        self.assertEqual(self.table.get_scaled_rates('2019-10-10', 'GBP', 'USD'), (890000000, 1103000000))
+        self.assertEqual(self.table.get_scaled_rates('2019-10-10', 'JPY', 'USD'), (None, 1103000000))
+        self.assertEqual(self.table.get_scaled_rates('2019-10-09', 'JPY', 'AAA'), (117770000000, None))
+        self.assertIsNone(self.table.get_scaled_rates('2019-10-11', 'GBP', 'USD'))
+        self.assertIsNone(self.table.get_scaled_rates('20191010', 'GBP', 'USD'))
+
+    def test_to_dict(self):
+        """
+        Tests that the table converts back to the dict of dates it has been built from.
+        :except: the dict should be equal to the parsed exchange rates.
+        """
+        self.assertEqual(self.table.to_dict(), dict(self.exchange_rates))
+
+    def test_from_exchange_rates_wrongly_formatted(self):
+        """
+        Tests that invalid dates, currencies and rates are rejected when the table is built.
+        :except: building the table should raise TypeError.
+        """
+        for exchange_rates in [
+            [('10-10-2019', dict(USD=Decimal('1.103')))],
+            [('2019-10-10', {'US1': Decimal('1.103')})],
+            [('2019-10-10', {42: Decimal('1.103')})],
+            [('2019-10-10', dict(USD='1.103'))],
+            [('2019-10-10', dict(USD=Decimal('-1.103')))],
+            [('2019-10-10', dict(USD=Decimal('NaN')))],
+            [('2019-10-10', dict(USD=Decimal('1.0000000001')))],
+            [('2019-10-10', [Decimal('1.103')])]
+        ]:
+            self.assertRaises(TypeError, ExchangeRatesTable.from_exchange_rates, exchange_rates)
+
+    def test_table_immutable(self):
+        """
+        Tests that the table and its buffers cannot be altered once built.
+        :except: replacing an attribute or writing a rate should raise an exception.
+        """
+        self.assertRaises(AttributeError, setattr, self.table, 'width', 1)
+        self.assertRaises(AttributeError, delattr, self.table, 'dates')
+        self.assertRaises(TypeError, self.table.scaled_rates.__setitem__, 0, 1)
+        with self.assertRaises(TypeError):
+            self.table.currency_indexes['AAA'] = 0
+
+    def test_get_conversion_factor_no_rate_found_for_selected_src_currency(self):
+        """
+        Tests 'get_conversion_factor' on the table with a currency which has no exchange rate at the selected date.
+        :except: the function should raise a CustomAPIException with status code 400.
+        """
+        with self.assertRaises(CustomAPIException) as context:
+            resources.get_conversion_factor(self.table, 'JPY', 'USD', '2019-10-10')
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.message, 'No exchange rate found for the currency JPY.')
+
+    def test_get_currency_converted_amount_same_as_dict(self):
+        """
+        Tests that 'get_currency_converted_amount' returns the same amounts on the table and on the dict built
+        out of the exchange rates document, for every currency pair of a few dates.
+        :except: the amounts should be equal.
+        """
+        table = resources.get_exchange_rates_table()
+        # keeps a few dates only, the dict being walked by every call
+        exchange_rates_dict = dict((date, exchange_rates) for (date, exchange_rates)
+                                   in resources.get_exchange_rates_dict().items()
+                                   if date in ('2019-10-10', '2019-09-02', '2019-07-18'))
+        currencies = list(exchange_rates_dict['2019-10-10'].keys())
+        for date in exchange_rates_dict.keys():
+            for src_currency in currencies:
+                for dst_currency in currencies:
+                    for amount in (Decimal(14.35), Decimal(1)):
+                        self.assertEqual(
+                            resources.get_currency_converted_amount(table, amount, src_currency, dst_currency, date),
+                            resources.get_currency_converted_amount(exchange_rates_dict, amount, src_currency,
+                                                                    dst_currency, date))
+
+
+    def test_get_currency_converted_series_skips_missing_rates(self):
+        """
+        Tests 'get_currency_converted_series' over dates at which one of the currencies has no exchange rate.
+        :except: the series should hold the dates with both exchange rates only.
+        """
+        converted_series = resources.get_currency_converted_series(self.table, Decimal(10), 'EUR', 'JPY',
+                                                                   '2019-10-01', '2019-10-31')
+        self.assertEqual(converted_series, [('2019-10-09', Decimal('1177.70'))])
+        converted_series = resources.get_currency_converted_series(self.table, Decimal(10), 'EUR', 'USD',
+                                                                   '2019-10-10', '2019-10-10')
+        self.assertEqual(converted_series, [('2019-10-10', Decimal('11.03'))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import TestCase
+import random
+from decimal import Decimal
+from server import resources
+from server.fixed_point import get_minor_units, get_converted_minor_units, MAX_AMOUNT
+from server.exchange_rates_table import ExchangeRatesTable
+
+
+def get_decimal_minor_units(amount, src_scaled_rate, dst_scaled_rate):
+    """
+    Converts the amount as the Decimal conversion path does, returning the converted amount in minor units.
+    """
+    conversion_factor = Decimal(dst_scaled_rate) / Decimal(src_scaled_rate)
+    return int(resources.get_converted_amount(Decimal(amount), conversion_factor).scaleb(2))
+
+
+class FixedPointTest(TestCase):
+    """
+    This class defines the tests for the fixed-point conversion engine.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.exchange_rates_table = resources.get_exchange_rates_table('assets/exchange_rates.xml')
+
+    def test_get_minor_units(self):
+        """
+        Tests the conversion of float amounts to minor units.
+        :except: positive finite amounts of whole cents should be converted, every other amount should be left
+        to the Decimal path.
+        """
+        self.assertEqual(get_minor_units(14.0), 1400)
+        self.assertEqual(get_minor_units(12.35), 1235)
+        self.assertEqual(get_minor_units(0.01), 1)
+        self.assertEqual(get_minor_units(123456789.99), 12345678999)
+        for amount in [12.345, 0.001, 0.0, -0.0, -14.0, float('inf'), float('nan'), MAX_AMOUNT, Decimal('14.0'), 14]:
+            with self.subTest(amount=amount):
+                self.assertIsNone(get_minor_units(amount))
+
+    def test_same_as_decimal_path_exhaustive(self):
+        """
+        Compares the fixed-point engine with the Decimal conversion path, for every pair of currencies of a date
+        and every amount of whole cents up to 10.00, and for random amounts of whole cents up to 10^12.
+        :except:
+            - every amount converted by the engine should be the same, to the cent, as the Decimal one
+            - the engine should convert almost every amount, leaving the ones at a cent boundary to the Decimal path
+        """
+        date_index = self.exchange_rates_table.resolve_date_index('latest')
+        scaled_rates = [self.exchange_rates_table.get_scaled_rate(date_index, currency_index)
+                        for currency_index in range(self.exchange_rates_table.width)]
+        scaled_rates = [scaled_rate for scaled_rate in scaled_rates if scaled_rate is not None]
+        random_generator = random.Random(0)
+        amounts = [minor_units / 100 for minor_units in range(1, 1001)] + \
+                  [random_generator.randrange(1, 10 ** 14) / 100 for i in range(200)]
+        (converted, left) = (0, 0)
+        for src_scaled_rate in scaled_rates:
+            for dst_scaled_rate in scaled_rates:
+                for amount in amounts:
+                    converted_minor_units = get_converted_minor_units(amount, src_scaled_rate, dst_scaled_rate)
+                    if converted_minor_units is None:
+                        left += 1
+                    elif converted_minor_units != get_decimal_minor_units(amount, src_scaled_rate, dst_scaled_rate):
+                        self.fail('{} {} -> {}: {} instead of {}'.format(
+                            amount, src_scaled_rate, dst_scaled_rate, converted_minor_units,
+                            get_decimal_minor_units(amount, src_scaled_rate, dst_scaled_rate)))
+                    else:
+                        converted += 1
+        self.assertGreater(converted, 0.9 * (converted + left))
+        self.assertGreater(left, 0)     # the same currency, among others, lands on cent boundaries
+
+    def test_cent_boundaries_left_to_decimal_path(self):
+        """
+        Tests amounts whose exact converted amount is a whole number of cents, or lies next to one.
+        :except: the engine should leave them to the Decimal path.
+        """
+        self.assertIsNone(get_converted_minor_units(14.0, 1000000000, 1100000000))
+        self.assertIsNone(get_converted_minor_units(0.03, 3000000000, 1000000000))
+        self.assertIsNone(get_converted_minor_units(14.0, 10 ** 16 + 1, 10 ** 16))
+        self.assertEqual(get_converted_minor_units(14.0, 1000000000, 1103400000), 1544)
+
+    def test_float_amount_same_as_decimal_amount(self):
+        """
+        Tests 'get_currency_converted_float_amount_at_date' function of the Resource library against
+        'get_currency_converted_amount_at_date', with tables, dicts and amounts the engine leaves to the Decimal path.
+        :except:
+            - the float converted amount should be the float of the Decimal one
+            - invalid parameters should raise the same exceptions
+        """
+        exchange_rates_dict = self.exchange_rates_table.to_dict()
+        for exchange_rates in (self.exchange_rates_table, exchange_rates_dict):
+            for amount in [14.0, 12.35, 12.345, 0.0, -14.0, -0.001, 1e20]:
+                for (date, fallback) in [('2019-10-10', None), ('2019-10-12', 'previous'), ('latest', None)]:
+                    with self.subTest(table=isinstance(exchange_rates, ExchangeRatesTable), amount=amount,
+                                      date=date):
+                        (converted_amount, used_date) = resources.get_currency_converted_float_amount_at_date(
+                            exchange_rates, amount, 'GBP', 'JPY', date, fallback)
+                        expected = resources.get_currency_converted_amount_at_date(
+                            exchange_rates, Decimal(amount), 'GBP', 'JPY', date, fallback)
+                        self.assertEqual(repr(converted_amount), repr(float(expected[0])))
+                        self.assertEqual(used_date, expected[1])
+        self.assertRaises(resources.CustomAPIException, resources.get_currency_converted_float_amount_at_date,
+                          self.exchange_rates_table, Decimal(14), 'GBP', 'JPY', '2019-10-10')
+        for (src_currency, date) in [('AAA', '2019-10-10'), ('GB1', '2019-10-10'), ('GBP', '2019-10-12')]:
+            with self.subTest(src_currency=src_currency, date=date):
+                with self.assertRaises(resources.CustomAPIException) as float_context:
+                    resources.get_currency_converted_float_amount_at_date(self.exchange_rates_table, 14.0,
+                                                                          src_currency, 'JPY', date)
+                with self.assertRaises(resources.CustomAPIException) as decimal_context:
+                    resources.get_currency_converted_amount_at_date(self.exchange_rates_table, Decimal(14.0),
+                                                                    src_currency, 'JPY', date)
+                self.assertEqual(float_context.exception.to_dict(), decimal_context.exception.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest import TestCase
+import os
+import json
+import tempfile
+import threading
+from server.json_log import JsonLogWriter, AccessLogMiddleware, dropped_entries_counter
+from server.exchange_rates_store import exchange_rates_store
+from server.flask_server import app
+from benchmarks.replay_load_generator import read_request_log
+
+CONVERT_QUERY_STRING = 'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10'
+
+
+class JsonLogTest(TestCase):
+    """
+    This class defines the tests for the structured logs of the server application.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_document = os.path.join(self.directory.name, 'log.jsonl')
+        self.wsgi_app = app.wsgi_app
+
+    def tearDown(self):
+        """
+        Tear down function which defines the set of instructions executed right after the execution of each test
+        """
+        app.wsgi_app = self.wsgi_app
+        self.directory.cleanup()
+
+    def read_entries(self):
+        """
+        Reads the entries written to the log document.
+        :return: list of entries
+        """
+        with open(self.log_document, 'r') as f:
+            return [json.loads(line) for line in f]
+
+    def test_error_entries(self):
+        """
+        Tests the entries of the error log, and the entries dropped by a full queue.
+        :except:
+            - errors should be written as JSON lines holding their message, type and traceback
+            - an entry which does not fit in the queue should be dropped and counted, without blocking
+        """
+        error_log = JsonLogWriter('test-error', self.log_document, None)
+        try:
+            raise ValueError('invalid value')
+        except ValueError as e:
+            error_log.log(dict(event='error', context='test', message=str(e), exception=e))
+        error_log.flush()
+        [entry] = self.read_entries()
+        self.assertEqual(entry['message'], 'invalid value')
+        self.assertEqual(entry['exception'], 'ValueError')
+        self.assertIn('raise ValueError', entry['traceback'])
+
+        stalled_log = JsonLogWriter('test-stalled', self.log_document, None, 1)
+        stalled_log.thread = threading.current_thread()     # a writer thread which never writes
+        stalled_log.log(dict(event='error'))
+        stalled_log.log(dict(event='error'))
+        self.assertEqual(dropped_entries_counter.get_value(('test-stalled',)), 1)
+        stalled_log.thread = None   # nothing to flush when the process exits
+
+    def test_access_entries_replayable(self):
+        """
+        Tests the entries of the access log written for the requests served by the server application.
+        :except:
+            - every request should be logged with its parameters, status, latency and version of the exchange rates
+            - the access log should be read by the replay load generator, skipping the requests other than GET ones
+        """
+        access_log = JsonLogWriter('test-access', self.log_document, None)
+        app.wsgi_app = AccessLogMiddleware(self.wsgi_app, access_log, exchange_rates_store)
+        client = app.test_client()
+        self.assertEqual(client.get('/api/convert?' + CONVERT_QUERY_STRING).status_code, 200)
+        self.assertEqual(client.get('/api/convert?amount=14.0').status_code, 400)
+        self.assertEqual(client.post('/api/convert/batch', data='[]').status_code, 400)
+        access_log.flush()
+        entries = self.read_entries()
+        self.assertEqual([(entry['method'], entry['path'], entry['status']) for entry in entries],
+                         [('GET', '/api/convert', 200), ('GET', '/api/convert', 400),
+                          ('POST', '/api/convert/batch', 400)])
+        self.assertEqual(entries[0]['query'], {'amount': '14.0', 'src-currency': 'EUR', 'dest-currency': 'USD',
+                                               'reference-date': '2019-10-10'})
+        self.assertEqual(entries[0]['data_date'], '2019-10-15')
+        self.assertIsNotNone(entries[0]['data_version'])
+        self.assertGreater(entries[0]['latency_ms'], 0)
+        requests = read_request_log(self.log_document)
+        self.assertEqual([target for (request_time, target) in requests],
+                         ['/api/convert?' + CONVERT_QUERY_STRING, '/api/convert?amount=14.0'])
+        self.assertEqual(requests[0][0], entries[0]['time'])
+
+
+if __name__ == '__main__':
+    unittest.main()
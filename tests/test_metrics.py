@@ -0,0 +1,82 @@
+import unittest
+from unittest import TestCase
+from server.metrics import Counter, Gauge, Histogram, MetricsRegistry, MetricsMiddleware, request_counter, \
+    request_duration_histogram
+from server.flask_server import app
+
+
+class MetricsTest(TestCase):
+    """
+    This class defines the tests for the metrics of the server application.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.app = app.test_client()
+
+    def test_render(self):
+        """
+        Tests the rendering of counters, gauges and histograms in the Prometheus text format.
+        :except: every metric should be rendered with its help, its type and its samples, label values escaped
+        and histogram buckets cumulative.
+        """
+        registry = MetricsRegistry()
+        counter = registry.register(Counter('test_total', 'Test counter.', ('name',)))
+        gauge = registry.register(Gauge('test_value', 'Test gauge.'))
+        histogram = registry.register(Histogram('test_seconds', 'Test histogram.', buckets=(0.1, 1.0)))
+        registry.add_collector(lambda: gauge.set(2.5))
+        counter.inc(('a"b',))
+        counter.inc(('a"b',), 2)
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        self.assertEqual(registry.render(), '\n'.join([
+            '# HELP test_total Test counter.', '# TYPE test_total counter', 'test_total{name="a\\"b"} 3',
+            '# HELP test_value Test gauge.', '# TYPE test_value gauge', 'test_value 2.5',
+            '# HELP test_seconds Test histogram.', '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="0.1"} 2', 'test_seconds_bucket{le="1.0"} 3', 'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 5.65', 'test_seconds_count 4']) + '\n')
+
+    def test_middleware(self):
+        """
+        Tests the counting of the requests served by a WSGI application.
+        :except: requests should be counted by endpoint, method and status code, unknown paths under 'other',
+        and timed by endpoint.
+        """
+        def wsgi_app(environ, start_response):
+            start_response('404 NOT FOUND' if environ['PATH_INFO'] == '/missing' else '200 OK', [])
+            return [b'']
+
+        middleware = MetricsMiddleware(wsgi_app, ['/test-endpoint'])
+        before = (request_counter.get_value(('/test-endpoint', 'GET', '200')),
+                  request_counter.get_value(('other', 'POST', '404')),
+                  request_duration_histogram.get_count(('/test-endpoint',)))
+        middleware(dict(PATH_INFO='/test-endpoint', REQUEST_METHOD='GET'), lambda status, headers, exc_info=None: None)
+        middleware(dict(PATH_INFO='/missing', REQUEST_METHOD='POST'), lambda status, headers, exc_info=None: None)
+        self.assertEqual(request_counter.get_value(('/test-endpoint', 'GET', '200')), before[0] + 1)
+        self.assertEqual(request_counter.get_value(('other', 'POST', '404')), before[1] + 1)
+        self.assertEqual(request_duration_histogram.get_count(('/test-endpoint',)), before[2] + 1)
+
+    def test_get_metrics(self):
+        """
+        Tests '/metrics' endpoint of the server application.
+        :except: the metrics should be returned in the Prometheus text format, counting the conversions served
+        and describing the exchange rates served.
+        """
+        self.app.get('/api/convert?amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10')
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'text/plain; version=0.0.4; charset=utf-8')
+        metrics = response.get_data(as_text=True)
+        self.assertIn('currency_converter_requests_total{endpoint="/api/convert",method="GET",status="200"}',
+                      metrics)
+        self.assertIn('currency_converter_request_duration_seconds_count{endpoint="/api/convert"}', metrics)
+        self.assertIn('currency_converter_exchange_rates_newest_date_timestamp_seconds 1571097600.0', metrics)
+        self.assertIn('currency_converter_exchange_rates_fetched_timestamp_seconds ', metrics)
+        self.assertIn('currency_converter_cache_hit_ratio{cache="date_validation"}', metrics)
+        self.assertIn('currency_converter_cache_hit_ratio{cache="date_ordinal"}', metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest import TestCase
+import os
+import time
+import pstats
+import tempfile
+from server import profiling
+from server.profiling import ProfilingMiddleware, get_profile_token, is_valid_profile_token, is_profiling_enabled
+from server.flask_server import app, ENDPOINTS
+
+CONVERT_URL = '/api/convert?amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10'
+
+
+class ProfilingTest(TestCase):
+    """
+    This class defines the tests for the profiling hook of the server application.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.wsgi_app = app.wsgi_app
+
+    def tearDown(self):
+        """
+        Tear down function which defines the set of instructions executed right after the execution of each test
+        """
+        app.wsgi_app = self.wsgi_app
+        self.directory.cleanup()
+
+    def install_middleware(self, sample_rate, secret='', dump_every=2):
+        """
+        Installs the profiling middleware on the application, writing the profiles to the temporary folder.
+        :return: test client of the application
+        """
+        app.wsgi_app = ProfilingMiddleware(self.wsgi_app, ENDPOINTS, sample_rate, secret, self.directory.name,
+                                           dump_every)
+        return app.test_client()
+
+    def test_profile_token(self):
+        """
+        Tests the validation of the tokens of the X-Profile-Token header.
+        :except: only unexpired tokens signed with the secret should be valid, and no token without secret.
+        """
+        expiry = int(time.time()) + 60
+        self.assertTrue(is_valid_profile_token('secret', get_profile_token('secret', expiry)))
+        self.assertFalse(is_valid_profile_token('secret', get_profile_token('other', expiry)))
+        self.assertFalse(is_valid_profile_token('secret', get_profile_token('secret', int(time.time()) - 1)))
+        self.assertFalse(is_valid_profile_token('', get_profile_token('', expiry)))
+        for token in [None, '', 'abc', '{}.'.format(expiry), '-1.abc']:
+            with self.subTest(token=token):
+                self.assertFalse(is_valid_profile_token('secret', token))
+        self.assertFalse(is_profiling_enabled(0, ''))
+        self.assertTrue(is_profiling_enabled(0.01, ''))
+        self.assertTrue(is_profiling_enabled(0, 'secret'))
+
+    def test_sampled_profiles(self):
+        """
+        Tests the aggregation of the profiles of sampled requests.
+        :except: the profiles of an endpoint should be written every 'dump_every' profiles, aggregated in a pstats
+        document holding the functions of the conversion path.
+        """
+        client = self.install_middleware(1.0)
+        profile_document = os.path.join(self.directory.name, 'api_convert.{}.prof'.format(os.getpid()))
+        self.assertEqual(client.get(CONVERT_URL).status_code, 200)
+        self.assertFalse(os.path.exists(profile_document))
+        self.assertEqual(client.get(CONVERT_URL).status_code, 200)
+        self.assertTrue(os.path.exists(profile_document))
+        functions = [function for (file_name, line, function) in pstats.Stats(profile_document).stats]
+        self.assertIn('get_currency_converted_float_amount_at_date', functions)
+        self.assertIn('get', functions)
+
+    def test_requested_profiles(self):
+        """
+        Tests the profiles of the requests carrying the X-Profile-Token header, while sampling is disabled.
+        :except: a request with a valid token should get its own profile, named in the X-Profile-Document header,
+        even within the same second as another one; requests without a valid token should not be profiled.
+        """
+        client = self.install_middleware(0.0, 'secret')
+        response = client.get(CONVERT_URL, headers={'X-Profile-Token': 'abc.def'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Document', response.headers)
+        self.assertEqual(os.listdir(self.directory.name), [])
+        token = get_profile_token('secret', int(time.time()) + 60)
+        response = client.get(CONVERT_URL, headers={'X-Profile-Token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.listdir(self.directory.name), [response.headers['X-Profile-Document']])
+        self.assertTrue(response.headers['X-Profile-Document'].startswith('api_convert.'))
+        # a second profile within the same second gets its own document
+        second_response = client.get(CONVERT_URL, headers={'X-Profile-Token': token})
+        self.assertNotEqual(second_response.headers['X-Profile-Document'], response.headers['X-Profile-Document'])
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+
+
+    def test_profile_not_started(self):
+        """
+        Tests the requests asking for their profile while another request is profiled, and while a profiler
+        cannot be enabled.
+        :except: the requests should be served without profile, and without the X-Profile-Document header.
+        """
+        client = self.install_middleware(0.0, 'secret')
+        token = get_profile_token('secret', int(time.time()) + 60)
+        app.wsgi_app.profile_lock.acquire()     # another request is being profiled
+        try:
+            response = client.get(CONVERT_URL, headers={'X-Profile-Token': token})
+        finally:
+            app.wsgi_app.profile_lock.release()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Document', response.headers)
+
+        class ActiveProfile(object):
+            def enable(self):
+                raise ValueError('Another profiling tool is already active')
+
+        profile_module = profiling.cProfile
+        profiling.cProfile = type('cProfile', (object,), dict(Profile=ActiveProfile))
+        try:
+            response = client.get(CONVERT_URL, headers={'X-Profile-Token': token})
+        finally:
+            profiling.cProfile = profile_module
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Document', response.headers)
+        self.assertEqual(os.listdir(self.directory.name), [])
+        self.assertFalse(app.wsgi_app.profile_lock.locked())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from unittest import TestCase
+import time
+import asyncio
+from benchmarks import replay_load_generator
+from benchmarks.replay_load_generator import read_request_log, get_arrival_times, get_error, replay
+from server.flask_server import app
+
+SAMPLE_LOG = 'benchmarks/sample_requests.jsonl'
+
+
+class FlaskClientConnection(object):
+    """
+    Connection of the replay sending its requests to the Flask test client instead of a running server.
+    """
+    client = None   # test client shared by the connections
+    targets = list()    # targets sent, in order
+
+    def __init__(self, host, port):
+        """
+        FlaskClientConnection constructor, with the signature of the replay connections.
+        """
+        pass
+
+    def close(self):
+        """
+        Closes the connection, nothing to release.
+        """
+        pass
+
+    async def send(self, target):
+        """
+        Sends a GET request for the target given in input to the test client.
+        :return: error, None if the request succeeded
+        """
+        FlaskClientConnection.targets.append(target)
+        response = FlaskClientConnection.client.get(target)
+        return None if response.status_code == 200 else get_error(response.status_code, response.data)
+
+
+class ReplayLoadGeneratorTest(TestCase):
+    """
+    This class defines the tests for the load generator replaying a log of conversion requests.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.connection_class = replay_load_generator.ReplayConnection
+        replay_load_generator.ReplayConnection = FlaskClientConnection
+        FlaskClientConnection.client = app.test_client()
+        FlaskClientConnection.targets = list()
+
+    def tearDown(self):
+        """
+        Tear down function which defines the set of instructions executed right after the execution of each test
+        """
+        replay_load_generator.ReplayConnection = self.connection_class
+
+    def test_read_request_log(self):
+        """
+        Tests the parsing of the sample log of the requests, and the arrival times of the open loop modes.
+        :except: every line should be read, with its time and its target, and the arrivals should follow the times
+        of the log, sped up, or the given rate.
+        """
+        requests = read_request_log(SAMPLE_LOG)
+        self.assertEqual(len(requests), 10)
+        self.assertEqual(requests[0], (0.0, '/api/convert?amount=14.0&src-currency=EUR&dest-currency=USD'
+                                            '&reference-date=2019-10-10'))
+        self.assertEqual(requests[8], (0.15, '/api/convert?amount=73.1&src-currency=CAD&dest-currency=AUD'
+                                             '&reference-date=2019-08-30'))
+        self.assertEqual(get_arrival_times(requests, 'timing', speed=2.0),
+                         [request_time / 2.0 for (request_time, target) in requests])
+        arrival_times = get_arrival_times(requests * 100, 'rate', rate=100.0)
+        self.assertEqual(arrival_times, get_arrival_times(requests * 100, 'rate', rate=100.0))   # same seed
+        self.assertEqual(arrival_times, sorted(arrival_times))
+        self.assertAlmostEqual(arrival_times[-1] / (len(arrival_times) - 1), 0.01, delta=0.002)
+        self.assertRaises(Exception, get_arrival_times, [(None, '/api/convert')], 'timing')
+
+    def test_replay_closed_loop(self):
+        """
+        Tests the replay of the sample log in closed loop against the Flask test client.
+        :except: every request should be sent once and counted, the failed ones by error.
+        """
+        requests = read_request_log(SAMPLE_LOG)
+        summary = asyncio.run(replay('http://127.0.0.1:8080', requests, 3, 'closed')).get_summary()
+        self.assertEqual(sorted(FlaskClientConnection.targets), sorted(target for (request_time, target) in requests))
+        self.assertEqual(summary['requests'], 10)
+        self.assertEqual(summary['failed'], 3)
+        self.assertEqual(summary['errors'], {
+            '400 No exchange rate found for the currency AAA.': 1,
+            '400 No exchange rate found for the selected date 2019-10-12.': 1,
+            '400 {"amount": "could not convert string to float: \'abc\'"}': 1})
+        self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+
+    def test_replay_timing(self):
+        """
+        Tests the replay of the sample log at its own timing against the Flask test client.
+        :except: the requests should be sent in the order of the log, no earlier than their times.
+        """
+        requests = read_request_log(SAMPLE_LOG)
+        start = time.perf_counter()
+        results = asyncio.run(replay('http://127.0.0.1:8080', requests, 3, 'timing', speed=2.0))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.19 / 2.0)
+        self.assertEqual(FlaskClientConnection.targets, [target for (request_time, target) in requests])
+        self.assertEqual(results.get_summary()['requests'], 10)
+        self.assertGreaterEqual(results.duration, 0.19 / 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
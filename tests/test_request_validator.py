@@ -0,0 +1,108 @@
+import unittest
+from unittest import TestCase
+from decimal import Decimal
+from flask import request
+from flask_restful import reqparse
+from werkzeug.exceptions import HTTPException
+from custom_api_exception.customexception import CustomAPIException
+from server import resources
+from server.exchange_rates_table import ExchangeRatesTable
+from server.flask_server import app
+from server.request_validator import convert_request_validator, get_request_values
+
+
+def get_request_parser_args(query_string, json_body=None):
+    """
+    Parses a conversion request querystring with the Flask-RESTful request parser the conversion endpoint used to
+    declare.
+    :param query_string: querystring of the request
+    :type query_string: str
+    :param json_body: JSON body of the request, None for a request without body
+    :type json_body: dict
+    :return: (request_args, errors), as returned by 'RequestValidator.get_args'
+    """
+    parser = reqparse.RequestParser()
+    parser.add_argument('amount', type=float, required=True)
+    parser.add_argument('src-currency', type=str, required=True)
+    parser.add_argument('dest-currency', type=str, required=True)
+    parser.add_argument('reference-date', type=str, required=True)
+    parser.add_argument('fallback', type=str, required=False)
+    with app.test_request_context('/api/convert', query_string=query_string, json=json_body):
+        try:
+            return dict(parser.parse_args()), None
+        except HTTPException as e:
+            return None, e.data['message']
+
+
+class RequestValidatorTest(TestCase):
+    """
+    This class defines the tests for the precompiled request validator and the fast validation of the conversion
+    parameters.
+    """
+
+    def test_same_as_request_parser(self):
+        """
+        Tests the conversion request validator against the Flask-RESTful request parser, on valid and invalid
+        querystrings.
+        :except: both should return the same arguments, or the same error messages.
+        """
+        for query_string in [
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10&fallback=previous',
+            'amount=%201e1&src-currency=&dest-currency=U%20S&reference-date=x',
+            'amount=abc&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=1&amount=x&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=1&amount=2&src-currency=EUR&src-currency=GBP&dest-currency=USD&reference-date=2019-10-10',
+            'amount=inf&src-currency=EUR&dest-currency=USD&reference-date=2019-10-10&fallback=',
+            'src-currency=EUR&dest-currency=USD&reference-date=2019-10-10',
+            'amount=14.0&src-currency=EUR&reference-date=2019-10-10',
+            ''
+        ]:
+            with self.subTest(query_string=query_string):
+                with app.test_request_context('/api/convert', query_string=query_string):
+                    self.assertEqual(convert_request_validator.get_args(request.values.getlist),
+                                     get_request_parser_args(query_string))
+
+    def test_json_body_same_as_request_parser(self):
+        """
+        Tests the conversion request validator against the Flask-RESTful request parser, on requests carrying their
+        arguments in a JSON body, alone or together with the querystring.
+        :except: both should return the same arguments, or the same error messages.
+        """
+        for (query_string, json_body) in [
+            ('', {'amount': 14.0, 'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'}),
+            ('amount=15', {'amount': '14', 'src-currency': 'EUR', 'dest-currency': 'USD',
+                           'reference-date': '2019-10-10'}),
+            ('src-currency=EUR&dest-currency=USD&reference-date=latest', {'amount': 'abc'}),
+            ('src-currency=EUR&dest-currency=USD&reference-date=latest', {'amount': None}),
+            ('src-currency=EUR&dest-currency=USD&reference-date=latest', {'amount': [1, 2]}),
+            ('src-currency=EUR&dest-currency=USD', {'amount': 1, 'reference-date': 20191010})
+        ]:
+            with self.subTest(query_string=query_string, json_body=json_body):
+                with app.test_request_context('/api/convert', query_string=query_string, json=json_body):
+                    self.assertEqual(convert_request_validator.get_args(get_request_values(request)),
+                                     get_request_parser_args(query_string, json_body))
+
+    def test_known_currencies_skip_validation_only(self):
+        """
+        Tests that the currencies which are not in the table are still validated by 'validate_currency'.
+        :except: the conversion should raise the same errors as before, and convert the known currencies.
+        """
+        table = ExchangeRatesTable.from_exchange_rates([('2019-10-10', dict(USD=Decimal('1.103'), EUR=Decimal(1)))])
+        self.assertEqual(table.known_currencies, frozenset(['EUR', 'USD']))
+        self.assertEqual(resources.get_currency_converted_amount(table, Decimal(10), 'EUR', 'USD', '2019-10-10'),
+                         Decimal('11.03'))
+        for (src_currency, dst_currency, message) in [
+            ('US1', 'USD', 'Source currency must not contain digits.'),
+            ('EUR', '123', 'Destination currency must be a string.'),
+            (['EUR'], 'USD', 'Source currency must be a string.'),
+            ('EUR', 'GBP', 'No exchange rate found for the currency GBP.')
+        ]:
+            with self.assertRaises(CustomAPIException) as context:
+                resources.get_currency_converted_amount(table, Decimal(10), src_currency, dst_currency, '2019-10-10')
+            self.assertEqual(context.exception.message, message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,11 @@ import unittest
 from unittest import TestCase
 import os
 import datetime
+import tempfile
 from custom_api_exception.customexception import CustomAPIException
 from server import resources
+from server.exchange_rates_table import ExchangeRatesTable
+from server.server_timing import StageTimer
 from decimal import Decimal, ROUND_DOWN
 
 
@@ -121,6 +124,42 @@ class ResourcesTest(TestCase):
         # removes the exchange rate document
         os.remove('assets/exchange_rates.xml')
 
+    def test_get_exchange_rates_dict_rate_without_currency(self):
+        """
+        Tests 'get_exchange_rates_dict' function of the Resource libraries.
+        The tests tries to get the dict out of an XML file in which a dated Cube contains an exchange rate
+        without the 'currency' attribute.
+        :except: the function should raise TypeError exception.
+        """
+        xml_string = '<Cube><Cube time="2019-10-10"><Cube currency="USD" rate="1.103"/><Cube rate="0.89"/>' \
+                     '</Cube></Cube>'
+        with tempfile.NamedTemporaryFile('w', suffix='.xml', delete=False) as f:
+            f.write(xml_string)
+        try:
+            self.assertRaises(TypeError, resources.get_exchange_rates_dict, f.name)
+        finally:
+            os.remove(f.name)
+
+    def test_get_exchange_rates_dict_streamed_in_chunks(self):
+        """
+        Tests 'iter_exchange_rates' function of the Resource libraries.
+        The tests streams an indented XML file using chunks smaller than a single element.
+        :except: the function should return every date in document order, with Euro set to 1.
+        """
+        xml_string = '<Cube>\n  <Cube time="2019-10-10">\n    <Cube currency="USD" rate="1.103"/>\n  </Cube>\n' \
+                     '  <Cube time="2019-10-09">\n    <Cube currency="USD" rate="1.0969"/>\n    ' \
+                     '<Cube currency="GBP" rate="0.89"/>\n  </Cube>\n</Cube>'
+        with tempfile.NamedTemporaryFile('w', suffix='.xml', delete=False) as f:
+            f.write(xml_string)
+        try:
+            exchange_rates = list(resources.iter_exchange_rates(f.name, chunk_size=7))
+        finally:
+            os.remove(f.name)
+        self.assertEqual(exchange_rates, [
+            ('2019-10-10', dict(USD=Decimal('1.103'), EUR=Decimal(1))),
+            ('2019-10-09', dict(USD=Decimal('1.0969'), GBP=Decimal('0.89'), EUR=Decimal(1)))
+        ])
+
     # get_exchange_rates_dict tests - end
 
     # get_conversion_factor tests - start
@@ -706,6 +745,72 @@ class ResourcesTest(TestCase):
         self.assertIsInstance(converted_amount, Decimal)
         self.assertEqual(converted_amount, Decimal(8.9).quantize(Decimal('.01'), rounding=ROUND_DOWN))
 
+    def test_get_currency_converted_amount_at_date_resolved(self):
+        """
+        Tests 'get_currency_converted_amount_at_date' function of the Resource library with the latest date and
+        with a weekend date falling back on the previous date, on a dict and on a table.
+        :except: the function should return the amount converted with the resolved date, together with that date.
+        """
+        exchange_rate_dict = {
+            '2019-10-11': dict(EUR=Decimal(1.0), GBP=Decimal('0.89')),
+            '2019-10-14': dict(EUR=Decimal(1.0), GBP=Decimal('0.88'))
+        }
+        for exchange_rates in (exchange_rate_dict, ExchangeRatesTable.from_exchange_rates(exchange_rate_dict.items())):
+            self.assertEqual(resources.get_currency_converted_amount_at_date(exchange_rates, Decimal(10), 'EUR',
+                                                                             'GBP', 'latest'),
+                             (Decimal('8.80'), '2019-10-14'))
+            self.assertEqual(resources.get_currency_converted_amount_at_date(exchange_rates, Decimal(10), 'EUR',
+                                                                             'GBP', '2019-10-13', 'previous'),
+                             (Decimal('8.90'), '2019-10-11'))
+            self.assertEqual(resources.get_currency_converted_amount_at_date(exchange_rates, Decimal(10), 'EUR',
+                                                                             'GBP', '2019-10-14', 'previous'),
+                             (Decimal('8.80'), '2019-10-14'))
+            self.assertRaises(CustomAPIException, resources.get_currency_converted_amount_at_date, exchange_rates,
+                              Decimal(10), 'EUR', 'GBP', '2019-10-13')
+            self.assertRaises(CustomAPIException, resources.get_currency_converted_amount_at_date, exchange_rates,
+                              Decimal(10), 'EUR', 'GBP', '2019-10-10', 'previous')
+
+    def test_get_currency_converted_amount_at_date_invalid_fallback(self):
+        """
+        Tests 'get_currency_converted_amount_at_date' function of the Resource library with an unknown fallback.
+        :except: the function should raise a CustomAPIException with status code 400.
+        """
+        exchange_rate_dict = {'2019-10-11': dict(EUR=Decimal(1.0), GBP=Decimal('0.89'))}
+        with self.assertRaises(CustomAPIException) as context:
+            resources.get_currency_converted_amount_at_date(exchange_rate_dict, Decimal(10), 'EUR', 'GBP',
+                                                            '2019-10-11', 'next')
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.message, 'Invalid fallback next')
+
+    def test_get_currency_converted_float_amount_at_date_stages(self):
+        """
+        Tests the stages marked by 'get_currency_converted_float_amount_at_date' function of the Resource library,
+        converting with the fixed-point engine and falling back to the Decimal conversion path on a table, and with
+        the Decimal conversion path on a dict.
+        :except: each stage should be marked once, in order.
+        """
+        class RecordingStageTimer(StageTimer):
+            def __init__(self):
+                StageTimer.__init__(self)
+                self.marks = list()
+
+            def mark(self, stage):
+                self.marks.append(stage)
+                StageTimer.mark(self, stage)
+
+        exchange_rate_dict = {'2019-10-11': dict(EUR=Decimal(1.0), GBP=Decimal('0.89'))}
+        exchange_rates_table = ExchangeRatesTable.from_exchange_rates(exchange_rate_dict.items())
+        # 10.01 EUR is converted by the fixed-point engine, 10.00 EUR is exactly on a cent boundary
+        for (exchange_rates, amount, expected_amount) in [(exchange_rates_table, 10.01, 8.9),
+                                                          (exchange_rates_table, 10.0, 8.9),
+                                                          (exchange_rate_dict, 10.0, 8.9)]:
+            with self.subTest(exchange_rates=type(exchange_rates).__name__, amount=amount):
+                stage_timer = RecordingStageTimer()
+                self.assertEqual(resources.get_currency_converted_float_amount_at_date(
+                    exchange_rates, amount, 'EUR', 'GBP', '2019-10-11', stage_timer=stage_timer),
+                    (expected_amount, '2019-10-11'))
+                self.assertEqual(stage_timer.marks, ['validation', 'factor', 'rounding'])
+
     # get_currency_converted_amount tests - end
 
 
@@ -1,9 +1,15 @@
 import unittest
 from unittest import TestCase
+from server import flask_server
 from server.flask_server import app
+from server.exchange_rates_store import exchange_rates_store
 from server.resources import get_updated_exchange_rates_document
+from server.settings import HISTORICAL_CONVERSION_MAX_AGE
+from server.http_caching import get_conversion_cache_control
+from server.exchange_rates_table import ExchangeRatesTable
 from decimal import Decimal, ROUND_DOWN
 import os
+import gzip
 
 
 class ServerTest(TestCase):
@@ -68,6 +74,26 @@ class ServerTest(TestCase):
         self.assertEqual(response.content_type, 'text/html')
         self.assertIsNotNone(response.data)
 
+    def test_get_help_conditional(self):
+        """
+        Tests conditional and compressed requests to the '/help' endpoint of the server application.
+        :except:
+            - response should carry the ETag and the Last-Modified date of the page
+            - a request matching the ETag should get a 304 response without body
+            - a request accepting gzip should get the compressed page
+        """
+        response = self.ta.get(self.api_address + '/help')
+        self.assertIsNotNone(response.headers.get('ETag'))
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+        response_not_modified = self.ta.get(self.api_address + '/help',
+                                            headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response_not_modified.status_code, 304)
+        self.assertEqual(response_not_modified.data, b'')
+        response_gzip = self.ta.get(self.api_address + '/help', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response_gzip.status_code, 200)
+        self.assertEqual(response_gzip.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response_gzip.data), response.data)
+
     def test_convert_no_amount_parameter(self):
         """
         Tests 'api/convert' API endpoint of the server application.
@@ -439,5 +465,306 @@ class ServerTest(TestCase):
         self.assertEqual(data['amount'], float(expected_result))
 
 
+    def test_convert_batch_json_array(self):
+        """
+        Tests 'api/convert/batch' API endpoint of the server application.
+        The test posts a JSON array holding a valid item, an item with an unknown currency and an item
+        without amount.
+        :except:
+            - the API should return 200,
+            - the response should be a list holding one result per item, in the same order
+            - the invalid items should hold an error message and a 400 status
+        """
+        items = [
+            {'amount': 42, 'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'},
+            {'amount': 42, 'src-currency': 'EUR', 'dest-currency': 'AAA', 'reference-date': '2019-10-10'},
+            {'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'}
+        ]
+        expected_result = Decimal(42*1.103).quantize(Decimal('.01'), rounding=ROUND_DOWN)
+        response = self.ta.post(self.api_address + '/api/convert/batch', json=items)
+        data = response.json
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0], dict(amount=float(expected_result), currency='USD'))
+        self.assertEqual(data[1]['status'], 400)
+        self.assertEqual(data[1]['message'], 'No exchange rate found for the currency AAA.')
+        self.assertEqual(data[2]['status'], 400)
+        self.assertTrue('amount' in data[2]['message'])
+
+    def test_convert_batch_ndjson(self):
+        """
+        Tests 'api/convert/batch' API endpoint of the server application.
+        The test posts newline-delimited JSON objects, one of them not being valid JSON.
+        :except:
+            - the API should return 200,
+            - the response should hold one result per line, the malformed line holding a 400 status
+        """
+        body = '{"amount": 10, "src-currency": "USD", "dest-currency": "EUR", "reference-date": "2019-10-10"}\n' \
+               '{"amount": 10, \n' \
+               '{"amount": "10", "src-currency": "EUR", "dest-currency": "EUR", "reference-date": "2019-10-10"}\n'
+        response = self.ta.post(self.api_address + '/api/convert/batch', data=body,
+                                content_type='application/x-ndjson')
+        data = response.json
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['amount'], float(Decimal(Decimal(10) / Decimal('1.103')).quantize(
+            Decimal('.01'), rounding=ROUND_DOWN)))
+        self.assertEqual(data[1]['status'], 400)
+        self.assertEqual(data[2], dict(amount=10.0, currency='EUR'))
+
+    def test_convert_batch_invalid_items(self):
+        """
+        Tests 'api/convert/batch' API endpoint of the server application.
+        The test posts a valid item, an item whose amount is out of the range of the conversion, an item whose
+        amount is a boolean, an item whose currency is an array and items whose amount is not finite.
+        :except:
+            - the API should return 200,
+            - the valid item should be converted,
+            - the invalid items should hold a 400 status and the error message of the invalid argument
+        """
+        items = [
+            {'amount': 42, 'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'},
+            {'amount': 1e30, 'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'},
+            {'amount': True, 'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'},
+            {'amount': 42, 'src-currency': ['EUR'], 'dest-currency': 'USD', 'reference-date': '2019-10-10'}
+        ]
+        expected_result = Decimal(42*1.103).quantize(Decimal('.01'), rounding=ROUND_DOWN)
+        response = self.ta.post(self.api_address + '/api/convert/batch', json=items)
+        data = response.json
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data), 4)
+        self.assertEqual(data[0], dict(amount=float(expected_result), currency='USD'))
+        self.assertEqual(data[1], dict(message='Invalid amount 1e+30', status=400))
+        self.assertEqual(data[2]['status'], 400)
+        self.assertEqual(list(data[2]['message'].keys()), ['amount'])
+        self.assertEqual(data[3]['status'], 400)
+        self.assertEqual(list(data[3]['message'].keys()), ['src-currency'])
+        # JSON accepts the non-finite NaN and Infinity numbers, which cannot be converted
+        body = '[' + ', '.join('{{"amount": {}, "src-currency": "EUR", "dest-currency": "USD", '
+                               '"reference-date": "2019-10-10"}}'.format(amount)
+                               for amount in ['NaN', '"nan"', 'Infinity', '1e30']) + ']'
+        response = self.ta.post(self.api_address + '/api/convert/batch', data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [dict(message='Invalid amount nan', status=400),
+                                         dict(message='Invalid amount nan', status=400),
+                                         dict(message='Invalid amount inf', status=400),
+                                         dict(message='Invalid amount 1e+30', status=400)])
+        response = self.ta.get(self.api_address + '/api/convert?amount=nan&src-currency=EUR&dest-currency=USD'
+                                                  '&reference-date=2019-10-10')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['message'], 'Invalid amount nan')
+        # a missing argument gets the message of the single conversion endpoint
+        response = self.ta.post(self.api_address + '/api/convert/batch', json=[{'amount': 42}])
+        missing_message = self.ta.get(self.api_address + '/api/convert?amount=42').json['message']
+        self.assertEqual(response.json[0]['message'], missing_message)
+
+    def test_convert_batch_malformed_body(self):
+        """
+        Tests 'api/convert/batch' API endpoint of the server application.
+        The test posts a truncated JSON array and an empty body.
+        :except: the API should return 400.
+        """
+        response = self.ta.post(self.api_address + '/api/convert/batch', data='[{"amount": 10',
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue('message' in response.json)
+        response = self.ta.post(self.api_address + '/api/convert/batch', data='')
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_convert_series_valid_parameters(self):
+        """
+        Tests 'api/convert/series' API endpoint of the server application.
+        The test calls the API endpoint over a range which includes a weekend.
+        :except:
+            - the API should return 200,
+            - the response should hold one amount per published date, in ascending date order
+        """
+        params = {
+            'amount': 42,
+            'src-currency': 'EUR',
+            'dest-currency': 'USD',
+            'from': '2019-10-10',
+            'to': '2019-10-14'
+        }
+        response = self.ta.get(self.api_address + '/api/convert/series', query_string=params)
+        data = response.json
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['currency'], 'USD')
+        self.assertEqual([a['date'] for a in data['amounts']], ['2019-10-10', '2019-10-11', '2019-10-14'])
+        expected_result = Decimal(42*1.103).quantize(Decimal('.01'), rounding=ROUND_DOWN)
+        self.assertEqual(data['amounts'][0]['amount'], float(expected_result))
+
+    def test_convert_series_invalid_range(self):
+        """
+        Tests 'api/convert/series' API endpoint of the server application.
+        The test calls the API endpoint with the oldest date after the newest one.
+        :except: the API should return 400.
+        """
+        params = {
+            'amount': 42,
+            'src-currency': 'EUR',
+            'dest-currency': 'USD',
+            'from': '2019-10-14',
+            'to': '2019-10-10'
+        }
+        response = self.ta.get(self.api_address + '/api/convert/series', query_string=params)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue('message' in response.json)
+
+    def test_convert_json_body(self):
+        """
+        Tests 'api/convert' API endpoint of the server application with the parameters in a JSON body.
+        :except: the API should return 200 and the converted amount, as with the parameters in the querystring.
+        """
+        params = {
+            'amount': 14,
+            'src-currency': 'EUR',
+            'dest-currency': 'USD',
+            'reference-date': '2019-10-10'
+        }
+        response = self.ta.get(self.api_address + '/api/convert', json=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, self.ta.get(self.api_address + '/api/convert', query_string=params).json)
+
+    def test_convert_series_invalid_amount(self):
+        """
+        Tests 'api/convert/series' API endpoint of the server application.
+        The test calls the API endpoint with amounts which cannot be converted and without amount.
+        :except: the API should return 400, with the error message of the amount.
+        """
+        params = {
+            'src-currency': 'EUR',
+            'dest-currency': 'USD',
+            'from': '2019-10-10',
+            'to': '2019-10-14'
+        }
+        for (amount, message) in [('1e30', 'Invalid amount 1e+30'), ('nan', 'Invalid amount nan'),
+                                  ('abc', {'amount': "could not convert string to float: 'abc'"})]:
+            with self.subTest(amount=amount):
+                response = self.ta.get(self.api_address + '/api/convert/series', query_string=dict(params,
+                                                                                                    amount=amount))
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json['message'], message)
+        response = self.ta.get(self.api_address + '/api/convert/series', query_string=params)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json['message'].keys()), ['amount'])
+
+    def test_convert_latest_and_previous_fallback(self):
+        """
+        Tests 'api/convert' API endpoint of the server application with the latest date, and with a weekend date
+        falling back on the previous business day.
+        :except:
+            - the API should return 200,
+            - the response should report the date whose exchange rates have been used
+        """
+        params = {
+            'amount': 14,
+            'src-currency': 'EUR',
+            'dest-currency': 'USD',
+            'reference-date': '2019-10-12',
+            'fallback': 'previous'
+        }
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        expected_result = Decimal(14*1.1043).quantize(Decimal('.01'), rounding=ROUND_DOWN)
+        self.assertEqual(response.json, dict(amount=float(expected_result), currency='USD', date='2019-10-11'))
+
+        params['reference-date'] = 'latest'
+        del params['fallback']
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        exchange_rates_table = exchange_rates_store.get_exchange_rates()
+        self.assertEqual(response.json['date'], exchange_rates_table.get_date(len(exchange_rates_table) - 1))
+
+        params['fallback'] = 'next'
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['message'], 'Invalid fallback next')
+
+
+    def test_convert_caching_headers(self):
+        """
+        Tests the caching headers of the 'api/convert' API endpoint of the server application.
+        :except:
+            - a conversion at a past date should carry a strong ETag and a long Cache-Control
+            - a conversion at the latest date, or at a date resolved by a fallback, should carry a Cache-Control
+              tied to the refresh of the exchange rates
+            - a conditional request matching the ETag should get a 304 response without body
+            - an error should carry no caching headers
+        """
+        params = {
+            'amount': 14,
+            'src-currency': 'EUR',
+            'dest-currency': 'USD',
+            'reference-date': '2019-10-10'
+        }
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['ETag'].startswith('"'))
+        self.assertEqual(response.headers['Cache-Control'],
+                         'public, max-age={}, immutable'.format(HISTORICAL_CONVERSION_MAX_AGE))
+        response_not_modified = self.ta.get(self.api_address + '/api/convert', query_string=params,
+                                            headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response_not_modified.status_code, 304)
+        self.assertEqual(response_not_modified.data, b'')
+        self.assertEqual(response_not_modified.headers['ETag'], response.headers['ETag'])
+        params['amount'] = 15
+        response_other = self.ta.get(self.api_address + '/api/convert', query_string=params,
+                                     headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response_other.status_code, 200)
+        self.assertNotEqual(response_other.headers['ETag'], response.headers['ETag'])
+
+        params['reference-date'] = 'latest'
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse('immutable' in response.headers['Cache-Control'])
+
+        # a date resolved to a prior one may get its own exchange rates later, e.g. backfilled in the history
+        params['reference-date'] = '2019-10-12'
+        params['fallback'] = 'previous'
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['date'], '2019-10-11')
+        self.assertFalse('immutable' in response.headers['Cache-Control'])
+        params['reference-date'] = '2019-10-11'
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertTrue('immutable' in response.headers['Cache-Control'])
+        del params['fallback']
+
+        params['src-currency'] = 'AAA'
+        response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse('ETag' in response.headers)
+        # a table without dates has no newest date
+        empty_table = ExchangeRatesTable.from_exchange_rates([])
+        for reference_date in ['2019-10-10', 'latest']:
+            self.assertFalse('immutable' in get_conversion_cache_control(empty_table, reference_date))
+
+    def test_convert_server_timing(self):
+        """
+        Tests the Server-Timing header of the 'api/convert' API endpoint of the server application.
+        :except:
+            - without SERVER_TIMING, responses should carry no Server-Timing header
+            - with SERVER_TIMING, responses should carry the duration of every stage and the same body and headers
+        """
+        for params in [{'amount': 14, 'src-currency': 'EUR', 'dest-currency': 'USD', 'reference-date': '2019-10-10'},
+                       {'amount': 12.345, 'src-currency': 'GBP', 'dest-currency': 'JPY', 'reference-date': 'latest'}]:
+            with self.subTest(params=params):
+                response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+                self.assertFalse('Server-Timing' in response.headers)
+                flask_server.SERVER_TIMING = True
+                try:
+                    timed_response = self.ta.get(self.api_address + '/api/convert', query_string=params)
+                finally:
+                    flask_server.SERVER_TIMING = False
+                self.assertEqual(timed_response.status_code, 200)
+                self.assertEqual(timed_response.data, response.data)
+                self.assertEqual(timed_response.headers['ETag'], response.headers['ETag'])
+                stages = [metric.split(';')[0] for metric in timed_response.headers['Server-Timing'].split(', ')]
+                self.assertEqual(stages, ['parse', 'table', 'validation', 'factor', 'rounding', 'serialization',
+                                          'total'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
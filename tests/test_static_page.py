@@ -0,0 +1,91 @@
+import unittest
+from unittest import TestCase
+import os
+import gzip
+import tempfile
+from server.static_page import StaticPage
+
+
+class StaticPageTest(TestCase):
+    """
+    This class defines the tests for the static pages served from memory.
+    """
+
+    def setUp(self):
+        """
+        Set up function which defines the set of instructions executed right before the execution of each test
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.page_document = os.path.join(self.directory.name, 'page.html')
+        self.write_page('<html>first</html>', 1000000000)
+
+    def tearDown(self):
+        """
+        Tear down function which defines the set of instructions executed right after the execution of each test
+        """
+        self.directory.cleanup()
+
+    def write_page(self, content, modified_time):
+        """
+        Writes the page and sets its last modification time.
+        """
+        with open(self.page_document, 'w') as f:
+            f.write(content)
+        os.utime(self.page_document, (modified_time, modified_time))
+
+    def test_page_served_from_memory(self):
+        """
+        Tests that the page is read once and read again only when the file changes, once the check interval
+        has elapsed.
+        :except:
+            - the page should be served, with its ETag and Last-Modified date
+            - the page should be served from memory while the check interval has not elapsed
+            - the new page should be served, with a new ETag, once the check interval has elapsed
+        """
+        page = StaticPage(self.page_document, check_interval=3600)
+        (status_code, body, headers) = page.get_response()
+        headers = dict(headers)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(body, b'<html>first</html>')
+        self.assertEqual(headers['Last-Modified'], 'Sun, 09 Sep 2001 01:46:40 GMT')
+        self.write_page('<html>second</html>', 2000000000)
+        self.assertEqual(page.get_response()[1], b'<html>first</html>')
+        page.check_interval = 0
+        (status_code, body, new_headers) = page.get_response()
+        self.assertEqual(body, b'<html>second</html>')
+        self.assertNotEqual(dict(new_headers)['ETag'], headers['ETag'])
+        os.remove(self.page_document)
+        self.assertEqual(page.get_response()[1], b'<html>second</html>')
+
+    def test_conditional_and_compressed_responses(self):
+        """
+        Tests the responses to conditional requests and to requests accepting gzip-compressed responses.
+        :except:
+            - a request matching the ETag or the Last-Modified date should get a 304 response without body
+            - a request not matching them should get the page
+            - a request accepting gzip should get the compressed copy, with its own ETag
+        """
+        page = StaticPage(self.page_document)
+        headers = dict(page.get_response()[2])
+        for (if_none_match, if_modified_since) in [(headers['ETag'], None), ('"other", W/' + headers['ETag'], None),
+                                                   ('*', None), (None, headers['Last-Modified']),
+                                                   (None, 'Mon, 10 Sep 2001 00:00:00 GMT')]:
+            with self.subTest(if_none_match=if_none_match, if_modified_since=if_modified_since):
+                self.assertEqual(page.get_response(if_none_match, if_modified_since)[:2], (304, b''))
+        for (if_none_match, if_modified_since) in [('"other"', headers['Last-Modified']),
+                                                   (None, 'Sat, 08 Sep 2001 00:00:00 GMT'), (None, 'not a date')]:
+            with self.subTest(if_none_match=if_none_match, if_modified_since=if_modified_since):
+                self.assertEqual(page.get_response(if_none_match, if_modified_since)[:2],
+                                 (200, b'<html>first</html>'))
+        (status_code, body, gzip_headers) = page.get_response(accept_encoding='deflate, gzip;q=0.8')
+        gzip_headers = dict(gzip_headers)
+        self.assertEqual(gzip.decompress(body), b'<html>first</html>')
+        self.assertEqual(gzip_headers['Content-Encoding'], 'gzip')
+        self.assertNotEqual(gzip_headers['ETag'], headers['ETag'])
+        self.assertEqual(page.get_response(headers['ETag'], accept_encoding='gzip')[0], 200)
+        self.assertEqual(page.get_response(gzip_headers['ETag'], accept_encoding='gzip')[0], 304)
+        self.assertEqual(page.get_response(accept_encoding='gzip;q=0')[1], b'<html>first</html>')
+
+
+if __name__ == '__main__':
+    unittest.main()
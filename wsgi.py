@@ -0,0 +1,13 @@
+import gc
+from server.flask_server import app, init_server, exchange_rates_refresher
+
+"""
+WSGI entry point of the production server, loaded once by the master process before the worker processes are
+forked (see gunicorn.conf.py).
+The garbage collector is disabled while the application and the exchange rates are loaded, so that the objects
+created are not moved around by a collection before the fork: each worker process then shares them with the
+master, copy-on-write, instead of holding its own copy.
+"""
+gc.disable()
+init_server(start_refresher=False)    # each worker process starts its own refresher once forked
+exchange_rates_refresher.fetcher.close()    # the worker processes must not share the master connections